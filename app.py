@@ -7,14 +7,25 @@ import os
 from dotenv import load_dotenv
 import time
 import json
+import io
 from datetime import datetime
+from typing import Dict, List
 import matplotlib.pyplot as plt
 import pandas as pd
 import matplotlib.font_manager as fm
 
 # 향상된 모듈 임포트
-from src.kipris_handler import search_all_patents, get_patent_details
-from src.llm_handler import AdvancedPatentAnalyzer
+from src.export import EXPORT_FORMATS, export_bytes
+from src.instrumentation import SpanCollector
+from src.kipris_handler import iter_patents, get_patent_details
+from src.job_manager import Job, JobManager
+from src.llm_handler import AdvancedPatentAnalyzer, get_analyzer
+from src.patent_index import get_default_index
+from src.patent_table import PatentRecord, PatentTable
+from src.patent_stats import PatentStats, get_patent_stats
+from src.pdf_report import build_pdf_report
+from src.rerank_handler import is_rerank_available
+from src.saved_search import get_saved_search_store
 
 # 환경 설정
 load_dotenv()
@@ -55,19 +66,206 @@ def setup_korean_font():
         return False
 
 def safe_get_valid_patents(patents_list):
-    """안전한 특허 데이터 필터링 - boolean 값 제거"""
+    """안전한 특허 데이터 필터링 - boolean 값 제거, 항상 PatentTable 반환"""
+    # 검색 결과는 이미 검증된 PatentTable이므로 재검사 없이 그대로 사용
+    if isinstance(patents_list, PatentTable):
+        return patents_list
     if not patents_list:
-        return []
+        return PatentTable()
     
-    # 딕셔너리만 필터링하여 반환
+    # 레코드/딕셔너리만 필터링하여 반환
     valid_patents = []
     for item in patents_list:
-        if isinstance(item, dict):
+        if isinstance(item, (PatentRecord, dict)):
             valid_patents.append(item)
         else:
             print(f"Warning: Invalid patent data type: {type(item)} - {item}")
     
-    return valid_patents
+    return PatentTable.from_records(valid_patents)
+
+def get_result_fingerprint(patents: PatentTable) -> str:
+    """결과 집합 지문 - 검색 결과와 함께 저장, 결과 객체가 바뀐 경우에만 다시 계산"""
+    if st.session_state.get('fingerprint_source') is not patents:
+        st.session_state.result_fingerprint = patents.fingerprint(st.session_state.get('search_query', ''))
+        st.session_state.fingerprint_source = patents
+    return st.session_state.result_fingerprint
+
+def store_search_results(patents: PatentTable, search_query: str, search_mode: str, search_time: float):
+    """검색 결과 저장 - 결과와 함께 지문을 기록하고 이전 결과의 파생 상태 초기화"""
+    st.session_state.patents = patents
+    st.session_state.search_query = search_query
+    st.session_state.result_fingerprint = patents.fingerprint(search_query)
+    st.session_state.fingerprint_source = patents
+    st.session_state.summaries = {}  # 이전 결과의 일괄 요약 초기화
+    st.session_state.search_time = search_time
+    st.session_state.search_mode = search_mode
+
+# 🔥 결과 지문 기준 화면 캐시 - 위젯 조작으로 재실행되어도 같은 결과면 재계산 없음
+# (밑줄로 시작하는 인자는 해시에서 제외되고 지문이 캐시 키 역할을 합니다)
+@st.cache_data(max_entries=64, ttl=3600, show_spinner=False)
+def cached_patent_stats(fingerprint: str, _patents: PatentTable) -> PatentStats:
+    """결과 지문별 통계"""
+    return get_patent_stats(_patents)
+
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False)
+def render_yearly_chart(fingerprint: str, korean_support: bool, _yearly_counts: Dict[str, int]) -> bytes:
+    """연도별 출원 차트 PNG - 결과 지문 + 한글 지원 여부별로 한 번만 그림"""
+    # matplotlib 차트 생성 (한글 폰트 자동 적용)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    years = sorted(_yearly_counts.keys())
+    counts = [_yearly_counts[year] for year in years]
+    
+    ax.bar(years, counts, color='#3b82f6', alpha=0.8)
+    
+    # 한글 지원 여부에 따라 제목 설정
+    if korean_support:
+        ax.set_title('연도별 특허 출원 현황', fontsize=16, fontweight='bold')
+        ax.set_xlabel('연도', fontsize=12)
+        ax.set_ylabel('출원 건수', fontsize=12)
+    else:
+        ax.set_title('Patent Applications by Year', fontsize=16, fontweight='bold')
+        ax.set_xlabel('Year', fontsize=12)
+        ax.set_ylabel('Applications', fontsize=12)
+    
+    ax.grid(True, alpha=0.3)
+    plt.setp(ax.get_xticklabels(), rotation=45)
+    fig.tight_layout()
+    
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100)
+    plt.close(fig)  # 메모리 정리
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=8, ttl=3600, show_spinner=False)
+def cached_export(fingerprint: str, export_format: str, _patents: PatentTable) -> bytes:
+    """결과 지문 + 형식별 내보내기 파일 내용"""
+    return export_bytes(_patents, export_format)
+
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def cached_page_records(fingerprint: str, start_idx: int, page_size: int, _patents: PatentTable) -> List[Dict]:
+    """특허 카드 한 페이지 분량의 표시용 데이터"""
+    return _patents[start_idx:start_idx + page_size].to_dicts()
+
+# 🔄 백그라운드 작업 - 검색/분석은 작업 스레드에서 실행하고 화면은 진행 상황만 폴링
+JOB_POLL_SECONDS = 1.0
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """프로세스 공용 작업 관리자 - 모든 세션이 같은 작업 레지스트리를 공유"""
+    return JobManager()
+
+def run_search_job(job: Job, search_mode: str, search_query: str, max_results: int,
+                   semantic_rerank: bool, index_mode: str) -> PatentTable:
+    """검색 작업 - 페이지 도착 즉시 진행률과 미리보기를 작업 상태에 기록"""
+    if search_mode not in ("🔍 키워드 검색", "🏢 출원인 검색"):
+        patent_detail = get_patent_details(KIPRIS_API_KEY, search_query, index_mode=index_mode)
+        return PatentTable.from_records([patent_detail] if patent_detail else [])
+    
+    patents = PatentTable()
+    streamed_titles = []
+    for event in iter_patents(KIPRIS_API_KEY, search_query, max_results,
+                              semantic_rerank=semantic_rerank, index_mode=index_mode):
+        if event["type"] == "local":
+            job.update(event["progress"], f"💾 로컬 인덱스에서 {event['collected']:,}건 확보 ({event['field']})")
+        elif event["type"] == "page":
+            job.update(event["progress"], f"📡 {event['field']} {event['page']}/{event['needed_pages']} 페이지 "
+                                          f"({event['collected']:,}건 수집)")
+        elif event["type"] == "done":
+            patents = event["patents"]
+        
+        if event["type"] in ("local", "page") and len(streamed_titles) < 5 and event["patents"]:
+            streamed_titles.extend(p.get('title', 'N/A') for p in event["patents"][:5 - len(streamed_titles)])
+            job.update(preview=list(streamed_titles))
+    return patents
+
+def run_analysis_job(job: Job, analyzer: AdvancedPatentAnalyzer, patents: PatentTable, analysis_key: str,
+                     user_question: str, full_corpus: bool) -> Dict:
+    """분석 작업 - 정밀 분석은 단계별 진행률, 일반 분석은 생성 중인 텍스트를 작업 상태에 기록
+    
+    분석기는 세션 안의 작업들이 공유하므로 소요 시간/프롬프트 크기는 분석기 속성이 아니라 반환값에서 받습니다.
+    """
+    if full_corpus:
+        result = analyzer.map_reduce_analysis(
+            patents, analysis_key, user_question,
+            progress_callback=lambda stage, progress: job.update(progress, f"🧠 {stage}...")
+        )
+        return {"text": result.text, "stages": result.stages, "prompt_build": result.prompt_build}
+    
+    prompt_build = analyzer.build_analysis_prompt(patents, analysis_key, user_question)
+    chunks = []
+    last_update = 0.0
+    for chunk in analyzer.comprehensive_analysis_stream(patents, analysis_key, user_question, prompt_build=prompt_build):
+        chunks.append(str(chunk))
+        # 전체 버퍼 이어붙이기는 화면 폴링 주기의 절반마다만 (조각마다 하면 O(n²))
+        now = time.monotonic()
+        if now - last_update >= JOB_POLL_SECONDS / 2:
+            job.update(message="✍️ 보고서 작성 중...", partial="".join(chunks))
+            last_update = now
+    return {"text": "".join(chunks), "stages": {}, "prompt_build": prompt_build}
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def search_job_status():
+    """검색 작업 진행 표시 - 끝나면 결과를 저장하고 전체 화면을 다시 그림"""
+    request = st.session_state.get('search_job')
+    job = get_job_manager().get(request['id']) if request else None
+    if job is None:
+        st.session_state.pop('search_job', None)
+        return
+    
+    if not job.finished:
+        st.progress(job.progress, text=job.message or "🔍 최적 검색 전략 분석 중...")
+        preview = job.details.get('preview')
+        if preview:
+            st.markdown("**🆕 먼저 도착한 특허**\n" + "\n".join(f"- {t}" for t in preview))
+        shared = f" · 같은 검색 {job.subscribers}건이 작업 하나를 공유" if job.subscribers > 1 else ""
+        st.caption(f"⏳ {job.elapsed:.0f}초 경과{shared} - 다른 설정을 바꿔도 검색은 계속됩니다")
+        return
+    
+    del st.session_state['search_job']
+    if job.status == "error":
+        st.error(f"검색 중 오류: {job.error}")
+        return
+    
+    # 🔥 안전한 결과 저장 - boolean 값 제거
+    valid_patents = safe_get_valid_patents(job.result)
+    store_search_results(valid_patents, request['query'], request['mode'], job.elapsed)
+    st.session_state.pop('refresh_diff', None)
+    st.session_state.perf_phases['검색'] = job.spans
+    st.rerun()
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def analysis_job_status():
+    """분석 작업 진행 표시 - 생성 중인 보고서를 보여주고, 끝나면 결과를 저장"""
+    request = st.session_state.get('analysis_job')
+    job = get_job_manager().get(request['id']) if request else None
+    if job is None:
+        st.session_state.pop('analysis_job', None)
+        return
+    
+    if not job.finished:
+        st.markdown(f"### 🧠 {request['type']} 진행 중...")
+        st.progress(job.progress, text=job.message or "🧠 분석 준비 중...")
+        partial = job.details.get('partial')
+        if partial:
+            st.markdown(partial)
+        shared = f" · 같은 분석 {job.subscribers}건이 작업 하나를 공유" if job.subscribers > 1 else ""
+        st.caption(f"⏳ {job.elapsed:.0f}초 경과{shared}")
+        return
+    
+    del st.session_state['analysis_job']
+    if job.status == "error":
+        st.error(f"AI 분석 중 오류가 발생했습니다: {job.error}")
+        return
+    
+    # 결과 저장 (JSON/PDF 다운로드용 전체 텍스트)
+    st.session_state.analysis_result = job.result["text"]
+    st.session_state.analysis_stages = job.result["stages"]
+    st.session_state.analysis_prompt = job.result["prompt_build"]
+    st.session_state.analysis_type = request['type']
+    st.session_state.analysis_time = job.elapsed
+    st.session_state.user_question = request['question']
+    st.session_state.perf_phases['AI 분석'] = job.spans
+    st.rerun()
 
 if not KIPRIS_API_KEY or not GEMINI_API_KEY:
     st.error("API 키가 설정되지 않았습니다.")
@@ -142,9 +340,15 @@ st.markdown('<div class="sub-title">AttributeError 완전 해결 + 모든 기능
 
 # 🔥 세션 상태 초기화 (완전 안전한 초기화) - boolean 값 제거!
 if 'patents' not in st.session_state:
-    st.session_state.patents = []  # 빈 리스트로 초기화!
-if 'analyzer' not in st.session_state:
-    st.session_state.analyzer = AdvancedPatentAnalyzer(GEMINI_API_KEY)
+    st.session_state.patents = PatentTable()  # 빈 테이블로 초기화!
+if 'perf_phases' not in st.session_state:
+    st.session_state.perf_phases = {}  # 단계 이름 -> 마지막 실행의 SpanCollector
+
+# 🤖 프로세스 공용 분석기 - 실행별 정보는 AnalysisResult로 돌려받으므로 세션 간에 공유
+analyzer = get_analyzer(GEMINI_API_KEY)
+
+# ⏱️ 이번 실행의 화면 렌더링 구간 (통계/차트/목록 준비)
+render_spans = SpanCollector()
 
 # 사이드바 - 검색 설정
 with st.sidebar:
@@ -180,6 +384,24 @@ with st.sidebar:
     st.subheader("⚙️ 고급 설정")
     max_results = st.slider("최대 검색 결과:", 50, 500, 200, 50, 
                            help="AI가 관련성을 분석하여 상위 N건만 선별합니다")
+    # 로컬 인덱스가 없으면(비활성화/초기화 실패) 로컬 우선/오프라인은 선택지에서 제외
+    index_mode_options = {"🌐 온라인": "online", "💾 로컬 우선": "local_first", "📴 오프라인": "offline"}
+    if get_default_index() is None:
+        index_mode_options = {"🌐 온라인": "online"}
+    index_mode_label = st.radio(
+        "수집 방식:",
+        list(index_mode_options),
+        horizontal=True,
+        help="로컬 우선: 이전에 수집한 특허로 즉시 답하고 늘어난 건수만 KIPRIS에 요청 / 오프라인: 로컬 인덱스만 사용"
+             + ("" if len(index_mode_options) > 1 else " (로컬 인덱스를 사용할 수 없어 온라인만 가능)")
+    )
+    index_mode = index_mode_options[index_mode_label]
+    semantic_rerank = st.checkbox(
+        "🧬 의미 기반 재정렬 (로컬 임베딩)",
+        value=False,
+        disabled=not is_rerank_available(),
+        help="후보를 2배로 수집한 뒤 검색어와의 의미 유사도로 상위 N건을 다시 고릅니다 (sentence-transformers 필요, CPU 전용)"
+    )
     
     # AI 분석 모드
     st.subheader("🧠 AI 분석 모드")
@@ -198,44 +420,67 @@ with st.sidebar:
         st.markdown("---")
         st.subheader("📊 실시간 통계")
         
-        # 안전한 특허 데이터 필터링
+        # 안전한 특허 데이터 필터링 + 결과 집합별 1회 계산된 통계
         valid_patents = safe_get_valid_patents(st.session_state.patents)
-        total = len(valid_patents)
+        with render_spans.span("app.stats"):
+            stats = cached_patent_stats(get_result_fingerprint(valid_patents), valid_patents)
+        total = stats.total_count
         
         if total > 0:
             st.metric("수집된 특허", f"{total:,}건")
-            
-            # 최신 특허 비율 (완전 안전한 처리)
-            try:
-                recent_patents = 0
-                for p in valid_patents:
-                    if isinstance(p, dict):
-                        app_date = p.get('app_date', '')
-                        if app_date and len(str(app_date)) >= 4:
-                            year = str(app_date)[:4]
-                            if year >= '2020':
-                                recent_patents += 1
-                
-                recent_ratio = (recent_patents / total * 100) if total > 0 else 0
-                st.metric("최신 특허(2020년 이후)", f"{recent_ratio:.1f}%")
-            except Exception as e:
-                st.metric("최신 특허(2020년 이후)", "계산 중 오류")
-            
-            # 등록 특허 비율 (완전 안전한 처리)
-            try:
-                registered = 0
-                for p in valid_patents:
-                    if isinstance(p, dict):
-                        reg_status = p.get('reg_status', '')
-                        if '등록' in str(reg_status):
-                            registered += 1
-                
-                reg_ratio = (registered / total * 100) if total > 0 else 0
-                st.metric("등록 특허", f"{reg_ratio:.1f}%")
-            except Exception as e:
-                st.metric("등록 특허", "계산 중 오류")
+            st.metric("최신 특허(2020년 이후)", f"{stats.recent_ratio:.1f}%")
+            st.metric("등록 특허", f"{stats.registered_ratio:.1f}%")
         else:
             st.warning("유효한 특허 데이터가 없습니다.")
+    
+    # 💾 저장된 검색 - 워터마크 이후 변경분만 다시 조회 (저장소를 열 수 없으면 숨김)
+    saved_store = get_saved_search_store()
+    if saved_store is not None:
+        st.markdown("---")
+        st.subheader("💾 저장된 검색")
+        if st.session_state.patents and st.session_state.get('search_query'):
+            save_name = st.text_input("저장 이름:", value=st.session_state.search_query, key="save_name")
+            if st.button("💾 현재 결과 저장", use_container_width=True) and save_name.strip():
+                saved = saved_store.save(save_name.strip(), st.session_state.search_query,
+                                         safe_get_valid_patents(st.session_state.patents))
+                st.success(f"'{saved.name}' 저장 완료 ({len(saved.patents):,}건, 기준 출원일 {saved.watermark or '-'})")
+        
+        saved_names = saved_store.list_names()
+        if saved_names:
+            selected_saved = st.selectbox("저장된 검색 선택:", saved_names)
+            load_col, refresh_col = st.columns(2)
+            with load_col:
+                load_saved = st.button("📂 불러오기", use_container_width=True)
+            with refresh_col:
+                refresh_saved = st.button("🔄 새로고침", use_container_width=True,
+                                          help="마지막 출원일 이후 특허와 심사 중 특허의 상태 변경만 조회합니다")
+            
+            if load_saved or refresh_saved:
+                try:
+                    load_start_time = time.time()
+                    if refresh_saved:
+                        with st.spinner("🔄 변경분 조회 중..."), SpanCollector() as refresh_spans:
+                            saved, diff = saved_store.refresh(KIPRIS_API_KEY, selected_saved)
+                        st.session_state.perf_phases['저장된 검색 새로고침'] = refresh_spans
+                        st.session_state.refresh_diff = diff
+                    else:
+                        saved = saved_store.get(selected_saved)
+                        st.session_state.pop('refresh_diff', None)
+                    store_search_results(saved.patents, saved.keyword, f"💾 {saved.name}", time.time() - load_start_time)
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"저장된 검색 처리 중 오류: {e}")
+        else:
+            st.caption("저장된 검색이 없습니다.")
+    
+    # AI 응답 캐시 현황
+    llm_cache_stats = analyzer.cache_stats()
+    if llm_cache_stats:
+        st.caption(f"🗄️ AI 캐시: 적중 {llm_cache_stats['hits']}회 / 실패 {llm_cache_stats['misses']}회 "
+                   f"({llm_cache_stats['hit_rate']:.0f}%)")
+    
+    show_perf_panel = st.checkbox("⏱️ 성능 패널 표시", value=False,
+                                  help="검색/분석/PDF/화면 렌더링의 구간별 소요 시간을 페이지 하단에 표시합니다")
 
 # =============================================================================
 # 메인 콘텐츠 - 위아래 레이아웃
@@ -252,62 +497,16 @@ with search_col1:
         if not search_query.strip():
             st.warning("검색어를 입력해주세요.")
         else:
-            search_start_time = time.time()
+            # 백그라운드 작업으로 실행 - 위젯을 조작해 화면이 다시 실행되어도 수집은 계속됨
+            job = get_job_manager().submit(
+                ("search", search_mode, search_query.strip(), max_results, semantic_rerank, index_mode),
+                run_search_job, search_mode, search_query.strip(), max_results, semantic_rerank, index_mode,
+                label=f"검색: {search_query.strip()}"
+            )
+            st.session_state.search_job = {"id": job.id, "query": search_query.strip(), "mode": search_mode}
             
-            with st.spinner("🧠 AI가 대량의 특허를 분석하고 있습니다..."):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                try:
-                    status_text.text("🔍 최적 검색 전략 분석 중...")
-                    progress_bar.progress(10)
-                    
-                    status_text.text("📡 KIPRIS API 대량 호출 중...")
-                    progress_bar.progress(30)
-                    
-                    # 검색 실행
-                    if search_mode == "🔍 키워드 검색":
-                        patents = search_all_patents(
-                            KIPRIS_API_KEY, 
-                            search_query, 
-                            [],  # 내부에서 스마트 선택
-                            max_results
-                        )
-                    elif search_mode == "🏢 출원인 검색":
-                        patents = search_all_patents(
-                            KIPRIS_API_KEY, 
-                            search_query, 
-                            ['applicantName'],
-                            max_results
-                        )
-                    else:
-                        patent_detail = get_patent_details(KIPRIS_API_KEY, search_query)
-                        patents = [patent_detail] if patent_detail else []
-                    
-                    progress_bar.progress(80)
-                    status_text.text("🤖 AI가 관련성을 분석하여 필터링 중...")
-                    
-                    # 🔥 안전한 결과 저장 - boolean 값 제거
-                    valid_patents = safe_get_valid_patents(patents)
-                    st.session_state.patents = valid_patents
-                    st.session_state.search_query = search_query
-                    st.session_state.search_time = time.time() - search_start_time
-                    st.session_state.search_mode = search_mode
-                    
-                    progress_bar.progress(100)
-                    
-                    if valid_patents:
-                        status_text.success(f"✅ {len(valid_patents)}건 발견! (소요시간: {st.session_state.search_time:.1f}초)")
-                    else:
-                        status_text.error("❌ 검색 결과가 없습니다.")
-                    
-                    time.sleep(2)
-                    progress_bar.empty()
-                    status_text.empty()
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"검색 중 오류: {e}")
+    if st.session_state.get('search_job'):
+        search_job_status()
 
 with search_col2:
     # 안전한 현재 상태 표시
@@ -315,10 +514,31 @@ with search_col2:
     if valid_patents:
         st.info(f"**현재 수집된 특허**\n{len(valid_patents):,}건")
 
+# 🔄 저장된 검색 새로고침 변경 내역
+refresh_diff = st.session_state.get('refresh_diff')
+if refresh_diff is not None:
+    with st.expander(f"🔄 새로고침 결과: {refresh_diff.summary()}", expanded=refresh_diff.has_changes):
+        if refresh_diff.added:
+            st.markdown("**🆕 신규 특허**")
+            for patent in refresh_diff.added[:20]:
+                st.write(f"- {patent.app_date} | {patent.title} ({patent.applicant})")
+            if len(refresh_diff.added) > 20:
+                st.caption(f"외 {len(refresh_diff.added) - 20}건")
+        if refresh_diff.status_changes:
+            st.markdown("**⚖️ 등록상태 변경**")
+            for patent, old_status in refresh_diff.status_changes:
+                st.write(f"- {patent.title}: {old_status} → {patent.reg_status}")
+        if not refresh_diff.has_changes:
+            st.info("변경된 특허가 없습니다.")
+        st.caption(f"조회 페이지 {refresh_diff.pages_fetched}개 · 상태 확인 {refresh_diff.status_checked}건")
+
 # 🔥 검색 결과가 있을 때만 표시 - 완전 안전한 처리
 valid_patents = safe_get_valid_patents(st.session_state.patents)
 if valid_patents:
     patents = valid_patents  # 유효한 특허만 사용
+    result_fingerprint = get_result_fingerprint(patents)
+    with render_spans.span("app.stats"):
+        stats = cached_patent_stats(result_fingerprint, patents)
     
     # 성공 배너
     st.markdown(f"""
@@ -340,26 +560,14 @@ if valid_patents:
         st.markdown('</div>', unsafe_allow_html=True)
     
     with col_m2:
-        try:
-            unique_applicants = len(set(p.get('applicant', 'N/A') for p in patents if isinstance(p, dict)))
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("참여 기업", f"{unique_applicants}개")
-            st.markdown('</div>', unsafe_allow_html=True)
-        except:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("참여 기업", "계산 오류")
-            st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("참여 기업", f"{stats.unique_applicants}개")
+        st.markdown('</div>', unsafe_allow_html=True)
     
     with col_m3:
-        try:
-            registered = len([p for p in patents if isinstance(p, dict) and '등록' in str(p.get('reg_status', ''))])
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("등록 특허", f"{registered}건")
-            st.markdown('</div>', unsafe_allow_html=True)
-        except:
-            st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-            st.metric("등록 특허", "계산 오류")
-            st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('<div class="metric-card">', unsafe_allow_html=True)
+        st.metric("등록 특허", f"{stats.registered_count}건")
+        st.markdown('</div>', unsafe_allow_html=True)
     
     with col_m4:
         if 'search_time' in st.session_state:
@@ -370,44 +578,52 @@ if valid_patents:
     # 연도별 출원 현황 차트 (안전한 처리)
     st.markdown("### 📈 연도별 특허 출원 현황")
     
-    years_data = {}
-    for patent in patents:
-        if isinstance(patent, dict):  # 🔥 딕셔너리인지 확인
-            app_date = patent.get('app_date', '')
-            if app_date and len(str(app_date)) >= 4:
-                try:
-                    year = str(app_date)[:4]
-                    if year.isdigit():  # 연도가 숫자인지 확인
-                        years_data[year] = years_data.get(year, 0) + 1
-                except:
-                    continue
+    years_data = stats.yearly_counts
     
     if years_data:
-        # matplotlib 차트 생성 (한글 폰트 자동 적용)
-        fig, ax = plt.subplots(figsize=(12, 6))
-        years = sorted(years_data.keys())
-        counts = [years_data[year] for year in years]
-        
-        ax.bar(years, counts, color='#3b82f6', alpha=0.8)
-        
-        # 한글 지원 여부에 따라 제목 설정
-        if st.session_state.get('korean_support', False):
-            ax.set_title('연도별 특허 출원 현황', fontsize=16, fontweight='bold')
-            ax.set_xlabel('연도', fontsize=12)
-            ax.set_ylabel('출원 건수', fontsize=12)
-        else:
-            ax.set_title('Patent Applications by Year', fontsize=16, fontweight='bold')
-            ax.set_xlabel('Year', fontsize=12)
-            ax.set_ylabel('Applications', fontsize=12)
-        
-        ax.grid(True, alpha=0.3)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close(fig)  # 메모리 정리
+        with render_spans.span("app.chart"):
+            chart_png = render_yearly_chart(result_fingerprint, st.session_state.get('korean_support', False), years_data)
+        st.image(chart_png, use_container_width=True)
     else:
         st.info("연도별 데이터가 충분하지 않습니다.")
     
+    # 특허 목록 내보내기 - 미리보기 페이지가 아닌 전체 결과
+    st.markdown("### 💾 특허 목록 내보내기")
+    
+    export_labels = {
+        "csv": "CSV (엑셀 호환)",
+        "xlsx": "XLSX (엑셀)",
+        "parquet": "Parquet (데이터 파이프라인)",
+        "jsonl": "JSONL (데이터 파이프라인)"
+    }
+    export_mimes = {
+        "csv": "text/csv",
+        "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "parquet": "application/vnd.apache.parquet",
+        "jsonl": "application/jsonl"
+    }
+    export_col1, export_col2 = st.columns([2, 1])
+    with export_col1:
+        export_format = st.selectbox("파일 형식:", EXPORT_FORMATS, format_func=export_labels.get)
+    with export_col2:
+        st.write("")
+        if st.button(f"📦 전체 {len(patents):,}건 파일 만들기", use_container_width=True):
+            st.session_state.export_request = (result_fingerprint, export_format)
+    
+    # 같은 결과/형식이면 재실행 시 다시 만들지 않고 캐시된 파일 사용
+    if st.session_state.get('export_request') == (result_fingerprint, export_format):
+        try:
+            export_data = cached_export(result_fingerprint, export_format, patents)
+            st.download_button(
+                f"⬇️ {export_format.upper()} 다운로드 ({len(export_data) / 1024:,.0f}KB)",
+                data=export_data,
+                file_name=f"특허목록_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}",
+                mime=export_mimes[export_format],
+                use_container_width=True
+            )
+        except Exception as e:
+            st.error(f"내보내기 중 오류: {e}")
+    
     # 특허 목록 미리보기
     st.markdown("### 📋 특허 목록 미리보기")
     
@@ -419,18 +635,40 @@ if valid_patents:
     if total_pages > 1:
         current_page = st.selectbox("페이지 선택:", range(1, total_pages + 1))
         start_idx = (current_page - 1) * page_size
-        end_idx = start_idx + page_size
-        display_patents = patents[start_idx:end_idx]
+        with render_spans.span("app.page_records"):
+            display_patents = cached_page_records(result_fingerprint, start_idx, page_size, patents)
         st.info(f"📄 페이지 {current_page}/{total_pages} (전체 {len(patents)}건 중 {len(display_patents)}건 표시)")
     else:
-        display_patents = patents[:page_size]
         start_idx = 0
+        with render_spans.span("app.page_records"):
+            display_patents = cached_page_records(result_fingerprint, start_idx, page_size, patents)
+    
+    # 🤖 일괄 AI 요약 - 여러 특허를 한 번의 요청으로 요약
+    summaries = st.session_state.setdefault('summaries', {})
+    summary_col1, summary_col2 = st.columns(2)
+    with summary_col1:
+        summarize_page = st.button("🤖 이 페이지 AI 요약", use_container_width=True)
+    with summary_col2:
+        summarize_all = st.button(f"🤖 전체 {len(patents)}건 AI 요약", use_container_width=True)
+    
+    if summarize_page or summarize_all:
+        targets = display_patents if summarize_page else patents
+        pending = [p for p in targets if p.get('app_num') not in summaries]
+        if pending:
+            summary_progress = st.progress(0)
+            with st.spinner(f"AI 일괄 요약 중... ({len(pending)}건)"):
+                try:
+                    summaries.update(analyzer.batch_summarize(
+                        pending,
+                        progress_callback=lambda done, total: summary_progress.progress(done / total)
+                    ))
+                except Exception as e:
+                    st.error(f"AI 요약 중 오류: {e}")
+            summary_progress.empty()
+        st.success(f"✅ {len(targets)}건 요약 완료 - 각 카드에서 확인하세요")
     
     # 🔥 특허 카드 표시 (안전한 처리)
     for i, patent in enumerate(display_patents):
-        if not isinstance(patent, dict):  # 딕셔너리가 아니면 건너뛰기
-            continue
-            
         with st.expander(f"**{start_idx + i + 1}. {patent.get('title', 'N/A')}**"):
             if display_mode == "📝 요약형":
                 col_info, col_action = st.columns([2, 1])
@@ -453,11 +691,14 @@ if valid_patents:
                         st.markdown(f"• [기존 KIPRIS](http://kpat.kipris.or.kr/kpat/biblio.do?method=biblioFrame&applno={clean_num})")
                         st.markdown(f"• [검색으로 찾기](https://plus.kipris.or.kr/kpat/search/totalSearch.do?param1={app_num})")
                     
-                    if st.button("🤖 AI 요약", key=f"summary_{start_idx + i}"):
+                    if app_num in summaries:
+                        st.success("**🎯 AI 요약:**")
+                        st.info(summaries[app_num])
+                    elif st.button("🤖 AI 요약", key=f"summary_{start_idx + i}"):
                         with st.spinner("AI 요약 중..."):
                             abstract = patent.get('abstract', '')
                             try:
-                                summary = st.session_state.analyzer.quick_summarize(abstract)
+                                summary = analyzer.quick_summarize(abstract)
                                 st.success("**🎯 AI 요약:**")
                                 st.info(summary)
                             except Exception as e:
@@ -514,41 +755,31 @@ if valid_patents:
         - 예상 소요시간: 30-60초
         """)
         
-        if st.button("🚀 AI 분석 시작", type="secondary", use_container_width=True):
-            analysis_start_time = time.time()
-            
-            with st.spinner(f"🧠 {analysis_type} 수행 중... 대량 데이터를 분석하고 있습니다."):
-                try:
-                    # 분석 타입 매핑
-                    analysis_map = {
-                        "🏆 경쟁기관 분석": "competitive_analysis",
-                        "📈 기술 동향 분석": "trend_analysis",
-                        "🔮 향후 방향 예측": "future_direction",
-                        "📊 종합 분석": "comprehensive_analysis"
-                    }
-                    
-                    analysis_key = analysis_map.get(analysis_type, "competitive_analysis")
-                    
-                    # 🔥 안전한 특허 데이터만 AI 분석에 사용
-                    result = st.session_state.analyzer.comprehensive_analysis(
-                        valid_patents,  # 검증된 데이터만 사용
-                        analysis_key,
-                        user_question
-                    )
-                    
-                    analysis_time = time.time() - analysis_start_time
-                    
-                    # 결과 저장
-                    st.session_state.analysis_result = result
-                    st.session_state.analysis_type = analysis_type
-                    st.session_state.analysis_time = analysis_time
-                    st.session_state.user_question = user_question
-                    
-                    st.success(f"✅ 분석 완료! (소요시간: {analysis_time:.1f}초)")
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"AI 분석 중 오류가 발생했습니다: {e}")
+        full_corpus = st.checkbox("📚 전체 특허 정밀 분석", value=False,
+                                  help="모든 초록을 나누어 분석한 뒤 병합합니다 (맵리듀스, 표본 대신 전체 반영) - "
+                                       "청크마다 LLM 호출이 추가되고 보고서가 스트리밍되지 않습니다")
+        start_analysis = st.button("🚀 AI 분석 시작", type="secondary", use_container_width=True)
+    
+    if start_analysis:
+        # 분석 타입 매핑
+        analysis_map = {
+            "🏆 경쟁기관 분석": "competitive_analysis",
+            "📈 기술 동향 분석": "trend_analysis",
+            "🔮 향후 방향 예측": "future_direction",
+            "📊 종합 분석": "comprehensive_analysis"
+        }
+        analysis_key = analysis_map.get(analysis_type, "competitive_analysis")
+        
+        # 백그라운드 작업으로 실행 - 같은 결과 집합/유형/질문의 분석은 세션이 달라도 하나로 합침
+        job = get_job_manager().submit(
+            ("analysis", get_result_fingerprint(valid_patents), analysis_key, user_question, full_corpus),
+            run_analysis_job, analyzer, valid_patents, analysis_key, user_question, full_corpus,
+            label=f"분석: {analysis_type}"
+        )
+        st.session_state.analysis_job = {"id": job.id, "type": analysis_type, "question": user_question}
+    
+    if st.session_state.get('analysis_job'):
+        analysis_job_status()
     
     # AI 분석 결과 표시
     if 'analysis_result' in st.session_state:
@@ -562,6 +793,31 @@ if valid_patents:
         - 분석 일시: {datetime.now().strftime('%Y-%m-%d %H:%M')}
         """)
         
+        # 프롬프트 크기 (토큰 예산 대비 사용량, 포함된 근거 특허 수)
+        prompt_build = st.session_state.get('analysis_prompt')
+        if prompt_build is not None:
+            st.caption(
+                f"📏 프롬프트 {prompt_build.total_tokens:,}토큰{'' if prompt_build.exact else ' (추정)'} / "
+                f"예산 {prompt_build.budget_tokens:,}토큰 · 근거 특허 {prompt_build.evidence_included:,}/"
+                f"{prompt_build.evidence_total:,}건 포함"
+            )
+            if prompt_build.truncated_sections or prompt_build.over_budget:
+                st.warning("⚠️ 프롬프트가 토큰 예산을 넘어 "
+                           + (f"잘라낸 섹션: {', '.join(prompt_build.truncated_sections)}"
+                              if prompt_build.truncated_sections else "예산 초과 상태로 전송되었습니다"))
+        
+        # 정밀 분석 단계별 소요 시간
+        stages = st.session_state.get('analysis_stages') or {}
+        if stages:
+            st.caption(
+                f"⏱️ 청크 {stages.get('chunks', 0)}개 · 병합 {stages.get('reduce_levels', 0)}단계 | "
+                f"분할 {stages.get('chunk', 0):.1f}초 · 추출 {stages.get('map', 0):.1f}초 · "
+                f"병합 {stages.get('reduce', 0):.1f}초 · 보고서 {stages.get('final', 0):.1f}초"
+            )
+            if stages.get('missing'):
+                st.warning(f"⚠️ 분석 단계 오류 {stages.get('failed_calls', 0)}회로 "
+                           f"{stages['missing']:,}건이 분석 노트에서 빠졌습니다 ({stages.get('covered', 0):,}건 반영)")
+        
         # 분석 결과 표시
         st.markdown('<div class="analysis-result">', unsafe_allow_html=True)
         st.markdown(st.session_state.analysis_result)
@@ -598,57 +854,38 @@ if valid_patents:
             # PDF 다운로드
             if st.button("📑 PDF 보고서 생성", use_container_width=True):
                 try:
-                    with st.spinner("📑 전문 PDF 보고서를 생성 중입니다..."):
-                        # PDF 생성용 데이터 준비 (안전한 처리)
+                    with st.spinner("📑 전문 PDF 보고서를 생성 중입니다..."), SpanCollector() as pdf_spans:
+                        # PDF 생성용 데이터 준비 (공용 통계 재사용)
+                        stats = cached_patent_stats(get_result_fingerprint(valid_patents), valid_patents)
                         pdf_data = {
                             "search_query": st.session_state.get('search_query', ''),
-                            "total_count": len(valid_patents),
-                            "top_applicants": {},
-                            "yearly_trends": {},
-                            "status_distribution": {}
+                            "total_count": stats.total_count,
+                            "top_applicants": stats.top_applicants(10),
+                            "yearly_trends": stats.yearly_counts,
+                            "status_distribution": stats.status_counts
                         }
                         
-                        # 통계 데이터 생성 (안전한 처리)
-                        applicants = {}
-                        years = {}
-                        statuses = {}
-                        
-                        for patent in valid_patents:
-                            if isinstance(patent, dict):
-                                # 출원인 통계
-                                applicant = patent.get('applicant', '정보없음')
-                                applicants[applicant] = applicants.get(applicant, 0) + 1
-                                
-                                # 연도별 통계
-                                app_date = patent.get('app_date', '')
-                                if app_date and len(str(app_date)) >= 4:
-                                    year = str(app_date)[:4]
-                                    if year.isdigit():
-                                        years[year] = years.get(year, 0) + 1
-                                
-                                # 상태별 통계
-                                status = patent.get('reg_status', '출원')
-                                statuses[status] = statuses.get(status, 0) + 1
-                        
-                        pdf_data["top_applicants"] = dict(sorted(applicants.items(), key=lambda x: x[1], reverse=True)[:10])
-                        pdf_data["yearly_trends"] = dict(sorted(years.items()))
-                        pdf_data["status_distribution"] = statuses
-                        
-                        # PDF 생성
-                        pdf_buffer = st.session_state.analyzer.generate_pdf_report(
+                        # PDF 생성 - 임시 파일로 기록 (전체 특허 부록 포함)
+                        pdf_report = build_pdf_report(
                             pdf_data, 
-                            st.session_state.analysis_result
+                            st.session_state.analysis_result,
+                            valid_patents
                         )
+                        try:
+                            pdf_bytes = pdf_report.read_bytes()
+                        finally:
+                            pdf_report.cleanup()
                         
                         st.download_button(
                             "📑 PDF 보고서 다운로드",
-                            data=pdf_buffer.getvalue(),
+                            data=pdf_bytes,
                             file_name=f"특허분석보고서_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
                             mime="application/pdf",
                             use_container_width=True
                         )
                         
-                        st.success("✅ PDF 보고서가 생성되었습니다!")
+                        st.success(f"✅ PDF 보고서가 생성되었습니다! ({pdf_report.summary()})")
+                    st.session_state.perf_phases['PDF 보고서'] = pdf_spans
                         
                 except Exception as e:
                     st.error(f"PDF 생성 중 오류: {e}")
@@ -688,6 +925,7 @@ else:
         ### 📊 3단계: 결과 활용
         - **실시간 시각화**: 한글 차트 완전 지원
         - **PDF 보고서**: 전문 문서 생성
+        - **목록 내보내기**: CSV/XLSX/Parquet/JSONL
         - **다중 KIPRIS 링크**: 안정적 접근
         
         비즈니스 의사결정에 바로 활용 가능합니다.
@@ -695,6 +933,24 @@ else:
     
     st.success("💡 **AttributeError 완전 해결**: 안전한 데이터 처리로 모든 환경에서 안정적 실행!")
 
+# ⏱️ 성능 패널 - 단계별 마지막 실행과 이번 화면 렌더링의 구간별 소요 시간
+if show_perf_panel:
+    with st.expander("⏱️ 성능 분석", expanded=True):
+        phases = {**st.session_state.perf_phases, '화면 렌더링 (이번 실행)': render_spans}
+        for phase_name, collector in phases.items():
+            rows = collector.summary()
+            if not rows:
+                continue
+            st.markdown(f"**{phase_name}** · 경과 {collector.wall_time:.2f}초")
+            st.dataframe(pd.DataFrame([{
+                "구간": row["label"],
+                "횟수": row["count"],
+                "합계(초)": round(row["total"], 3),
+                "평균(ms)": round(row["mean"] * 1000, 1),
+                "최대(ms)": round(row["max"] * 1000, 1),
+            } for row in rows]), hide_index=True, use_container_width=True)
+        st.caption("병렬로 실행되는 구간(네트워크 대기, LLM 응답 등)은 합계가 경과 시간보다 클 수 있습니다.")
+
 # 푸터
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,118 @@
+"""
+대량 수집 부하 벤치마크 - 로컬 가짜 KIPRIS 서버 대상으로 100/500/2000건 수집 성능 측정
+
+측정 항목: 초당 페이지 수, 페이지 지연 p50/p95 (재시도 포함), 메모리 최대치(tracemalloc), API 호출 수
+
+실행: python benchmarks/bench_harvest.py [--sizes 100 500 2000] [--latency 0.03] [--error-rate 0.02] [--mode pages|smart]
+  pages: 필드 하나에서 정확히 N건을 수집 (_iter_field_pages - 워커 풀/재시도/파싱/병합 경로)
+  smart: smart_comprehensive_search(max_results=N) 전체 경로 (필드 선택/수집 계획/조기 종료 포함)
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+import tracemalloc
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_kipris_server import FakeKiprisServer
+from src.kipris_handler import AdvancedKiprisOptimizer, TokenBucket
+from src.patent_table import PatentRecord
+
+KEYWORD = "배터리 제어"
+
+class TimedOptimizer(AdvancedKiprisOptimizer):
+    """페이지 요청별 소요 시간 기록 (재시도 대기 포함)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+    
+    def _search_field(self, keyword: str, field: str, page_no: int = 1, num_of_rows: int = 10,
+                      sort_by_date: bool = False) -> Optional[Tuple[List[PatentRecord], int]]:
+        started = time.perf_counter()
+        try:
+            return super()._search_field(keyword, field, page_no, num_of_rows, sort_by_date)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+def harvest(optimizer: TimedOptimizer, size: int, mode: str) -> int:
+    """N건 수집 - 수집된 고유 특허 수"""
+    if mode == "smart":
+        return len(optimizer.smart_comprehensive_search(KEYWORD, size, early_stop=True))
+    
+    field = "astrtCont"
+    first = optimizer._search_field(KEYWORD, field, 1, 10)
+    first_page = first[0] if first is not None else None
+    all_patents, scores = {}, {}
+    for _ in optimizer._iter_field_pages(KEYWORD, field, 0, 1, first_page, math.ceil(size / 10), False, False,
+                                         size, all_patents, scores):
+        pass
+    return len(all_patents)
+
+def run(size: int, args) -> dict:
+    server = FakeKiprisServer(args.fixtures, total_count=max(size, args.total_count), latency=args.latency,
+                              jitter=args.jitter, error_rate=args.error_rate, throttle_rps=args.throttle_rps,
+                              retry_after=0)
+    with server:
+        # 벤치마크마다 새 버킷 - 프로세스 공용 제한(KIPRIS_RATE_LIMIT)과 분리
+        optimizer = TimedOptimizer("benchmark", max_workers=args.workers, backoff_base=args.backoff,
+                                   rate_limiter=TokenBucket(args.rate, args.rate))
+        optimizer.base_url = server.url
+        
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            collected = harvest(optimizer, size, args.mode)
+        finally:
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            optimizer.close()
+    
+    pages = len(optimizer.latencies)
+    return {
+        "size": size, "collected": collected, "pages": pages, "elapsed": elapsed,
+        "pages_per_sec": pages / elapsed if elapsed else 0.0,
+        "p50": percentile(optimizer.latencies, 50), "p95": percentile(optimizer.latencies, 95),
+        "peak_mb": peak / 1024 / 1024, "api_calls": optimizer.network_count, "retries": optimizer.retry_count,
+        "failed": optimizer.failed_count, "server_requests": server.stats["requests"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="KIPRIS 대량 수집 벤치마크 (가짜 서버)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--mode", choices=("pages", "smart"), default="pages")
+    parser.add_argument("--workers", type=int, default=8, help="동시 페이지 요청 수")
+    parser.add_argument("--rate", type=float, default=200.0, help="클라이언트 호출 제한 (초당)")
+    parser.add_argument("--backoff", type=float, default=0.05, help="재시도 백오프 기준 (초)")
+    parser.add_argument("--fixtures", help="fixture 디렉터리")
+    parser.add_argument("--total-count", type=int, default=2000, help="서버의 검색어별 총 결과 수")
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--throttle-rps", type=float, default=0.0)
+    args = parser.parse_args()
+    
+    print(f"🧪 모드 {args.mode}, 워커 {args.workers}, 지연 {args.latency * 1000:.0f}+{args.jitter * 1000:.0f}ms, "
+          f"오류율 {args.error_rate:.0%}, 쓰로틀 {args.throttle_rps or '없음'}")
+    print(f"{'건수':>6} {'수집':>6} {'페이지':>6} {'시간(s)':>8} {'페이지/s':>9} {'p50(ms)':>8} {'p95(ms)':>8} "
+          f"{'메모리(MB)':>10} {'API':>5} {'재시도':>6} {'실패':>4} {'서버요청':>8}")
+    for size in args.sizes:
+        r = run(size, args)
+        print(f"{r['size']:>6} {r['collected']:>6} {r['pages']:>6} {r['elapsed']:>8.2f} {r['pages_per_sec']:>9.1f} "
+              f"{r['p50'] * 1000:>8.1f} {r['p95'] * 1000:>8.1f} {r['peak_mb']:>10.2f} {r['api_calls']:>5} "
+              f"{r['retries']:>6} {r['failed']:>4} {r['server_requests']:>8}")
+
+if __name__ == "__main__":
+    main()
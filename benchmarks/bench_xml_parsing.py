@@ -0,0 +1,110 @@
+"""
+KIPRIS XML 파싱 벤치마크 - 기존 ElementTree + 다중 .// 검색 방식 vs 단일 순회 스트리밍 파서
+
+실행: python benchmarks/bench_xml_parsing.py [item 수] [반복 횟수]
+"""
+
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.kipris_handler import AdvancedKiprisOptimizer, xml_parser
+
+def make_response(item_count: int) -> bytes:
+    """실제 KIPRIS 응답과 비슷한 구조의 XML 생성"""
+    items = []
+    for i in range(item_count):
+        items.append(f"""<item>
+<indexNo>{i + 1}</indexNo>
+<registerStatus>{'등록' if i % 2 else '공개'}</registerStatus>
+<inventionTitle>배터리 셀 온도 제어 장치 및 방법 {i}</inventionTitle>
+<ipcNumber>H01M 10/42|H01M 10/48</ipcNumber>
+<ipcCode>H01M 10/42</ipcCode>
+<registerNumber>{'10' + str(2000000 + i) if i % 2 else ''}</registerNumber>
+<registerDate>20230101</registerDate>
+<applicationNumber>10{20200000000 + i}</applicationNumber>
+<applicationDate>{2015 + i % 10}0315</applicationDate>
+<openNumber>10{20210000000 + i}</openNumber>
+<openDate>20210915</openDate>
+<publicationNumber></publicationNumber>
+<publicationDate></publicationDate>
+<astrtCont>본 발명은 배터리 셀의 온도를 실시간으로 측정하고 냉각 유로를 제어하여 열폭주를 방지하는 장치에 관한 것이다. {'가' * 300}</astrtCont>
+<drawing>http://plus.kipris.or.kr/kiprisplusws/fileToss.jsp?arg={i}</drawing>
+<bigDrawing>http://plus.kipris.or.kr/kiprisplusws/fileToss.jsp?arg={i}b</bigDrawing>
+<applicantName>주식회사 에너지솔루션{i % 13}</applicantName>
+<inventorName>홍길동;김철수;이영희</inventorName>
+</item>""")
+    return (
+        "<response><header><resultCode>00</resultCode><resultMsg>NORMAL SERVICE.</resultMsg>"
+        "<successYN>Y</successYN></header><body><items>" + "".join(items) +
+        f"</items><count><numOfRows>{item_count}</numOfRows><pageNo>1</pageNo>"
+        f"<totalCount>{item_count * 10}</totalCount></count></body></response>"
+    ).encode("utf-8")
+
+def legacy_parse(optimizer: AdvancedKiprisOptimizer, content: bytes):
+    """기존 구현 - 전체 트리 생성 후 item마다 .// 검색 10회 + 발명자 태그 12회 검색"""
+    root = ET.fromstring(content)
+    if root.findtext(".//successYN", "N") != "Y":
+        return None
+    total_count = int(root.findtext(".//totalCount", "0"))
+    patents = []
+    possible_tags = ['.//inventorName', './/inventor', './/invtNm', './/personName',
+                     './/inventors/inventor', './/inventors/inventorName']
+    for item in root.findall(".//item"):
+        app_num = item.findtext(".//applicationNumber", "").strip()
+        candidates = []
+        for tag_pattern in possible_tags:
+            for elem in item.findall(tag_pattern):
+                if elem.text and elem.text.strip():
+                    candidates.append(elem.text.strip())
+        for tag_pattern in possible_tags:
+            elem = item.find(tag_pattern)
+            if elem is not None and elem.text and elem.text.strip():
+                candidates.append(elem.text.strip())
+        patents.append({
+            "title": item.findtext(".//inventionTitle", "정보없음").strip(),
+            "app_num": app_num,
+            "abstract": item.findtext(".//astrtCont", "정보없음").strip(),
+            "applicant": item.findtext(".//applicantName", "정보없음").strip(),
+            "inventor": optimizer._format_inventors(candidates),
+            "app_date": item.findtext(".//applicationDate", "").strip(),
+            "reg_status": item.findtext(".//registerStatus", "출원").strip(),
+            "reg_num": item.findtext(".//registerNumber", "").strip(),
+            "kipris_url": optimizer._generate_kipris_url(app_num),
+            "link": optimizer._generate_kipris_url(app_num),
+            "ipc_code": item.findtext(".//ipcCode", "").strip()
+        })
+    return patents, total_count
+
+def best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    item_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    
+    optimizer = AdvancedKiprisOptimizer("benchmark")
+    content = make_response(item_count)
+    
+    # 두 경로의 결과가 동일한지 먼저 확인
+    patents, total_count = optimizer._parse_response(content)
+    assert legacy_parse(optimizer, content) == ([p.to_dict() for p in patents], total_count), "파싱 결과 불일치"
+    
+    legacy = best_of(lambda: legacy_parse(optimizer, content), repeat)
+    streaming = best_of(lambda: optimizer._parse_response(content), repeat)
+    optimizer.close()
+    
+    print(f"📦 item {item_count}건, 응답 {len(content) / 1024:.0f}KB, 파서: {xml_parser.__name__}")
+    print(f"   기존 방식:     {legacy * 1000:8.2f} ms")
+    print(f"   단일 순회 방식: {streaming * 1000:8.2f} ms  ({legacy / streaming:.2f}x)")
+
+if __name__ == "__main__":
+    main()
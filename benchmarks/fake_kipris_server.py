@@ -0,0 +1,220 @@
+"""
+로컬 KIPRIS 대체 서버 - 기록해 둔 XML 응답을 재생하며 지연/오류율/쓰로틀링을 흉내냄
+
+API 키와 네트워크 없이 수집 성능을 측정하거나 앱을 실행할 때 사용합니다.
+
+실행: python benchmarks/fake_kipris_server.py --port 8765 --latency 0.05 --error-rate 0.02
+     KIPRIS_BASE_URL=http://127.0.0.1:8765/getAdvancedSearch streamlit run app.py
+     (KIPRIS_BASE_URL을 바꾸면 응답 캐시/로컬 인덱스/저장된 검색은 엔드포인트별 디렉터리로 분리되어
+      합성 특허가 실제 KIPRIS 결과에 섞이지 않음)
+기록: python benchmarks/fake_kipris_server.py --record 배터리 반도체  (KIPRIS_API_KEY 필요)
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_xml_parsing import make_response
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# 요청 파라미터 중 검색어가 담기는 KIPRIS 필드
+SEARCH_FIELDS = ("astrtCont", "inventionTitle", "applicantName", "applicationNumber")
+
+_ITEM = re.compile(rb"<item>.*?</item>", re.S)
+
+def load_fixture_items(fixtures_dir: Optional[str] = None) -> List[bytes]:
+    """기록된 응답(*.xml)의 item 요소 목록 - 없으면 합성 응답 사용"""
+    items = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir or FIXTURES_DIR, "*.xml"))):
+        with open(path, "rb") as f:
+            items.extend(_ITEM.findall(f.read()))
+    return items or _ITEM.findall(make_response(50))
+
+class FakeKiprisServer:
+    """스레드 기반 가짜 KIPRIS 고급검색 서버
+    
+    검색어마다 total_count건의 결과가 있는 것처럼 페이지를 만들어 응답합니다. item 내용은 fixture를
+    순환 재사용하되 출원번호/출원일/제목은 (검색어, 순번)으로 결정되어, 같은 요청은 항상 같은 응답이고
+    검색어가 다르면 결과 일부만 겹칩니다. 출원일은 순번이 커질수록 과거라 최신순 정렬 응답처럼 보입니다.
+    
+    latency/jitter: 응답 전 대기 (초)
+    error_rate: HTTP 503 응답 확률
+    throttle_rps: 초당 허용 요청 수 - 넘으면 HTTP 429 + Retry-After (0이면 제한 없음)
+    """
+    
+    def __init__(self, fixtures_dir: Optional[str] = None, total_count: int = 2000, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, throttle_rps: float = 0.0, retry_after: int = 1,
+                 host: str = "127.0.0.1", port: int = 0, seed: int = 0):
+        self.items = load_fixture_items(fixtures_dir)
+        self.total_count = total_count
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.retry_after = retry_after
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0}
+        self._random = random.Random(seed)
+        self._recent = deque()  # 최근 1초 안의 요청 시각 (쓰로틀링 판단)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/getAdvancedSearch"
+    
+    def start(self) -> "FakeKiprisServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+    
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {key: 0 for key in self.stats}
+    
+    def _admit(self) -> int:
+        """요청 처리 여부 결정 - 응답할 HTTP 상태 코드"""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.throttle_rps > 0:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] >= 1.0:
+                    self._recent.popleft()
+                if len(self._recent) >= self.throttle_rps:
+                    self.stats["throttled"] += 1
+                    return 429
+                self._recent.append(now)
+            if self._random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return 503
+            self.stats["ok"] += 1
+            return 200
+    
+    def render_page(self, keyword: str, page_no: int, num_of_rows: int) -> bytes:
+        """(검색어, 페이지)에 해당하는 KIPRIS 형식 응답"""
+        offset = zlib.crc32(keyword.encode("utf-8")) % 8 * 100  # 검색어별 결과가 일부만 겹치도록
+        start = (page_no - 1) * num_of_rows
+        parts = []
+        for i in range(start, min(start + num_of_rows, self.total_count)):
+            serial = offset + i
+            app_date = date(2024, 12, 31) - timedelta(days=i * 15 * 365 // max(1, self.total_count))  # 15년 구간
+            item = self.items[serial % len(self.items)]
+            item = re.sub(rb"<applicationNumber>[^<]*", b"<applicationNumber>10%011d" % (20200000000 + serial), item)
+            item = re.sub(rb"<applicationDate>[^<]*", b"<applicationDate>" + app_date.strftime("%Y%m%d").encode(), item)
+            item = item.replace(b"<inventionTitle>", b"<inventionTitle>" + keyword.encode("utf-8") + b" ", 1)
+            parts.append(item)
+        return (
+            b"<response><header><resultCode>00</resultCode><resultMsg>NORMAL SERVICE.</resultMsg>"
+            b"<successYN>Y</successYN></header><body><items>" + b"".join(parts) +
+            b"</items><count><numOfRows>%d</numOfRows><pageNo>%d</pageNo><totalCount>%d</totalCount></count></body></response>"
+            % (num_of_rows, page_no, self.total_count)
+        )
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive - 클라이언트 연결 풀 재사용
+            
+            def do_GET(self):
+                params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+                if server.latency or server.jitter:
+                    time.sleep(server.latency + random.uniform(0, server.jitter))
+                
+                status = server._admit()
+                if status == 200:
+                    keyword = next((params[name] for name in SEARCH_FIELDS if name in params), "")
+                    body = server.render_page(keyword.strip("*"), int(params.get("pageNo", 1)),
+                                              int(params.get("numOfRows", 10)))
+                else:
+                    body = b""
+                
+                self.send_response(status)
+                self.send_header("Content-Type", "application/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        return Handler
+
+def record_fixtures(api_key: str, keywords: List[str], out_dir: str = FIXTURES_DIR, num_of_rows: int = 50):
+    """실제 KIPRIS 응답을 fixture로 기록 - 검색어마다 초록 검색 첫 페이지"""
+    from src.kipris_handler import DEFAULT_BASE_URL, create_session
+    
+    os.makedirs(out_dir, exist_ok=True)
+    session = create_session(1)
+    try:
+        for keyword in keywords:
+            response = session.get(DEFAULT_BASE_URL, params={"ServiceKey": api_key, "astrtCont": keyword,
+                                                             "numOfRows": num_of_rows, "pageNo": 1}, timeout=30)
+            path = os.path.join(out_dir, f"{zlib.crc32(keyword.encode('utf-8')):08x}.xml")
+            with open(path, "wb") as f:
+                f.write(response.content)
+            print(f"💾 '{keyword}': {len(_ITEM.findall(response.content))}건 -> {path}")
+    finally:
+        session.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 KIPRIS 대체 서버")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fixtures", help=f"fixture 디렉터리 (기본: {FIXTURES_DIR}, 없으면 합성 응답)")
+    parser.add_argument("--total-count", type=int, default=2000, help="검색어별 총 결과 수")
+    parser.add_argument("--latency", type=float, default=0.05, help="응답 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="추가 무작위 지연 상한 (초)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 503 확률")
+    parser.add_argument("--throttle-rps", type=float, default=0.0, help="초당 허용 요청 수 (0이면 제한 없음)")
+    parser.add_argument("--record", nargs="+", metavar="KEYWORD", help="실제 KIPRIS 응답을 fixture로 기록하고 종료")
+    args = parser.parse_args()
+    
+    if args.record:
+        from dotenv import load_dotenv
+        load_dotenv()
+        record_fixtures(os.getenv("KIPRIS_API_KEY", ""), args.record, args.fixtures or FIXTURES_DIR)
+        return
+    
+    server = FakeKiprisServer(args.fixtures, args.total_count, args.latency, args.jitter, args.error_rate,
+                              args.throttle_rps, port=args.port)
+    print(f"🧪 가짜 KIPRIS 서버: {server.url} (fixture item {len(server.items)}개)")
+    print(f"   KIPRIS_BASE_URL={server.url} 로 지정해 사용하세요 (Ctrl+C 종료)")
+    with server:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+    print(f"📊 {server.stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+다중 키워드 일괄 검색 - 모든 검색어의 페이지 요청을 하나의 워커 풀/연결 풀/호출 제한으로 처리하고 출원번호로 병합
+
+실행: python -m src.batch_search 배터리 "전고체 전지" -f queries.txt -o portfolio.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.export import export_patents
+from src.instrumentation import propagate
+from src.kipris_handler import (
+    AdvancedKiprisOptimizer, INDEX_MODES, OFFLINE_UNAVAILABLE_MESSAGE, create_session, get_default_cache
+)
+from src.patent_index import get_default_index
+from src.patent_table import PatentTable
+
+# 동시에 진행하는 검색어 수 - 페이지 요청 동시성은 공유 워커 풀(max_workers)이 제한
+QUERY_CONCURRENCY = 4
+
+@dataclass(frozen=True)
+class QueryStats:
+    """검색어별 수집 결과"""
+    query: str
+    found: int = 0  # 이 검색어의 결과 건수
+    unique: int = 0  # 다른 검색어에서는 나오지 않은 건수
+    api_calls: int = 0
+    cache_hits: int = 0
+    failed_pages: int = 0
+    elapsed: float = 0.0
+    error: str = ""
+
+@dataclass(frozen=True)
+class BatchResult:
+    """일괄 검색 결과 - 출원번호 기준 병합 결과 + 특허별 매칭 검색어"""
+    patents: PatentTable
+    query_tags: Dict[str, Tuple[str, ...]]  # app_num -> 매칭된 검색어 (입력 순서)
+    query_stats: List[QueryStats] = field(default_factory=list)  # 입력 순서
+    elapsed: float = 0.0
+    
+    @property
+    def api_calls(self) -> int:
+        return sum(stats.api_calls for stats in self.query_stats)
+    
+    @property
+    def duplicates(self) -> int:
+        """여러 검색어에 중복으로 나와 병합된 건수"""
+        return sum(stats.found for stats in self.query_stats) - len(self.patents)
+    
+    def tagged_frame(self) -> pd.DataFrame:
+        """병합 결과 + 매칭 검색어 컬럼 ("; " 구분)"""
+        frame = self.patents.frame.copy()
+        frame["queries"] = ["; ".join(self.query_tags.get(app_num, ())) for app_num in frame["app_num"]]
+        return frame
+    
+    def summary(self) -> str:
+        return (f"검색어 {len(self.query_stats)}개, 고유 특허 {len(self.patents)}건 (중복 {self.duplicates}건 병합), "
+                f"API 호출 {self.api_calls}회, {self.elapsed:.1f}초")
+
+def run_batch_search(api_key: str, queries: Iterable[str], max_results: int = 200, max_workers: int = 8,
+                     query_concurrency: int = QUERY_CONCURRENCY, use_cache: bool = True, early_stop: bool = True,
+                     sort_by_date: bool = False, index_mode: str = "online",
+                     progress_callback: Optional[Callable[[QueryStats, int, int], None]] = None) -> BatchResult:
+    """검색어 목록 일괄 수집
+    
+    검색어마다 호출 수를 따로 세도록 수집기는 따로 만들되, 연결 풀/페이지 워커 풀/응답 캐시/인덱스와
+    프로세스 공용 호출 제한은 모두 공유합니다. 병합 순서는 완료 순서와 무관하게 입력 순서 기준입니다.
+    
+    progress_callback: 검색어 하나가 끝날 때마다 (검색어 결과, 완료 수, 전체 수)로 호출
+    index_mode가 offline인데 로컬 인덱스가 없으면 API를 호출하지 않고 RuntimeError를 냅니다.
+    """
+    queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+    started = time.time()
+    print(f"📚 일괄 검색 시작: 검색어 {len(queries)}개 (워커 {max_workers}개, 동시 검색어 {query_concurrency}개)")
+    
+    cache = get_default_cache() if use_cache else None
+    index = get_default_index()
+    if index_mode == "offline" and index is None:
+        raise RuntimeError(OFFLINE_UNAVAILABLE_MESSAGE)
+    session = create_session(max_workers)
+    results: Dict[str, PatentTable] = {}
+    stats: Dict[str, QueryStats] = {}
+    
+    def run_query(query: str) -> Tuple[PatentTable, QueryStats]:
+        query_started = time.time()
+        optimizer = AdvancedKiprisOptimizer(api_key, max_workers=max_workers, cache=cache, index=index,
+                                            session=session, executor=page_executor)
+        try:
+            patents = optimizer.smart_comprehensive_search(query, max_results, early_stop=early_stop,
+                                                           sort_by_date=sort_by_date, index_mode=index_mode)
+            error = ""
+        except Exception as e:
+            print(f"❌ '{query}' 검색 오류: {e}")
+            patents, error = PatentTable(), str(e)
+        finally:
+            optimizer.close()
+        return patents, QueryStats(query, len(patents), 0, optimizer.network_count, optimizer.cache_hit_count,
+                                   optimizer.failed_count, time.time() - query_started, error)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as page_executor, \
+                ThreadPoolExecutor(max_workers=max(1, query_concurrency)) as query_executor:
+            futures = {query_executor.submit(propagate(run_query), query): query for query in queries}
+            for completed, future in enumerate(as_completed(futures), 1):
+                query = futures[future]
+                results[query], stats[query] = future.result()
+                print(f"✅ [{completed}/{len(queries)}] '{query}': {stats[query].found}건, "
+                      f"API 호출 {stats[query].api_calls}회, {stats[query].elapsed:.1f}초")
+                if progress_callback:
+                    progress_callback(stats[query], completed, len(queries))
+    finally:
+        session.close()
+    
+    # 입력 순서로 병합 - 검색어 안에서는 관련성 순서 유지
+    merged = {}
+    tags: Dict[str, List[str]] = {}
+    for query in queries:
+        for patent in results[query]:
+            merged.setdefault(patent.app_num, patent)
+            tags.setdefault(patent.app_num, []).append(query)
+    
+    query_stats = []
+    for query in queries:
+        unique = sum(1 for app_num in results[query].app_nums if len(tags[app_num]) == 1)
+        query_stats.append(replace(stats[query], unique=unique))
+    
+    batch = BatchResult(PatentTable.from_records(merged.values()),
+                        {app_num: tuple(matched) for app_num, matched in tags.items()},
+                        query_stats, time.time() - started)
+    print(f"📚 일괄 검색 완료: {batch.summary()}")
+    return batch
+
+def read_queries(path: str) -> List[str]:
+    """검색어 파일 읽기 - 한 줄에 하나, 빈 줄과 #으로 시작하는 줄 제외"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def write_batch_result(batch: BatchResult, path: str):
+    """병합 결과 저장 - 확장자로 형식 선택 (.xlsx, .parquet, .jsonl, 그 외는 엑셀 호환 CSV)"""
+    export_patents(batch.tagged_frame(), path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="KIPRIS 다중 키워드 일괄 검색")
+    parser.add_argument("queries", nargs="*", help="검색어 목록")
+    parser.add_argument("-f", "--file", help="검색어 파일 (한 줄에 하나)")
+    parser.add_argument("-n", "--max-results", type=int, default=200, help="검색어별 최대 결과 수")
+    parser.add_argument("-w", "--workers", type=int, default=8, help="공유 페이지 워커 수")
+    parser.add_argument("-c", "--concurrency", type=int, default=QUERY_CONCURRENCY, help="동시에 진행할 검색어 수")
+    parser.add_argument("-o", "--output", help="결과 파일 (.csv, .xlsx, .parquet, .jsonl)")
+    parser.add_argument("--index-mode", choices=INDEX_MODES, default="online", help="로컬 인덱스 사용 방식")
+    parser.add_argument("--sort-by-date", action="store_true", help="출원일 최신순 수집")
+    parser.add_argument("--no-cache", action="store_true", help="응답 캐시 사용 안 함")
+    args = parser.parse_args(argv)
+    
+    queries = list(args.queries)
+    if args.file:
+        queries += read_queries(args.file)
+    if not queries:
+        parser.error("검색어를 입력하거나 --file로 지정하세요")
+    
+    load_dotenv()
+    if args.index_mode == "offline" and get_default_index() is None:
+        print(f"❌ {OFFLINE_UNAVAILABLE_MESSAGE}")
+        return 1
+    api_key = os.getenv("KIPRIS_API_KEY")
+    if not api_key and args.index_mode != "offline":
+        print("❌ KIPRIS_API_KEY가 설정되지 않았습니다 (.env 확인)")
+        return 1
+    
+    batch = run_batch_search(api_key or "", queries, args.max_results, args.workers, args.concurrency,
+                             use_cache=not args.no_cache, sort_by_date=args.sort_by_date, index_mode=args.index_mode)
+    
+    print(f"\n{'검색어':<20} {'결과':>6} {'고유':>6} {'API':>5} {'시간(초)':>8}")
+    for stats in batch.query_stats:
+        print(f"{stats.query:<20} {stats.found:>6} {stats.unique:>6} {stats.api_calls:>5} {stats.elapsed:>8.1f}"
+              + (f"  ❌ {stats.error}" if stats.error else ""))
+    print(batch.summary())
+    
+    if args.output:
+        write_batch_result(batch, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
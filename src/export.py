@@ -0,0 +1,282 @@
+"""
+결과 내보내기 - 특허 목록 전체를 CSV/XLSX(사람용), Parquet/JSONL(후속 파이프라인용)로 저장
+
+행은 EXPORT_BATCH_ROWS개씩 나눠 바로 파일에 기록하므로 수천 건이어도 전체 내용을 담은 문자열을 만들지 않습니다.
+여러 형식을 한 번에 요청하면 형식별로 병렬 기록합니다.
+
+실행: python -m src.export 배터리 "전고체 전지" -o patents.xlsx patents.parquet
+     python -m src.export --saved 내검색 -o patents.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from src.instrumentation import propagate, span
+from src.kipris_handler import INDEX_MODES
+from src.patent_table import PatentTable, kipris_detail_url
+
+EXPORT_FORMATS = ("csv", "xlsx", "parquet", "jsonl")
+
+# 한 번에 기록하는 행 수
+EXPORT_BATCH_ROWS = 1000
+
+# 형식별 병렬 기록 상한
+EXPORT_CONCURRENCY = 4
+
+# 엑셀 셀 하나에 들어가는 최대 글자 수
+XLSX_MAX_CELL_CHARS = 32767
+
+# XML 1.0에서 허용되지 않는 제어 문자 (XLSX 셀에서 제거)
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+@dataclass(frozen=True)
+class ExportResult:
+    """내보낸 파일 1개"""
+    path: str
+    format: str
+    rows: int
+    size: int  # 바이트
+    elapsed: float  # 초
+    
+    def summary(self) -> str:
+        return f"{os.path.basename(self.path)} ({self.format}, {self.rows:,}건, {self.size / 1024:,.0f}KB, {self.elapsed:.1f}초)"
+
+def detect_format(path: str) -> str:
+    """확장자로 형식 결정 - 알 수 없으면 CSV"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    return extension if extension in EXPORT_FORMATS else "csv"
+
+def _iter_batches(frame: pd.DataFrame, batch_rows: int) -> Iterator[List[Tuple[str, ...]]]:
+    """문자열 값 행 묶음 - 결측값은 빈 문자열, 특허 목록이면 KIPRIS 링크 컬럼 추가"""
+    with_url = "app_num" in frame.columns and "kipris_url" not in frame.columns
+    for start in range(0, len(frame), batch_rows):
+        batch = frame.iloc[start:start + batch_rows].astype(object).fillna("")
+        if with_url:
+            batch = batch.assign(kipris_url=batch["app_num"].map(kipris_detail_url))
+        yield [tuple(str(value) for value in row) for row in batch.itertuples(index=False, name=None)]
+
+def _export_columns(frame: pd.DataFrame) -> List[str]:
+    columns = [str(column) for column in frame.columns]
+    if "app_num" in columns and "kipris_url" not in columns:
+        columns.append("kipris_url")
+    return columns
+
+def _write_csv(frame: pd.DataFrame, path: str, batch_rows: int):
+    # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(_export_columns(frame))
+        for rows in _iter_batches(frame, batch_rows):
+            writer.writerows(rows)
+
+def _write_jsonl(frame: pd.DataFrame, path: str, batch_rows: int):
+    columns = _export_columns(frame)
+    with open(path, "w", encoding="utf-8") as f:
+        for rows in _iter_batches(frame, batch_rows):
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                f.write("\n")
+
+def _write_parquet(frame: pd.DataFrame, path: str, batch_rows: int):
+    """batch_rows행씩 row group으로 기록 (pyarrow 필요)"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet 내보내기에는 pyarrow가 필요합니다 (pip install pyarrow)")
+    
+    columns = _export_columns(frame)
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in _iter_batches(frame, batch_rows):
+            writer.write_table(pa.Table.from_arrays([pa.array(values, pa.string()) for values in zip(*rows)],
+                                                    schema=schema))
+        if len(frame) == 0:
+            writer.write_table(schema.empty_table())
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="patents" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    # 스타일 0: 기본, 1: 굵게 (머리글)
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+
+def _xlsx_row(row_number: int, values: Sequence[str], style: int = 0) -> str:
+    """인라인 문자열 셀로 된 행 1개 (공유 문자열 표를 만들지 않아 행 단위로 바로 기록 가능)"""
+    style_attr = f' s="{style}"' if style else ""
+    cells = "".join(
+        f'<c r="{_column_letter(i)}{row_number}" t="inlineStr"{style_attr}><is><t xml:space="preserve">'
+        f'{escape(_XML_ILLEGAL.sub("", value[:XLSX_MAX_CELL_CHARS]))}</t></is></c>'
+        for i, value in enumerate(values)
+    )
+    return f'<row r="{row_number}">{cells}</row>'
+
+def _write_xlsx(frame: pd.DataFrame, path: str, batch_rows: int):
+    """워크시트 XML을 zip 항목에 행 묶음 단위로 바로 기록 (엑셀 라이브러리 불필요)"""
+    columns = _export_columns(frame)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as raw, \
+                io.TextIOWrapper(raw, encoding="utf-8") as sheet:
+            # 머리글 행 고정
+            sheet.write(
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                '</sheetView></sheetViews><sheetData>'
+            )
+            sheet.write(_xlsx_row(1, columns, style=1))
+            row_number = 1
+            for rows in _iter_batches(frame, batch_rows):
+                sheet.write("".join(_xlsx_row(row_number + i, row) for i, row in enumerate(rows, 1)))
+                row_number += len(rows)
+            sheet.write('</sheetData></worksheet>')
+
+_WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+}
+
+def _as_frame(data: Union[PatentTable, pd.DataFrame]) -> pd.DataFrame:
+    return data.frame if isinstance(data, PatentTable) else data
+
+def export_patents(data: Union[PatentTable, pd.DataFrame], path: str, fmt: Optional[str] = None,
+                   batch_rows: int = EXPORT_BATCH_ROWS) -> ExportResult:
+    """특허 목록(또는 추가 컬럼이 붙은 DataFrame)을 파일 하나로 저장 - fmt가 없으면 확장자로 결정"""
+    fmt = fmt or detect_format(path)
+    if fmt not in _WRITERS:
+        raise ValueError(f"지원하지 않는 내보내기 형식: {fmt} (가능: {', '.join(EXPORT_FORMATS)})")
+    
+    frame = _as_frame(data)
+    started = time.perf_counter()
+    with span("export.write", format=fmt, rows=len(frame)) as attributes:
+        _WRITERS[fmt](frame, path, max(1, batch_rows))
+        size = os.path.getsize(path)
+        attributes["bytes"] = size
+    
+    result = ExportResult(path, fmt, len(frame), size, time.perf_counter() - started)
+    print(f"💾 내보내기 완료: {result.summary()}")
+    return result
+
+def export_many(data: Union[PatentTable, pd.DataFrame], paths: Sequence[str],
+                max_workers: int = EXPORT_CONCURRENCY) -> List[ExportResult]:
+    """여러 파일로 동시에 저장 - 결과는 paths 순서"""
+    frame = _as_frame(data)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths) or 1))) as executor:
+        futures = [executor.submit(propagate(export_patents), frame, path) for path in paths]
+        return [future.result() for future in futures]
+
+def export_bytes(data: Union[PatentTable, pd.DataFrame], fmt: str) -> bytes:
+    """다운로드용 - 임시 파일에 기록한 뒤 내용을 돌려주고 파일은 삭제"""
+    fd, path = tempfile.mkstemp(prefix="patents_", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        export_patents(data, path, fmt)
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="특허 목록 내보내기 (CSV/XLSX/Parquet/JSONL)")
+    parser.add_argument("queries", nargs="*", help="검색어 목록 (일괄 검색 후 병합 결과를 내보냄)")
+    parser.add_argument("--saved", help="저장된 검색 이름 (검색 대신 저장된 결과를 내보냄)")
+    parser.add_argument("-o", "--output", nargs="+", required=True,
+                        help="결과 파일 - 확장자로 형식 결정 (.csv .xlsx .parquet .jsonl), 여러 개면 병렬 기록")
+    parser.add_argument("-n", "--max-results", type=int, default=200, help="검색어별 최대 결과 수")
+    parser.add_argument("--index-mode", choices=INDEX_MODES, default="online", help="로컬 인덱스 사용 방식")
+    args = parser.parse_args(argv)
+    
+    if args.saved:
+        from src.saved_search import get_saved_search_store
+        store = get_saved_search_store()
+        if store is None:
+            print("❌ 저장된 검색 저장소를 열 수 없습니다")
+            return 1
+        saved = store.get(args.saved)
+        if saved is None:
+            print(f"❌ 저장된 검색이 없습니다: {args.saved}")
+            return 1
+        data: Union[PatentTable, pd.DataFrame] = saved.patents
+    elif args.queries:
+        from dotenv import load_dotenv
+        from src.batch_search import run_batch_search
+        load_dotenv()
+        api_key = os.getenv("KIPRIS_API_KEY")
+        if not api_key and args.index_mode != "offline":
+            print("❌ KIPRIS_API_KEY가 설정되지 않았습니다 (.env 확인)")
+            return 1
+        data = run_batch_search(api_key or "", args.queries, args.max_results, index_mode=args.index_mode).tagged_frame()
+    else:
+        parser.error("검색어를 입력하거나 --saved로 저장된 검색을 지정하세요")
+    
+    export_many(data, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+구간 계측 스팬 - 네트워크 대기/XML 파싱/중복 제거·점수/LLM 응답/PDF 생성/차트 렌더링 시간 기록
+
+스팬은 등록된 출력(sink: 로그/JSONL/OpenTelemetry)과 현재 요청의 SpanCollector로 전달됩니다.
+받을 곳이 하나도 없으면 시간 측정 없이 통과하므로 기본 상태의 오버헤드는 무시할 수준입니다.
+
+TRACE_SINK 환경변수로 출력 지정 (쉼표 구분): log, jsonl[:경로], otel
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# 스팬 이름 -> 화면 표시용 구간 이름
+SPAN_LABELS = {
+    "kipris.rate_wait": "호출 제한 대기",
+    "kipris.network": "네트워크 대기",
+    "kipris.coalesce": "동일 요청 대기",
+    "kipris.parse": "XML 파싱",
+    "kipris.index": "로컬 인덱스 기록",
+    "kipris.merge": "중복 제거/점수",
+    "kipris.finalize": "정렬/선별",
+    "llm.generate": "LLM 응답",
+    "llm.stream": "LLM 스트리밍",
+    "pdf.build": "PDF 생성",
+    "export.write": "파일 내보내기",
+    "app.stats": "통계 계산",
+    "app.chart": "차트 렌더링",
+    "app.page_records": "목록 준비",
+}
+
+@dataclass(frozen=True)
+class Span:
+    """완료된 구간 1개"""
+    name: str
+    start: float  # 시작 시각 (epoch 초)
+    duration: float  # 소요 시간 (초)
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    thread: str = ""
+    
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "start": self.start, "duration": self.duration,
+                "attributes": self.attributes, "thread": self.thread}
+
+class SpanSink(ABC):
+    """스팬 출력 인터페이스 - emit()만 구현하면 add_sink()로 등록 가능 (구현하지 않으면 생성 시 TypeError)"""
+    
+    @abstractmethod
+    def emit(self, span: Span):
+        ...
+
+class LogSink(SpanSink):
+    """콘솔 출력 - min_ms보다 짧은 구간은 생략"""
+    
+    def __init__(self, min_ms: float = 0.0):
+        self.min_ms = min_ms
+    
+    def emit(self, span: Span):
+        if span.duration * 1000 >= self.min_ms:
+            attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            print(f"⏱️ {span.name} {span.duration * 1000:.1f}ms {attributes}".rstrip())
+
+class JsonlSink(SpanSink):
+    """JSON Lines 파일 - 스팬 1개당 한 줄"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+    
+    def emit(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+class OpenTelemetrySink(SpanSink):
+    """OpenTelemetry 트레이서로 전달 (opentelemetry-api 선택 의존성 - 수출기 설정은 애플리케이션 몫)"""
+    
+    def __init__(self, tracer_name: str = "patent-insight-engine"):
+        from opentelemetry import trace
+        self._tracer = trace.get_tracer(tracer_name)
+    
+    def emit(self, span: Span):
+        attributes = {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+                      for key, value in span.attributes.items()}
+        otel_span = self._tracer.start_span(span.name, start_time=int(span.start * 1e9), attributes=attributes)
+        otel_span.end(end_time=int(span.end * 1e9))
+
+class SpanCollector(SpanSink):
+    """요청 단위 스팬 수집기 - with 블록(또는 span())이 활성화한 컨텍스트에서 기록된 스팬만 모음
+    
+    워커 스레드로는 컨텍스트가 자동으로 전달되지 않으므로 제출하는 함수를 propagate()로 감쌉니다.
+    """
+    
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._tokens: List[contextvars.Token] = []
+    
+    def emit(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+    
+    def __enter__(self) -> "SpanCollector":
+        self._tokens.append(_collectors.set(_collectors.get() + (self,)))
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        _collectors.reset(self._tokens.pop())
+    
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Dict[str, Any]]:
+        """이 수집기를 활성화한 채로 구간 계측"""
+        with self, span(name, **attributes) as span_attributes:
+            yield span_attributes
+    
+    @property
+    def wall_time(self) -> float:
+        """첫 스팬 시작부터 마지막 스팬 종료까지 (초)"""
+        with self._lock:
+            if not self.spans:
+                return 0.0
+            return max(s.end for s in self.spans) - min(s.start for s in self.spans)
+    
+    def summary(self) -> List[Dict[str, Any]]:
+        """스팬 이름별 집계 (처음 나온 순서) - 병렬 구간은 합계가 경과 시간보다 클 수 있음"""
+        groups: Dict[str, List[float]] = {}
+        with self._lock:
+            for s in self.spans:
+                groups.setdefault(s.name, []).append(s.duration)
+        return [
+            {"name": name, "label": SPAN_LABELS.get(name, name), "count": len(durations),
+             "total": sum(durations), "mean": sum(durations) / len(durations), "max": max(durations)}
+            for name, durations in groups.items()
+        ]
+
+_sinks: List[SpanSink] = []
+_sinks_lock = threading.Lock()
+_collectors: contextvars.ContextVar[Tuple[SpanCollector, ...]] = contextvars.ContextVar("span_collectors", default=())
+
+def add_sink(sink: SpanSink):
+    """프로세스 전체 스팬 출력 등록"""
+    global _sinks
+    with _sinks_lock:
+        _sinks = [*_sinks, sink]
+
+def remove_sink(sink: SpanSink):
+    global _sinks
+    with _sinks_lock:
+        _sinks = [s for s in _sinks if s is not sink]
+
+def _emit(span_record: Span, targets: Tuple[SpanSink, ...]):
+    for sink in targets:
+        try:
+            sink.emit(span_record)
+        except Exception as e:
+            print(f"⚠️ 스팬 출력 실패 ({type(sink).__name__}): {e}")
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Dict[str, Any]]:
+    """구간 계측 - yield된 dict에 속성을 추가할 수 있고, 예외가 나면 error 속성을 남김"""
+    targets = (*_sinks, *_collectors.get())
+    if not targets:
+        yield attributes
+        return
+    
+    start = time.time()
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes["error"] = type(e).__name__
+        raise
+    finally:
+        _emit(Span(name, start, time.perf_counter() - started, attributes, threading.current_thread().name), targets)
+
+def propagate(func: Callable) -> Callable:
+    """현재 컨텍스트(활성 수집기)를 워커 스레드로 전달하는 래퍼 - executor.submit/map에 사용"""
+    context = contextvars.copy_context()
+    
+    def run_in_context(*args, **kwargs):
+        # 같은 Context는 여러 스레드에서 동시에 들어갈 수 없으므로 호출마다 복사
+        return context.copy().run(func, *args, **kwargs)
+    return run_in_context
+
+def configure_from_env():
+    """TRACE_SINK 환경변수의 출력 등록 - 예: TRACE_SINK=log,jsonl:/tmp/spans.jsonl"""
+    for spec in filter(None, (part.strip() for part in os.getenv("TRACE_SINK", "").split(","))):
+        kind, _, arg = spec.partition(":")
+        try:
+            if kind == "log":
+                add_sink(LogSink(float(arg) if arg else 0.0))
+            elif kind == "jsonl":
+                add_sink(JsonlSink(arg or "spans.jsonl"))
+            elif kind == "otel":
+                add_sink(OpenTelemetrySink())
+            else:
+                print(f"⚠️ 알 수 없는 TRACE_SINK 항목: {spec}")
+        except Exception as e:
+            print(f"⚠️ 스팬 출력 '{spec}' 초기화 실패: {e}")
+
+configure_from_env()
@@ -0,0 +1,127 @@
+"""
+백그라운드 작업 관리자 - 검색/분석을 스크립트 스레드 밖에서 실행하고, 같은 요청은 세션이 달라도 하나의 작업으로 합침
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from src.instrumentation import SpanCollector
+
+# 동시에 실행하는 작업 수 (작업 안의 페이지/LLM 요청은 각자의 워커 풀 사용)
+JOB_WORKERS = 4
+
+# 끝난 작업을 보관하는 시간 - 재실행 중이던 세션이 돌아와 결과를 가져갈 수 있도록
+JOB_RETENTION_SECONDS = 1800
+
+class Job:
+    """백그라운드 작업 1개 - 진행률/메시지/중간 결과(details)를 작업 스레드가 갱신하고 UI가 폴링"""
+    
+    def __init__(self, job_id: str, key: Hashable, label: str = ""):
+        self.id = job_id
+        self.key = key
+        self.label = label
+        self.status = "queued"  # queued / running / done / error
+        self.progress = 0.0
+        self.message = ""
+        self.details: Dict[str, Any] = {}  # 미리보기, 부분 결과 등
+        self.result: Any = None
+        self.error = ""
+        self.subscribers = 1  # 이 작업을 기다리는 요청 수 (합쳐진 요청 포함)
+        self.spans = SpanCollector()
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None, **details):
+        """작업 스레드에서 진행 상황 기록"""
+        with self._lock:
+            if progress is not None:
+                self.progress = min(1.0, max(0.0, progress))
+            if message is not None:
+                self.message = message
+            if details:
+                self.details = {**self.details, **details}
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+    
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+class JobManager:
+    """작업 레지스트리 + 스레드 풀
+    
+    submit()에 같은 key로 진행 중인 작업이 있으면 새로 실행하지 않고 그 작업을 돌려줍니다.
+    작업 함수는 첫 인자로 Job을 받아 update()로 진행률을 알리고, 반환값이 작업 결과가 됩니다.
+    작업 안에서 기록된 스팬은 job.spans에 모입니다.
+    """
+    
+    def __init__(self, max_workers: int = JOB_WORKERS, retention_seconds: float = JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[Hashable, Job] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+    
+    def submit(self, key: Hashable, func: Callable[..., Any], *args, label: str = "", **kwargs) -> Job:
+        """작업 제출 - 같은 key의 작업이 진행 중이면 합침"""
+        with self._lock:
+            self._prune()
+            job = self._in_flight.get(key)
+            if job is not None:
+                job.subscribers += 1
+                print(f"🔗 진행 중인 작업에 합류: {job.label or job.id} (대기 {job.subscribers}건)")
+                return job
+            job = Job(f"job-{next(self._ids)}", key, label)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+    
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def active_jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._in_flight.values())
+    
+    def _run(self, job: Job, func: Callable[..., Any], args: tuple, kwargs: dict):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with job.spans:
+                job.result = func(job, *args, **kwargs)
+            job.progress = 1.0
+            status = "done"
+        except Exception as e:
+            print(f"❌ 작업 실패 ({job.label or job.id}): {e}")
+            job.error = str(e)
+            status = "error"
+        
+        # 완료 시각과 결과를 먼저 기록한 뒤 상태를 바꿔, 폴링하는 쪽이 완료를 보면 결과도 보이도록
+        job.finished_at = time.time()
+        with self._lock:
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+        job.status = status
+    
+    def _prune(self):
+        """보관 시간이 지난 완료 작업 제거 (잠금 안에서 호출)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+"""
+비동기 KIPRIS API 핸들러 - aiohttp 기반 + 프로세스 공용 토큰 버킷 호출 제한
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Optional
+
+import aiohttp
+
+from src.instrumentation import span
+from src.patent_index import PatentIndex, get_default_index
+from src.patent_table import PatentTable
+from src.kipris_handler import (
+    AdvancedKiprisOptimizer, KiprisResponseCache, SingleFlight, TokenBucket, RETRY_STATUS_CODES, get_default_cache
+)
+from src.rerank_handler import RERANK_CANDIDATE_FACTOR, rerank_patents
+
+class AsyncKiprisOptimizer(AdvancedKiprisOptimizer):
+    """비동기 KIPRIS 수집기 - 수집 루프는 동기 버전을 그대로 쓰고 HTTP 전송만 aiohttp로 교체
+    
+    필드 선택, 병합, 조기 종료, 로컬 인덱스 모드와 커버리지 기록, 진행 이벤트, 캐시, 진행 중인 요청 합치기는
+    모두 iter_comprehensive_search와 같은 코드입니다. 수집 루프는 이벤트 루프를 막지 않도록 스레드에서 돌고,
+    페이지 요청(_fetch_content)만 호출한 이벤트 루프로 넘겨 aiohttp 연결 풀에서 실행합니다.
+    호출 속도는 동기 수집기와 같은 프로세스 공용 토큰 버킷을 공유하므로, 여러 Streamlit 세션이
+    동시에 수집해도 전체 호출량이 KIPRIS 할당량을 넘지 않습니다.
+    """
+    
+    def __init__(self, api_key: str, max_workers: int = 8, max_retries: int = 3, backoff_base: float = 0.5,
+                 cache: Optional[KiprisResponseCache] = None, rate_limiter: Optional[TokenBucket] = None,
+                 index: Optional[PatentIndex] = None, executor: Optional[ThreadPoolExecutor] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        super().__init__(api_key, max_workers=max_workers, max_retries=max_retries, backoff_base=backoff_base,
+                         cache=cache, rate_limiter=rate_limiter, index=index, executor=executor,
+                         single_flight=single_flight)
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _create_session(self):
+        # aiohttp 세션은 실행 중인 이벤트 루프 안에서 생성해야 하므로 첫 요청 때 만듭니다
+        return None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def aclose(self):
+        """연결 풀 정리"""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+    
+    def _get_async_session(self) -> aiohttp.ClientSession:
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_workers, keepalive_timeout=30)
+            self._async_session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30))
+        return self._async_session
+    
+    async def smart_comprehensive_search_async(self, keyword: str, max_results: int = 200, early_stop: bool = True,
+                                               sort_by_date: bool = False,
+                                               progress_callback: Optional[Callable[[Dict], None]] = None,
+                                               index_mode: str = "online") -> PatentTable:
+        """smart_comprehensive_search의 비동기 버전 - 결과와 순서는 동기 버전과 동일"""
+        final_list = PatentTable()
+        async for event in self.iter_comprehensive_search_async(keyword, max_results, early_stop, sort_by_date,
+                                                                index_mode):
+            if progress_callback:
+                progress_callback(event)
+            if event["type"] == "done":
+                final_list = event["patents"]
+        return final_list
+    
+    async def iter_comprehensive_search_async(self, keyword: str, max_results: int = 200, early_stop: bool = True,
+                                              sort_by_date: bool = False,
+                                              index_mode: str = "online") -> AsyncIterator[Dict]:
+        """iter_comprehensive_search의 비동기 버전 - 같은 이벤트를 같은 순서로 전달"""
+        self._loop = asyncio.get_running_loop()
+        events = self.iter_comprehensive_search(keyword, max_results, early_stop, sort_by_date, index_mode)
+        # 소비자가 도중에 취소해도 진행 중인 next()가 끝난 뒤에 close()하도록 직렬화
+        step_lock = threading.Lock()
+        
+        def step() -> Optional[Dict]:
+            with step_lock:
+                return next(events, None)
+        
+        def close():
+            with step_lock:
+                events.close()  # 대기 중인 페이지 요청 취소
+        
+        try:
+            while True:
+                event = await asyncio.to_thread(step)
+                if event is None:
+                    break
+                yield event
+        finally:
+            await asyncio.to_thread(close)
+    
+    def _fetch_content(self, params: Dict) -> Optional[bytes]:
+        """수집 스레드에서 호출 - 요청을 이벤트 루프의 aiohttp 세션으로 넘기고 응답 본문을 기다림"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            raise RuntimeError("AsyncKiprisOptimizer의 요청은 *_async 수집 메서드 안에서만 실행할 수 있습니다")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("이벤트 루프 스레드에서 동기 수집 메서드를 호출할 수 없습니다 (*_async 메서드 사용)")
+        return asyncio.run_coroutine_threadsafe(self._get_with_retry_async(params), loop).result()
+    
+    async def _get_with_retry_async(self, params: Dict) -> Optional[bytes]:
+        """429/5xx/타임아웃 시 지수 백오프 + 지터로 재시도 - 200 응답 본문, 실패 시 None"""
+        session = self._get_async_session()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            with span("kipris.rate_wait"):
+                await self.rate_limiter.acquire_async()  # 프로세스 공용 호출 속도 제한
+            try:
+                with span("kipris.network", attempt=attempt + 1) as attributes:
+                    async with session.get(self.base_url, params=params) as response:
+                        attributes["status"] = response.status
+                        if response.status not in RETRY_STATUS_CODES:
+                            return await response.read() if response.status == 200 else None
+                        reason = f"HTTP {response.status}"
+                        retry_after = response.headers.get("Retry-After")
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                reason = type(e).__name__
+            
+            delay = self._next_retry_delay(attempt, reason, retry_after)
+            if delay is None:
+                return None
+            await asyncio.sleep(delay)
+        return None
+
+async def search_all_patents_async(api_key: str, keyword: str, max_results: int = 200, max_workers: int = 8,
+                                   use_cache: bool = True, early_stop: bool = True, sort_by_date: bool = False,
+                                   semantic_rerank: bool = False, progress_callback=None,
+                                   index_mode: str = "online") -> PatentTable:
+    """비동기 메인 검색 함수 - search_all_patents와 같은 결과"""
+    harvest_size = max_results * RERANK_CANDIDATE_FACTOR if semantic_rerank else max_results
+    async with AsyncKiprisOptimizer(api_key, max_workers=max_workers,
+                                    cache=get_default_cache() if use_cache else None,
+                                    index=get_default_index()) as optimizer:
+        patents = await optimizer.smart_comprehensive_search_async(keyword, harvest_size, early_stop=early_stop,
+                                                                   sort_by_date=sort_by_date,
+                                                                   progress_callback=progress_callback,
+                                                                   index_mode=index_mode)
+    if semantic_rerank:
+        # 임베딩 계산은 CPU 작업이므로 이벤트 루프 밖에서 실행
+        return await asyncio.to_thread(rerank_patents, keyword, patents, max_results)
+    return patents
@@ -3,36 +3,330 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
+import io
+import asyncio
 import math
 import time
-from typing import List, Dict, Optional, Tuple
+import os
+import json
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import Any, List, Dict, Optional, Tuple, Iterable, Iterator, Callable, Hashable
+import heapq
+import random
 import re
 
+from src.instrumentation import propagate, span
+from src.patent_table import PatentRecord, PatentTable, kipris_detail_url
+from src.patent_index import PatentIndex, get_default_index
+from src.rerank_handler import RERANK_CANDIDATE_FACTOR, rerank_patents
+from src.sqlite_store import DEFAULT_BASE_URL, SqliteTTLStore, default_cache_dir, kipris_base_url
+
+try:
+    # lxml이 설치되어 있으면 더 빠른 C 파서 사용 (iterparse 인터페이스 동일)
+    from lxml import etree as xml_parser
+except ImportError:
+    xml_parser = ET
+
+# item 하위 태그 -> 특허 필드 (각 태그의 첫 번째 값 사용)
+ITEM_FIELD_TAGS = {
+    "inventionTitle": "title",
+    "applicationNumber": "app_num",
+    "astrtCont": "abstract",
+    "applicantName": "applicant",
+    "applicationDate": "app_date",
+    "registerStatus": "reg_status",
+    "registerNumber": "reg_num",
+    "ipcCode": "ipc_code",
+}
+
+# 발명자 정보가 담길 수 있는 태그 (우선순위 순)
+INVENTOR_TAGS = ("inventorName", "inventor", "invtNm", "personName")
+
+# 캐시 직렬화 형식 버전 - 바뀌면 기존 항목은 키가 달라져 자연스럽게 LRU 제거됨
+CACHE_FORMAT_VERSION = 2
+
+# 재시도 대상 HTTP 상태 코드 (쓰로틀링 + 일시적 서버 오류)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# 관련성 점수 가중치 - 조기 종료 시 남은 특허의 점수 상한 계산에 사용
+TITLE_WEIGHT = 3.0
+ABSTRACT_WEIGHT = 2.0
+REGISTERED_BONUS = 1.0
+RECENT_BONUS = 0.5
+RECENT_YEAR = 2020
+MAX_RELEVANCE_SCORE = TITLE_WEIGHT + ABSTRACT_WEIGHT + REGISTERED_BONUS + RECENT_BONUS
+
+# 로컬 인덱스 사용 방식
+#   online: 항상 KIPRIS에서 수집 (수집한 특허는 인덱스에 기록)
+#   local_first: 인덱스 결과를 먼저 쓰고 마지막 수집 이후 늘어난 건수만 최신순으로 요청
+#   offline: 인덱스에서만 응답 (API 호출 없음)
+INDEX_MODES = ("online", "local_first", "offline")
+OFFLINE_UNAVAILABLE_MESSAGE = "오프라인 모드는 로컬 인덱스가 필요합니다 (PATENT_INDEX_DISABLED 설정 또는 인덱스 초기화 실패)"
+
+class KiprisResponseCache(SqliteTTLStore[Tuple[List[PatentRecord], int]]):
+    """KIPRIS 페이지 응답 영구 캐시 - 값은 (특허 목록, 총 건수)"""
+    
+    def __init__(self, cache_dir: Optional[str] = None, ttl_seconds: float = 24 * 3600, max_entries: int = 20000):
+        path = os.path.join(cache_dir or default_cache_dir("KIPRIS_CACHE_DIR"), "kipris_pages.sqlite3")
+        super().__init__(path, "pages", self._dump, self._load, ttl_seconds, max_entries)
+    
+    @staticmethod
+    def make_key(base_url: str, field: str, query: str, page_no: int, num_of_rows: int, sort_spec: str = "") -> str:
+        """(엔드포인트, 필드, 검색어, 페이지, 페이지 크기[, 정렬]) 캐시 키 - API 키는 포함하지 않음"""
+        parts = [CACHE_FORMAT_VERSION, base_url, field, query, int(page_no), int(num_of_rows)]
+        if sort_spec:
+            parts.append(sort_spec)
+        return json.dumps(parts, ensure_ascii=False)
+    
+    def set(self, key: str, patents: List[PatentRecord], total_count: int):
+        super().set(key, (patents, total_count))
+    
+    @staticmethod
+    def _dump(value: Tuple[List[PatentRecord], int]) -> str:
+        patents, total_count = value
+        return json.dumps({"rows": [p.to_row() for p in patents], "total_count": total_count}, ensure_ascii=False)
+    
+    @staticmethod
+    def _load(payload: str) -> Tuple[List[PatentRecord], int]:
+        data = json.loads(payload)
+        return [PatentRecord.from_row(row) for row in data["rows"]], data["total_count"]
+
+_default_cache: Optional[KiprisResponseCache] = None
+_defaults_lock = threading.Lock()
+
+def get_default_cache() -> Optional[KiprisResponseCache]:
+    """프로세스 공용 응답 캐시 - KIPRIS_CACHE_DISABLED=1 이면 사용 안 함"""
+    global _default_cache
+    if os.getenv("KIPRIS_CACHE_DISABLED") == "1":
+        return None
+    with _defaults_lock:
+        if _default_cache is None:
+            try:
+                ttl = float(os.getenv("KIPRIS_CACHE_TTL", 24 * 3600))
+                _default_cache = KiprisResponseCache(ttl_seconds=ttl)
+            except Exception as e:
+                print(f"⚠️ 응답 캐시 초기화 실패 (캐시 없이 진행): {e}")
+                return None
+        return _default_cache
+
+class TokenBucket:
+    """토큰 버킷 호출 속도 제한기 - 스레드/이벤트 루프 구분 없이 공유 가능
+    
+    reserve()가 토큰을 먼저 차감하고 기다릴 시간을 돌려주므로, 동기 호출자는 time.sleep으로
+    비동기 호출자는 asyncio.sleep으로 같은 버킷을 나눠 쓸 수 있습니다.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = max(rate, 1e-6)  # 초당 토큰 보충량
+        self.capacity = capacity if capacity is not None else max(1.0, rate)  # 순간 최대 호출량
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens: float = 1.0) -> float:
+        """토큰 예약 - 예약분이 보충될 때까지 기다려야 하는 초"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def pause(self, seconds: float):
+        """쓰로틀링 응답 시 버킷을 비워 모든 호출자가 최소 seconds초 대기"""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+    
+    def acquire(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens: float = 1.0):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+_global_rate_limiter: Optional[TokenBucket] = None
+
+def get_global_rate_limiter() -> TokenBucket:
+    """프로세스 공용 KIPRIS 호출 속도 제한기 - KIPRIS_RATE_LIMIT(초당 호출), KIPRIS_RATE_BURST로 조정"""
+    global _global_rate_limiter
+    with _defaults_lock:
+        if _global_rate_limiter is None:
+            rate = float(os.getenv("KIPRIS_RATE_LIMIT", "10"))
+            burst = os.getenv("KIPRIS_RATE_BURST")
+            _global_rate_limiter = TokenBucket(rate, float(burst) if burst else None)
+        return _global_rate_limiter
+
+class SingleFlight:
+    """진행 중인 동일 요청 합치기 - 같은 키의 호출이 진행 중이면 다시 실행하지 않고 그 결과를 함께 받음
+    
+    결과는 호출이 끝나는 즉시 버리므로 캐시가 아니며, 실행 시간이 겹친 요청만 합쳐집니다.
+    """
+    
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, "SingleFlight._Call"] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """func 실행 또는 진행 중인 실행 대기 - (결과, 다른 호출의 결과를 공유했는지)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = SingleFlight._Call()
+        
+        if not leader:
+            with span("kipris.coalesce"):
+                call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+_default_single_flight: Optional[SingleFlight] = None
+
+def get_default_single_flight() -> Optional[SingleFlight]:
+    """프로세스 공용 요청 합치기 - 모든 세션의 동일 페이지 요청을 합침, KIPRIS_SINGLE_FLIGHT_DISABLED=1 이면 사용 안 함"""
+    global _default_single_flight
+    if os.getenv("KIPRIS_SINGLE_FLIGHT_DISABLED") == "1":
+        return None
+    with _defaults_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
+
+def create_session(pool_size: int) -> requests.Session:
+    """keep-alive 연결 풀 - pool_size만큼 연결 유지"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 class AdvancedKiprisOptimizer:
     """고도화된 KIPRIS API 최적화 클래스"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_workers: int = 4, max_retries: int = 3, backoff_base: float = 0.5,
+                 cache: Optional[KiprisResponseCache] = None, rate_limiter: Optional["TokenBucket"] = None,
+                 index: Optional[PatentIndex] = None, session: Optional[requests.Session] = None,
+                 executor: Optional[ThreadPoolExecutor] = None, single_flight: Optional[SingleFlight] = None):
         self.api_key = api_key
-        self.base_url = "http://plus.kipris.or.kr/kipo-api/kipi/patUtiModInfoSearchSevice/getAdvancedSearch"
-        self.call_count = 0
+        self.base_url = kipris_base_url()
+        self.cache = cache
+        self.index = index  # 수집한 모든 특허를 기록하는 로컬 전문 인덱스
+        self.call_count = 0  # 전체 페이지 요청 수 (= 네트워크 + 캐시 + 공유)
+        self.network_count = 0  # 실제 API 호출 수
+        self.cache_hit_count = 0  # 캐시에서 응답한 수
+        self.shared_count = 0  # 다른 세션의 진행 중인 동일 요청 결과를 공유한 수
+        self.retry_count = 0  # 재시도에 소모된 호출 수
+        self.failed_count = 0  # 재시도 후에도 실패한 페이지 수
+        self.max_workers = max(1, max_workers)  # 동시 페이지 요청 상한
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.rate_limiter = rate_limiter or get_global_rate_limiter()  # 세션 간 공유되는 호출 속도 제한
+        self.executor = executor  # 공유 페이지 워커 풀 (없으면 필드마다 생성)
+        self.single_flight = single_flight or get_default_single_flight()  # 진행 중인 동일 요청 합치기
+        self._lock = threading.Lock()
+        self._owns_session = session is None  # 공유받은 연결 풀은 close()에서 닫지 않음
+        self.session = session if session is not None else self._create_session()
+    
+    def _create_session(self) -> Optional[requests.Session]:
+        """keep-alive 연결 풀 - 워커 수만큼 연결 유지"""
+        return create_session(self.max_workers)
+    
+    def close(self):
+        """연결 풀 정리 - 공유받은 세션은 소유자가 정리"""
+        if self.session is not None and self._owns_session:
+            self.session.close()
         
-    def smart_comprehensive_search(self, keyword: str, max_results: int = 200) -> List[Dict]:
-        """AI 기반 스마트 대량 수집 - 관련성 높은 특허만 필터링"""
+    def smart_comprehensive_search(self, keyword: str, max_results: int = 200, early_stop: bool = True,
+                                   sort_by_date: bool = False, progress_callback: Optional[Callable[[Dict], None]] = None,
+                                   index_mode: str = "online") -> PatentTable:
+        """AI 기반 스마트 대량 수집 - 관련성 높은 특허만 필터링
+        
+        early_stop: 아직 받지 않은 특허의 최대 도달 가능 점수가 현재 상위 max_results건을
+                    바꿀 수 없으면 남은 페이지 요청 중단 (결과는 전체 수집과 동일)
+                    기본(KIPRIS 관련성) 정렬은 페이지 순서와 점수가 무관해 상한이 MAX_RELEVANCE_SCORE로
+                    고정되므로, 상위 max_results건이 모두 최고점일 때만 중단됩니다 - 호출 절감은 사실상
+                    sort_by_date에서만 기대할 수 있습니다
+        sort_by_date: 서버 측 출원일 내림차순 정렬 - 2020년 이전 구간부터 상한 점수를 낮춰 더 일찍 중단
+        progress_callback: iter_comprehensive_search 이벤트를 그대로 전달받는 콜백
+        index_mode: 로컬 인덱스 사용 방식 (INDEX_MODES 참고) - offline인데 인덱스가 없으면 RuntimeError
+        """
+        final_list = PatentTable()
+        for event in self.iter_comprehensive_search(keyword, max_results, early_stop, sort_by_date, index_mode):
+            if progress_callback:
+                progress_callback(event)
+            if event["type"] == "done":
+                final_list = event["patents"]
+        return final_list
+    
+    def iter_comprehensive_search(self, keyword: str, max_results: int = 200, early_stop: bool = True,
+                                  sort_by_date: bool = False, index_mode: str = "online") -> Iterator[Dict]:
+        """스트리밍 대량 수집 - 중복 제거된 신규 특허와 진행 이벤트를 도착 즉시 yield
+        
+        이벤트 형식:
+          {"type": "local", "field", "patents": 로컬 인덱스의 신규 특허, "collected", "progress"}
+          {"type": "field", "field", "total_count", "needed_pages", "progress"}
+          {"type": "page", "field", "page", "needed_pages", "patents": 이번 페이지의 신규 특허, "collected", "progress"}
+          {"type": "done", "patents": 관련성 상위 max_results건 PatentTable, "collected", "progress": 1.0}
+        progress는 0~1 사이의 전체 진행률입니다.
+        """
         print(f"🧠 스마트 대량 검색 시작: '{keyword}'")
+        if index_mode == "offline" and self.index is None:
+            raise RuntimeError(OFFLINE_UNAVAILABLE_MESSAGE)
         
         # 스마트 필드 선택
         selected_fields = self._smart_field_selection(keyword)
         print(f"🎯 선택된 필드: {selected_fields}")
         
         all_patents = {}
+        scores = {}  # app_num -> 관련성 점수
         field_results = {}
         
-        for field in selected_fields:
+        for field_idx, field in enumerate(selected_fields):
+            # 어떤 특허도 최고점을 넘을 수 없으므로 상위 집합이 확정되면 남은 필드 생략
+            if early_stop and self._top_k_settled(scores, max_results, MAX_RELEVANCE_SCORE):
+                print(f"⏹️ 상위 {max_results}건 확정 - '{field}' 필드 생략")
+                continue
+            
             print(f"\n--- '{field}' 필드 검색 ---")
             
-            # 첫 페이지로 총 개수 확인
-            _, total_count = self._search_field(keyword, field, 1, 10)
+            if self.index is not None and index_mode != "online":
+                yield from self._iter_local_field(keyword, field, field_idx, len(selected_fields), index_mode,
+                                                  early_stop, max_results, all_patents, scores, field_results)
+                continue
+            
+            # 첫 페이지로 총 개수 확인 (결과는 그대로 재사용)
+            first = self._search_field(keyword, field, 1, 10, sort_by_date)
+            if first is None:
+                print(f"❌ {field}: 첫 페이지 요청 실패 - 필드 생략")
+                continue
+            first_page, total_count = first
             
             if total_count == 0:
                 continue
@@ -40,53 +334,203 @@ class AdvancedKiprisOptimizer:
             print(f"📊 {field}: {total_count}건 발견")
             field_results[field] = total_count
             
-            # 🔥 대량 수집 전략: 관련성 높은 특허 우선 수집
-            if total_count <= 100:
-                collect_count = total_count
-            elif total_count <= 500:
-                collect_count = int(total_count * 0.7)
-            else:
-                collect_count = max(int(total_count * 0.5), 200)
+            needed_pages = self._plan_pages(field, total_count)
+            yield {
+                "type": "field", "field": field, "total_count": total_count, "needed_pages": needed_pages,
+                "progress": field_idx / len(selected_fields)
+            }
             
-            collect_count = min(collect_count, 500)  # 최대 500건으로 제한
-            needed_pages = math.ceil(collect_count / 10)
+            completed = yield from self._iter_field_pages(keyword, field, field_idx, len(selected_fields), first_page,
+                                                          needed_pages, sort_by_date, early_stop, max_results,
+                                                          all_patents, scores)
+            if completed and self.index is not None:
+                self.index.set_coverage(field, keyword, total_count)
+        
+        final_list = self._finalize(all_patents, scores, max_results, field_results)
+        yield {"type": "done", "patents": final_list, "collected": len(all_patents), "progress": 1.0}
+    
+    def _iter_field_pages(self, keyword: str, field: str, field_idx: int, field_total: int,
+                          first_page: List[PatentRecord], needed_pages: int, sort_by_date: bool, early_stop: bool,
+                          max_results: int, all_patents: Dict[str, PatentRecord], scores: Dict[str, float]) -> Iterator[Dict]:
+        """필드 하나의 페이지 수집/병합 - 첫 페이지는 이미 받은 결과 재사용, 상위 집합 확정 시 중단
+        
+        요청에 실패한 페이지는 건너뛰고 다음 페이지를 계속 병합합니다.
+        계획한 페이지를 빠짐없이 모두 병합했으면 True를 반환합니다 (yield from 결과).
+        """
+        # 이 필드의 남은 페이지에서 도달 가능한 최고 점수 - 출원일 정렬일 때만 페이지 순서로 낮출 수 있음
+        upper_bound = MAX_RELEVANCE_SCORE
+        completed = True
+        
+        # 남은 페이지 병렬 수집 후 페이지 순서대로 병합 (결과 결정성 유지)
+        pages = self._iter_pages(keyword, field, range(2, needed_pages + 1), 10, sort_by_date)
+        for page, patents_page in chain([(1, first_page)], pages):
+            if patents_page is None:
+                print(f"⚠️ {field}: {page}페이지 요청 실패 - 건너뜀")
+                completed = False
+                patents_page = []
+            new_patents = self._merge_page(patents_page, keyword, all_patents, scores)
             
-            print(f"📈 {field}: {collect_count}건 수집 예정 ({needed_pages}페이지)")
+            if sort_by_date and patents_page:
+                upper_bound = min(upper_bound, self._remaining_score_bound(patents_page[-1]))
             
-            # 페이지별 대량 수집
-            for page in range(1, needed_pages + 1):
-                patents_page, _ = self._search_field(keyword, field, page, 10)
-                
-                for patent in patents_page:
-                    app_num = patent.get('app_num', '')
-                    if app_num and app_num not in all_patents:
-                        # 관련성 점수 계산
-                        relevance_score = self._calculate_relevance(patent, keyword)
-                        patent['_relevance_score'] = relevance_score
-                        all_patents[app_num] = patent
-                
-                if page % 5 == 0:  # 5페이지마다 진행상황 출력
-                    print(f"   📄 진행: {page}/{needed_pages} 페이지 ({len(all_patents)}건 수집)")
-                    
-                time.sleep(0.1)  # API 호출 간격 최소화
+            if page % 5 == 0:  # 5페이지마다 진행상황 출력
+                print(f"   📄 진행: {page}/{needed_pages} 페이지 ({len(all_patents)}건 수집)")
+            
+            yield {
+                "type": "page", "field": field, "page": page, "needed_pages": needed_pages,
+                "patents": new_patents, "collected": len(all_patents),
+                "progress": (field_idx + page / needed_pages) / field_total
+            }
+            
+            if early_stop and page < needed_pages and self._top_k_settled(scores, max_results, upper_bound):
+                print(f"⏹️ {field}: 상위 {max_results}건 확정 - {needed_pages - page}페이지 요청 생략")
+                pages.close()  # 대기 중인 페이지 요청 취소
+                return False
+        return completed
+    
+    def _iter_local_field(self, keyword: str, field: str, field_idx: int, field_total: int, index_mode: str,
+                          early_stop: bool, max_results: int, all_patents: Dict[str, PatentRecord],
+                          scores: Dict[str, float], field_results: Dict[str, int]) -> Iterator[Dict]:
+        """로컬 인덱스 우선 수집 - 인덱스 결과를 먼저 병합하고 마지막 수집 이후 늘어난 건수만 요청
+        
+        수집 기록이 없는 검색어는 local_first에서 일반 수집으로 처리합니다 (offline은 인덱스 결과만 사용).
+        """
+        coverage = self.index.get_coverage(field, keyword)
+        local_patents = self.index.search(keyword, field)
+        new_patents = self._merge_page(local_patents, keyword, all_patents, scores)
+        print(f"💾 {field}: 로컬 인덱스 {len(local_patents)}건")
+        yield {
+            "type": "local", "field": field, "patents": new_patents, "collected": len(all_patents),
+            "progress": (field_idx + 0.5) / field_total
+        }
+        
+        if index_mode == "offline" or (coverage is not None and coverage.is_fresh):
+            field_results[field] = len(local_patents)
+            return
+        
+        # 최신순 첫 페이지로 현재 총 건수 확인 - 늘어난 건수만큼만 최신 페이지 요청
+        first = self._search_field(keyword, field, 1, 10, True)
+        if first is None:
+            print(f"❌ {field}: 첫 페이지 요청 실패 - 로컬 결과만 사용")
+            return
+        first_page, total_count = first
+        if total_count == 0:
+            return
+        field_results[field] = total_count
+        
+        if coverage is None:
+            needed_pages = self._plan_pages(field, total_count)
+        else:
+            delta = max(0, total_count - coverage.total_count)
+            needed_pages = math.ceil(delta / 10)
+            print(f"🔄 {field}: 마지막 수집 이후 {delta}건 증가 - {needed_pages}페이지만 요청")
+        
+        completed = True
+        if needed_pages > 0:
+            yield {
+                "type": "field", "field": field, "total_count": total_count, "needed_pages": needed_pages,
+                "progress": field_idx / field_total
+            }
+            completed = yield from self._iter_field_pages(keyword, field, field_idx, field_total, first_page,
+                                                          needed_pages, True, early_stop, max_results,
+                                                          all_patents, scores)
+        if completed:
+            self.index.set_coverage(field, keyword, total_count)
+    
+    def _plan_pages(self, field: str, total_count: int) -> int:
+        """총 건수 기반 수집 계획 - 필요한 페이지 수"""
+        # 🔥 대량 수집 전략: 관련성 높은 특허 우선 수집
+        if total_count <= 100:
+            collect_count = total_count
+        elif total_count <= 500:
+            collect_count = int(total_count * 0.7)
+        else:
+            collect_count = max(int(total_count * 0.5), 200)
         
-        # 관련성 기반 정렬 및 필터링
-        final_list = list(all_patents.values())
-        final_list.sort(key=lambda x: x.get('_relevance_score', 0), reverse=True)
+        collect_count = min(collect_count, 500)  # 최대 500건으로 제한
+        needed_pages = math.ceil(collect_count / 10)
+        
+        print(f"📈 {field}: {collect_count}건 수집 예정 ({needed_pages}페이지)")
+        return needed_pages
+    
+    def _merge_page(self, patents_page: List[PatentRecord], keyword: str, all_patents: Dict[str, PatentRecord],
+                    scores: Dict[str, float]) -> List[PatentRecord]:
+        """app_num 기준 중복 제거 병합 + 관련성 점수 계산 - 새로 추가된 특허 반환"""
+        new_patents = []
+        with span("kipris.merge", items=len(patents_page)) as attributes:
+            for patent in patents_page:
+                app_num = patent.app_num
+                if app_num and app_num not in all_patents:
+                    # 관련성 점수 계산
+                    scores[app_num] = self._calculate_relevance(patent, keyword)
+                    all_patents[app_num] = patent
+                    new_patents.append(patent)
+            attributes["new"] = len(new_patents)
+        return new_patents
+    
+    def _finalize(self, all_patents: Dict[str, PatentRecord], scores: Dict[str, float], max_results: int,
+                  field_results: Dict[str, int]) -> PatentTable:
+        """관련성 기반 정렬 및 상위 max_results건 선별"""
+        with span("kipris.finalize", items=len(all_patents)):
+            final_list = list(all_patents.values())
+            final_list.sort(key=lambda x: scores[x.app_num], reverse=True)
         
         # 최종 결과 제한
         if len(final_list) > max_results:
             final_list = final_list[:max_results]
             print(f"🎯 관련성 기반 상위 {max_results}건 선별")
         
-        # 관련성 점수 제거
-        for patent in final_list:
-            patent.pop('_relevance_score', None)
-        
-        print(f"🎯 최종 수집: {len(final_list)}건 (API 호출: {self.call_count}회)")
+        print(f"🎯 최종 수집: {len(final_list)}건 (API 호출: {self.network_count}회, 캐시 적중: {self.cache_hit_count}회, 공유: {self.shared_count}회, 재시도: {self.retry_count}회, 실패: {self.failed_count}페이지)")
         print(f"📊 필드별 발견 현황: {field_results}")
+        return PatentTable.from_records(final_list)
+    
+    def _iter_pages(self, keyword: str, field: str, pages: Iterable[int], num_of_rows: int = 10,
+                    sort_by_date: bool = False) -> Iterator[Tuple[int, Optional[List[PatentRecord]]]]:
+        """제한된 워커 풀로 페이지 병렬 수집 - (페이지 번호, 특허 목록 또는 실패 시 None)을 페이지 순서대로 yield
         
-        return final_list
+        미리 요청하는 페이지는 워커 수의 2배로 제한되어, 소비자가 도중에 close()하면
+        대기 중인 요청이 취소되고 낭비되는 호출이 적습니다. 공유 워커 풀이 있으면 그 풀에 제출합니다.
+        """
+        page_iter = iter(pages)
+        lookahead = self.max_workers * 2
+        
+        def fetch(page: int) -> Optional[List[PatentRecord]]:
+            result = self._search_field(keyword, field, page, num_of_rows, sort_by_date)
+            return result[0] if result is not None else None
+        
+        pool = nullcontext(self.executor) if self.executor is not None else ThreadPoolExecutor(max_workers=self.max_workers)
+        with pool as executor:
+            fetch = propagate(fetch)  # 현재 요청의 스팬 수집기를 워커로 전달
+            pending = deque((page, executor.submit(fetch, page)) for page in islice(page_iter, lookahead))
+            try:
+                while pending:
+                    page, future = pending.popleft()
+                    yield page, future.result()
+                    next_page = next(page_iter, None)
+                    if next_page is not None:
+                        pending.append((next_page, executor.submit(fetch, next_page)))
+            finally:
+                for _, queued in pending:
+                    queued.cancel()
+    
+    @staticmethod
+    def _top_k_settled(scores: Dict[str, float], k: int, upper_bound: float) -> bool:
+        """현재 k번째 점수가 남은 특허의 상한 이상이면 상위 k건은 더 이상 바뀌지 않음
+        
+        정렬이 안정 정렬이라 동점인 후속 특허는 기존 특허 뒤에 놓이므로 '이상'으로 충분합니다.
+        """
+        if k <= 0 or len(scores) < k:
+            return False
+        kth_score = heapq.nlargest(k, scores.values())[-1]
+        return kth_score >= upper_bound
+    
+    @staticmethod
+    def _remaining_score_bound(last_patent: PatentRecord) -> float:
+        """출원일 내림차순 정렬에서 마지막 특허 이후 특허들이 받을 수 있는 최고 점수"""
+        app_date = last_patent.app_date
+        if len(app_date) >= 4 and app_date[:4].isdigit() and int(app_date[:4]) < RECENT_YEAR:
+            return MAX_RELEVANCE_SCORE - RECENT_BONUS
+        return MAX_RELEVANCE_SCORE
     
     def _smart_field_selection(self, keyword: str) -> List[str]:
         """키워드 특성 분석 후 최적 필드 선택 - 부분일치 지원"""
@@ -109,41 +553,95 @@ class AdvancedKiprisOptimizer:
         # 일반 키워드 - 초록만 검색
         return ['astrtCont']
     
-    def _calculate_relevance(self, patent: Dict, keyword: str) -> float:
+    def _calculate_relevance(self, patent: PatentRecord, keyword: str) -> float:
         """특허의 키워드 관련성 점수 계산"""
         score = 0.0
         keyword_lower = keyword.lower()
         
         # 제목에서 키워드 매칭 (가중치 3.0)
-        title = patent.get('title', '').lower()
+        title = patent.title.lower()
         if keyword_lower in title:
-            score += 3.0
+            score += TITLE_WEIGHT
         
         # 초록에서 키워드 매칭 (가중치 2.0)
-        abstract = patent.get('abstract', '').lower()
+        abstract = patent.abstract.lower()
         if keyword_lower in abstract:
-            score += 2.0
+            score += ABSTRACT_WEIGHT
         
         # 등록 특허 우대 (가중치 1.0)
-        reg_status = patent.get('reg_status', '')
+        reg_status = patent.reg_status
         if '등록' in reg_status:
-            score += 1.0
+            score += REGISTERED_BONUS
         
         # 최신 특허 우대 (가중치 0.5)
-        app_date = patent.get('app_date', '')
+        app_date = patent.app_date
         if app_date and len(app_date) >= 4:
             try:
                 year = int(app_date[:4])
-                if year >= 2020:
-                    score += 0.5
+                if year >= RECENT_YEAR:
+                    score += RECENT_BONUS
             except:
                 pass
         
         return score
     
-    def _search_field(self, keyword: str, field: str, page_no: int = 1, num_of_rows: int = 10) -> Tuple[List[Dict], int]:
-        """필드별 검색 실행 - 발명자 정보 완전 해결 + 부분일치 검색"""
-        self.call_count += 1
+    def _search_field(self, keyword: str, field: str, page_no: int = 1, num_of_rows: int = 10,
+                      sort_by_date: bool = False) -> Optional[Tuple[List[PatentRecord], int]]:
+        """필드별 검색 실행 - 발명자 정보 완전 해결 + 부분일치 검색
+        
+        (특허 목록, 총 건수)를 반환하고, 네트워크/재시도 한도/응답 파싱 실패면 None을 반환합니다
+        (결과가 없는 정상 응답은 ([], 0)이므로 호출자는 실패와 빈 결과를 구분해야 합니다).
+        """
+        cache_key, params, cached = self._begin_request(keyword, field, page_no, num_of_rows, sort_by_date)
+        if cached is not None:
+            return cached
+        
+        if self.single_flight is None:
+            result = self._fetch_page(field, cache_key, params)
+        else:
+            # 같은 서버/키/요청이 진행 중이면 그 HTTP 호출과 파싱 결과를 함께 사용
+            result, shared = self.single_flight.do((self.base_url, self.api_key, cache_key),
+                                                   lambda: self._fetch_page(field, cache_key, params))
+            if shared:
+                with self._lock:
+                    self.shared_count += 1
+        
+        if result is None:
+            with self._lock:
+                self.failed_count += 1
+            return None
+        patents, total_count = result
+        return list(patents), total_count
+    
+    def _fetch_page(self, field: str, cache_key: str, params: Dict) -> Optional[Tuple[List[PatentRecord], int]]:
+        """API 호출 + 파싱 - 재시도 후에도 실패하면 None"""
+        with self._lock:
+            self.network_count += 1
+        
+        try:
+            content = self._fetch_content(params)
+            
+            if content is None:
+                return None
+            
+            return self._finish_request(cache_key, content)
+            
+        except Exception as e:
+            print(f"❌ {field} 검색 오류: {e}")
+            return None
+    
+    def _fetch_content(self, params: Dict) -> Optional[bytes]:
+        """HTTP 요청 - 200 응답 본문, 재시도 후에도 실패하면 None (비동기 수집기는 aiohttp로 교체)"""
+        response = self._get_with_retry(params)
+        if response is None or response.status_code != 200:
+            return None
+        return response.content
+    
+    def _begin_request(self, keyword: str, field: str, page_no: int, num_of_rows: int,
+                       sort_by_date: bool) -> Tuple[str, Dict, Optional[Tuple[List[PatentRecord], int]]]:
+        """요청 준비 - (캐시 키, 요청 파라미터, 캐시 적중 결과 또는 None)"""
+        with self._lock:
+            self.call_count += 1
         
         # 출원인 검색 시 부분일치 적용
         if field == 'applicantName':
@@ -158,81 +656,134 @@ class AdvancedKiprisOptimizer:
             "numOfRows": num_of_rows,
             "pageNo": page_no
         }
+        if sort_by_date:
+            # 출원일 내림차순 - 최신 특허가 앞 페이지에 오도록 서버 측 정렬
+            params["sortSpec"] = "AD"
+            params["descSort"] = "true"
         
-        try:
-            response = requests.get(self.base_url, params=params, timeout=30)
-            
-            if response.status_code != 200:
-                return [], 0
-            
-            root = ET.fromstring(response.content)
-            
-            if root.findtext(".//successYN", "N") != "Y":
-                return [], 0
-            
-            total_count = int(root.findtext(".//totalCount", "0"))
-            patents = []
-            
-            for item in root.findall(".//item"):
-                app_num = item.findtext(".//applicationNumber", "").strip()
-                
-                # 🔥 발명자 정보 완전 해결
-                inventor_info = self._extract_inventor_complete(item)
-                
-                patent = {
-                    "title": item.findtext(".//inventionTitle", "정보없음").strip(),
-                    "app_num": app_num,
-                    "abstract": item.findtext(".//astrtCont", "정보없음").strip(),
-                    "applicant": item.findtext(".//applicantName", "정보없음").strip(),
-                    "inventor": inventor_info,  # 완전히 개선된 발명자 정보
-                    "app_date": item.findtext(".//applicationDate", "").strip(),
-                    "reg_status": item.findtext(".//registerStatus", "출원").strip(),
-                    "reg_num": item.findtext(".//registerNumber", "").strip(),
-                    "kipris_url": self._generate_kipris_url(app_num),  # 개선된 링크
-                    "link": self._generate_kipris_url(app_num),  # 호환성을 위해 유지
-                    "ipc_code": item.findtext(".//ipcCode", "").strip()
-                }
-                patents.append(patent)
-            
-            return patents, total_count
-            
-        except Exception as e:
-            print(f"❌ {field} 검색 오류: {e}")
-            return [], 0
-    
-    def _extract_inventor_complete(self, item_xml) -> str:
-        """발명자 정보 완전 추출 - 모든 패턴 대응"""
-        inventor_candidates = []
-        
-        # 다양한 XML 태그 패턴에서 발명자 정보 추출 시도
-        possible_tags = [
-            './/inventorName',
-            './/inventor', 
-            './/invtNm',
-            './/personName',
-            './/inventors/inventor',
-            './/inventors/inventorName'
-        ]
-        
-        for tag_pattern in possible_tags:
-            try:
-                elements = item_xml.findall(tag_pattern)
-                if elements:
-                    for elem in elements:
-                        if elem.text and elem.text.strip():
-                            inventor_candidates.append(elem.text.strip())
-            except:
-                continue
+        cache_key = KiprisResponseCache.make_key(self.base_url, field, search_value, page_no, num_of_rows, "AD-desc" if sort_by_date else "")
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                with self._lock:
+                    self.cache_hit_count += 1
+                return cache_key, params, cached
+        return cache_key, params, None
+    
+    def _finish_request(self, cache_key: str, content: bytes) -> Optional[Tuple[List[PatentRecord], int]]:
+        """응답 본문 파싱 + 성공 응답만 캐시 저장 - 실패 응답이면 None"""
+        with span("kipris.parse", bytes=len(content)) as attributes:
+            parsed = self._parse_response(content)
+            attributes["items"] = len(parsed[0]) if parsed else 0
+        if parsed is None:
+            return None
+        
+        patents, total_count = parsed
+        if self.cache is not None:
+            self.cache.set(cache_key, patents, total_count)
+        if self.index is not None:
+            with span("kipris.index", items=len(patents)):
+                self.index.add(patents)
+        return patents, total_count
+    
+    def _parse_response(self, content: bytes) -> Optional[Tuple[List[PatentRecord], int]]:
+        """KIPRIS XML 응답 스트리밍 파싱 - 실패 응답(successYN != Y)이면 None
+        
+        item 단위로 iterparse 하면서 각 item 하위 요소를 한 번만 순회해 모든 필드를 추출하고,
+        처리한 item은 바로 비워 대량 응답에서도 메모리를 일정하게 유지합니다.
+        """
+        success_yn = None
+        total_count = None
+        patents = []
+        
+        for _, elem in xml_parser.iterparse(io.BytesIO(content), events=("end",)):
+            tag = elem.tag
+            if tag == "item":
+                patents.append(self._parse_item(elem))
+                elem.clear()
+            elif tag == "successYN" and success_yn is None:
+                success_yn = elem.text or ""
+            elif tag == "totalCount" and total_count is None:
+                total_count = elem.text or ""
+        
+        if (success_yn or "N") != "Y":
+            return None
+        
+        return patents, int(total_count or "0")
+    
+    def _parse_item(self, item) -> PatentRecord:
+        """item 요소 단일 순회로 특허 정보 추출 - 각 태그의 첫 값 + 발명자 후보 전체"""
+        values = {}
+        inventor_texts = {tag: [] for tag in INVENTOR_TAGS}
+        
+        for elem in item.iter():
+            tag = elem.tag
+            key = ITEM_FIELD_TAGS.get(tag)
+            if key is not None and key not in values:
+                values[key] = elem.text or ""
+            texts = inventor_texts.get(tag)
+            if texts is not None and elem.text and elem.text.strip():
+                texts.append(elem.text.strip())
         
-        # 단일 태그에서 시도
-        for tag_pattern in possible_tags:
+        # 🔥 발명자 정보 완전 해결 - 태그 우선순위 순으로 후보 결합
+        inventor_info = self._format_inventors([text for tag in INVENTOR_TAGS for text in inventor_texts[tag]])
+        
+        # kipris_url/link는 저장하지 않고 app_num으로 계산
+        return PatentRecord.create(
+            title=values.get("title", "정보없음").strip(),
+            app_num=values.get("app_num", "").strip(),
+            abstract=values.get("abstract", "정보없음").strip(),
+            applicant=values.get("applicant", "정보없음").strip(),
+            inventor=inventor_info,  # 완전히 개선된 발명자 정보
+            app_date=values.get("app_date", "").strip(),
+            reg_status=values.get("reg_status", "출원").strip(),
+            reg_num=values.get("reg_num", "").strip(),
+            ipc_code=values.get("ipc_code", "").strip()
+        )
+    
+    def _get_with_retry(self, params: Dict) -> Optional[requests.Response]:
+        """429/5xx/타임아웃 시 지수 백오프 + 지터로 재시도 - 최종 실패 시 None"""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            with span("kipris.rate_wait"):
+                self.rate_limiter.acquire()  # 프로세스 공용 호출 속도 제한
             try:
-                elem = item_xml.find(tag_pattern)
-                if elem is not None and elem.text and elem.text.strip():
-                    inventor_candidates.append(elem.text.strip())
-            except:
-                continue
+                with span("kipris.network", attempt=attempt + 1) as attributes:
+                    response = self.session.get(self.base_url, params=params, timeout=30)
+                    attributes["status"] = response.status_code
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except (requests.Timeout, requests.ConnectionError) as e:
+                reason = type(e).__name__
+            
+            delay = self._next_retry_delay(attempt, reason, retry_after)
+            if delay is None:
+                return None
+            time.sleep(delay)
+        return None
+    
+    def _next_retry_delay(self, attempt: int, reason: str, retry_after: Optional[str] = None) -> Optional[float]:
+        """재시도 대기 시간 계산 - 지수 백오프 + 지터, 한도 초과 시 None"""
+        if attempt >= self.max_retries:
+            print(f"❌ 재시도 한도 초과 ({reason})")
+            return None
         
+        with self._lock:
+            self.retry_count += 1
+        
+        delay = self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+        if retry_after and str(retry_after).isdigit():
+            delay = max(delay, float(retry_after))
+        if reason == "HTTP 429":
+            # 쓰로틀링은 프로세스 전체 할당량 문제이므로 모든 세션이 함께 대기
+            self.rate_limiter.pause(delay)
+        print(f"⏳ {reason} - {delay:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+        return delay
+    
+    def _format_inventors(self, inventor_candidates: List[str]) -> str:
+        """발명자 후보 정제 - 구분자 분할, 중복 제거, 표시 형식 통일"""
         # 중복 제거 및 정제
         unique_inventors = []
         for inventor in inventor_candidates:
@@ -259,25 +810,65 @@ class AdvancedKiprisOptimizer:
     
     def _generate_kipris_url(self, app_num: str) -> str:
         """KIPRIS 상세페이지 URL 생성 - 다중 패턴 지원"""
-        if not app_num:
-            return ""
-        
-        clean_num = app_num.replace('-', '')
-        
-        # 가장 안정적인 KIPRIS Plus URL 패턴
-        return f"https://plus.kipris.or.kr/kpat/search/SearchMain.do?method=searchUTL&param1={clean_num}"
+        return kipris_detail_url(app_num)
 
 # 호환성을 위한 메인 함수
-def search_all_patents(api_key: str, keyword: str, search_fields: List[str], max_results: int = 200, progress_callback=None) -> List[Dict]:
-    """메인 검색 함수 - 스마트 대량 수집"""
-    optimizer = AdvancedKiprisOptimizer(api_key)
-    return optimizer.smart_comprehensive_search(keyword, max_results)
+def search_all_patents(api_key: str, keyword: str, search_fields: List[str], max_results: int = 200, progress_callback=None,
+                       max_workers: int = 4, use_cache: bool = True, early_stop: bool = True,
+                       sort_by_date: bool = False, semantic_rerank: bool = False,
+                       index_mode: str = "online") -> PatentTable:
+    """메인 검색 함수 - 스마트 대량 수집
+    
+    semantic_rerank: max_results의 RERANK_CANDIDATE_FACTOR배를 후보로 수집한 뒤
+                     로컬 임베딩 유사도로 재정렬해 상위 max_results건 선별
+    index_mode: 로컬 인덱스 사용 방식 - "online" / "local_first" / "offline" (INDEX_MODES 참고)
+    """
+    harvest_size = max_results * RERANK_CANDIDATE_FACTOR if semantic_rerank else max_results
+    optimizer = AdvancedKiprisOptimizer(api_key, max_workers=max_workers, cache=get_default_cache() if use_cache else None,
+                                        index=get_default_index())
+    try:
+        patents = optimizer.smart_comprehensive_search(keyword, harvest_size, early_stop=early_stop,
+                                                       sort_by_date=sort_by_date, progress_callback=progress_callback,
+                                                       index_mode=index_mode)
+    finally:
+        optimizer.close()
+    return rerank_patents(keyword, patents, top_k=max_results) if semantic_rerank else patents
 
-def get_patent_details(api_key: str, app_num: str) -> Optional[Dict]:
-    """특허 상세정보 조회"""
-    optimizer = AdvancedKiprisOptimizer(api_key)
+def iter_patents(api_key: str, keyword: str, max_results: int = 200, max_workers: int = 4, use_cache: bool = True,
+                 early_stop: bool = True, sort_by_date: bool = False, semantic_rerank: bool = False,
+                 index_mode: str = "online") -> Iterator[Dict]:
+    """스트리밍 검색 함수 - 페이지 도착 즉시 신규 특허와 진행 이벤트 yield (마지막은 "done" 이벤트)
+    
+    semantic_rerank이면 "done" 이벤트의 patents가 의미 재정렬된 상위 max_results건입니다.
+    """
+    harvest_size = max_results * RERANK_CANDIDATE_FACTOR if semantic_rerank else max_results
+    optimizer = AdvancedKiprisOptimizer(api_key, max_workers=max_workers, cache=get_default_cache() if use_cache else None,
+                                        index=get_default_index())
+    try:
+        for event in optimizer.iter_comprehensive_search(keyword, harvest_size, early_stop=early_stop,
+                                                         sort_by_date=sort_by_date, index_mode=index_mode):
+            if event["type"] == "done" and semantic_rerank:
+                event = {**event, "patents": rerank_patents(keyword, event["patents"], top_k=max_results)}
+            yield event
+    finally:
+        optimizer.close()
+
+def get_patent_details(api_key: str, app_num: str, index_mode: str = "online") -> Optional[PatentRecord]:
+    """특허 상세정보 조회 - online이 아니면 로컬 인덱스에서 먼저 찾음 (offline인데 인덱스가 없으면 RuntimeError)"""
+    index = get_default_index()
+    if index is None and index_mode == "offline":
+        raise RuntimeError(OFFLINE_UNAVAILABLE_MESSAGE)
+    if index is not None and index_mode != "online":
+        # 출원번호가 정확히 같은 특허만 - 부분 번호로 엉뚱한 최신 특허를 돌려주지 않고 KIPRIS 조회로 넘어감
+        local = index.get(app_num)
+        if local is not None or index_mode == "offline":
+            return local
+    
+    optimizer = AdvancedKiprisOptimizer(api_key, cache=get_default_cache(), index=index)
     try:
-        patents, _ = optimizer._search_field(app_num, "applicationNumber", 1, 1)
-        return patents[0] if patents else None
+        result = optimizer._search_field(app_num, "applicationNumber", 1, 1)
+        return result[0][0] if result and result[0] else None
     except:
         return None
+    finally:
+        optimizer.close()
@@ -2,32 +2,268 @@
 PDF 다운로드 지원 + 향상된 AI 분석 엔진
 """
 
-import google.generativeai as genai
+import hashlib
 import json
-from typing import List, Dict, Any, Optional
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 import io
 
+from src.instrumentation import propagate, span
+from src.patent_stats import get_patent_stats
+from src.patent_table import PatentTable
+from src.pdf_report import build_pdf_report
+from src.prompt_builder import PromptBuild, PromptBuilder, count_tokens, estimate_tokens, truncate_to_tokens
+from src.sqlite_store import SqliteTTLStore, default_cache_dir
+
+# Gemini 모델 이름
+PRO_MODEL_NAME = 'gemini-2.0-flash-exp'
+FLASH_MODEL_NAME = 'gemini-1.5-flash'
+
+# 프롬프트 토큰 예산 (로컬 추정 기준)
+SUMMARY_ABSTRACT_TOKENS = 500  # 단건 요약에 넣는 초록 길이
+ANALYSIS_PROMPT_TOKENS = 24000  # 종합 분석 프롬프트 전체 예산 - 남는 만큼 특허 근거로 채움
+EVIDENCE_ABSTRACT_TOKENS = 120  # 근거 특허 1건당 초록 길이
+
+# 일괄 요약 설정 - 초록은 건당 잘라서 넣고, 프롬프트 하나의 크기/건수를 제한
+BATCH_ABSTRACT_TOKENS = 300
+BATCH_PROMPT_TOKENS = 6000
+BATCH_MAX_ITEMS = 20
+BATCH_CONCURRENCY = 4
+
+# 맵리듀스 분석 설정 - 청크당 토큰 예산, 리듀스 단계에서 한 번에 합치는 노트 수
+MAP_CHUNK_TOKENS = 6000
+MAP_ABSTRACT_TOKENS = 300
+REDUCE_FANOUT = 6
+MAP_REDUCE_ATTEMPTS = 2  # 맵/리듀스 호출 1건당 시도 횟수 (실패 시 1회 재시도)
+
+class LLMResponseCache(SqliteTTLStore[str]):
+    """LLM 응답 영구 캐시 - (모델명, 생성 설정, 프롬프트) 해시를 키로 응답 텍스트 저장"""
+    
+    def __init__(self, cache_dir: Optional[str] = None, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000):
+        path = os.path.join(cache_dir or default_cache_dir("LLM_CACHE_DIR"), "llm_responses.sqlite3")
+        super().__init__(path, "llm_responses", str, str, ttl_seconds, max_entries)
+    
+    @staticmethod
+    def make_key(model_name: str, prompt: str, generation_config: Optional[Dict] = None) -> str:
+        """내용 주소 키 - 모델명 + 생성 설정 + 프롬프트의 SHA-256"""
+        digest = hashlib.sha256(model_name.encode("utf-8"))
+        digest.update(b"\0" + json.dumps(generation_config or {}, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0" + prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+_default_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_default_llm_cache() -> Optional[LLMResponseCache]:
+    """프로세스 공용 LLM 응답 캐시 - LLM_CACHE_DISABLED=1 이면 사용 안 함"""
+    global _default_llm_cache
+    if os.getenv("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _llm_cache_lock:
+        if _default_llm_cache is None:
+            try:
+                ttl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+                _default_llm_cache = LLMResponseCache(ttl_seconds=ttl)
+            except Exception as e:
+                print(f"⚠️ LLM 캐시 초기화 실패 (캐시 없이 진행): {e}")
+                return None
+        return _default_llm_cache
+
+# 🔥 프로세스 공용 모델/분석기 레지스트리 - google.generativeai는 첫 사용 시에만 import
+_models: Dict[tuple, Any] = {}
+_client_managers: Dict[str, Any] = {}
+_analyzers: Dict[str, "AdvancedPatentAnalyzer"] = {}
+_model_class: Optional[type] = None
+_registry_lock = threading.Lock()
+
+def _get_client_manager(api_key: str):
+    """API 키별 클라이언트 관리자 - genai.configure와 같은 설정(키, user agent)을 전역 대신 키마다 따로 보관
+    
+    호출자가 _registry_lock을 잡고 호출합니다.
+    """
+    manager = _client_managers.get(api_key)
+    if manager is None:
+        from google.generativeai import client as genai_client
+        manager = genai_client._ClientManager()
+        manager.configure(api_key=api_key)
+        _client_managers[api_key] = manager
+    return manager
+
+def _get_model_class() -> type:
+    """API 키별 클라이언트를 쓰는 GenerativeModel 하위 클래스 - 호출자가 _registry_lock을 잡고 호출
+    
+    GenerativeModel은 생성자로 클라이언트를 받지 않고, _client/_async_client가 비어 있으면 전역 기본
+    클라이언트를 가져다 씁니다. 동기 클라이언트는 생성 때 채우고, 비동기 클라이언트는 이벤트 루프가 있어야
+    만들 수 있으므로(Streamlit 스크립트 스레드에는 없음) *_async 호출이 처음 읽을 때 자기 키로 만듭니다.
+    """
+    global _model_class
+    if _model_class is None:
+        import google.generativeai as genai
+        
+        class KeyedGenerativeModel(genai.GenerativeModel):
+            def __init__(self, model_name: str, client_manager):
+                super().__init__(model_name)
+                self._client_manager = client_manager
+                self._client = client_manager.get_default_client("generative")
+            
+            @property
+            def _async_client(self):
+                return self._client_manager.get_default_client("generative_async")
+            
+            @_async_client.setter
+            def _async_client(self, client):
+                pass  # 부모 생성자의 None 초기화 무시 - 항상 자기 키의 클라이언트 사용
+        
+        _model_class = KeyedGenerativeModel
+    return _model_class
+
+def get_generative_model(api_key: str, model_name: str):
+    """(API 키, 모델명)별 GenerativeModel 1개를 공유
+    
+    genai.configure는 프로세스 전역 설정이라 키가 다른 세션끼리 서로의 모델을 마지막 키로 바꿔 버리므로,
+    모델마다 자기 키로 만든 동기/비동기 클라이언트를 쓰고 전역 설정은 쓰지 않습니다.
+    """
+    key = (api_key, model_name)
+    with _registry_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _get_model_class()(model_name, _get_client_manager(api_key))
+            _models[key] = model
+        return model
+
+def get_analyzer(api_key: str) -> "AdvancedPatentAnalyzer":
+    """API 키별 공용 분석기 - 앱 세션과 호환성 함수들이 호출마다 새로 만들지 않도록 재사용"""
+    with _registry_lock:
+        analyzer = _analyzers.get(api_key)
+        if analyzer is None:
+            analyzer = AdvancedPatentAnalyzer(api_key)
+            _analyzers[api_key] = analyzer
+        return analyzer
+
+@dataclass(frozen=True)
+class AnalysisResult:
+    """분석 결과 - 보고서 텍스트 + 이 실행의 단계별 소요 시간/반영 범위 + 프롬프트 크기 보고
+    
+    분석기는 API 키별로 모든 세션이 공유하므로 실행별 정보는 분석기 속성이 아니라 결과로 돌려줍니다.
+    """
+    text: str
+    stages: Dict[str, float] = field(default_factory=dict)
+    prompt_build: Optional[PromptBuild] = None
+
 class AdvancedPatentAnalyzer:
     """고도화된 특허 분석 + PDF 생성 클래스"""
     
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model_pro = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.model_flash = genai.GenerativeModel('gemini-1.5-flash')
+    def __init__(self, api_key: str, cache: Optional[LLMResponseCache] = None, use_cache: bool = True,
+                 prompt_budget_tokens: int = ANALYSIS_PROMPT_TOKENS, exact_token_count: bool = False):
+        # 모델은 첫 요청 때 공용 레지스트리에서 가져옴 (생성 비용 없음)
+        self.api_key = api_key
+        self._model_pro = None
+        self._model_flash = None
+        self.cache = cache if cache is not None else (get_default_llm_cache() if use_cache else None)
+        self.prompt_budget_tokens = prompt_budget_tokens
+        self.exact_token_count = exact_token_count  # True면 count_tokens API로 최종 크기 측정
+    
+    @property
+    def model_pro(self):
+        if self._model_pro is None:
+            self._model_pro = get_generative_model(self.api_key, PRO_MODEL_NAME)
+        return self._model_pro
+    
+    @model_pro.setter
+    def model_pro(self, model):
+        self._model_pro = model
+    
+    @property
+    def model_flash(self):
+        if self._model_flash is None:
+            self._model_flash = get_generative_model(self.api_key, FLASH_MODEL_NAME)
+        return self._model_flash
+    
+    @model_flash.setter
+    def model_flash(self, model):
+        self._model_flash = model
+    
+    def _generate(self, model, prompt: str, generation_config: Optional[Dict] = None,
+                  validate: Optional[Callable[[str], Any]] = None) -> str:
+        """캐시를 거쳐 생성 - 같은 (모델, 프롬프트)는 재호출하지 않음, 오류 응답은 저장하지 않음
+        
+        validate: 응답 검증 함수 - 예외를 내면 그 응답은 캐시에 저장하지 않고 예외를 그대로 전달
+                  (검증에 실패하는 캐시 항목은 없는 것으로 보고 다시 생성)
+        """
+        with span("llm.generate", model=model.model_name, cached=False) as attributes:
+            key = None
+            if self.cache is not None:
+                key = LLMResponseCache.make_key(model.model_name, prompt, generation_config)
+                cached = self.cache.get(key)
+                if cached is not None and self._is_valid(cached, validate):
+                    attributes["cached"] = True
+                    return cached
+            
+            if generation_config:
+                response = model.generate_content(prompt, generation_config=generation_config)
+            else:
+                response = model.generate_content(prompt)
+            text = response.text
+            
+            if validate is not None:
+                validate(text)
+            if key is not None and text:
+                self.cache.set(key, text)
+            return text
+    
+    @staticmethod
+    def _is_valid(text: str, validate: Optional[Callable[[str], Any]]) -> bool:
+        if validate is None:
+            return True
+        try:
+            validate(text)
+            return True
+        except Exception:
+            return False
+    
+    def _generate_stream(self, model, prompt: str) -> Iterator[str]:
+        """캐시를 거친 스트리밍 생성 - 캐시 적중 시 전체 텍스트를 한 번에, 완료된 응답만 저장
+        
+        llm.stream 스팬의 first_chunk 속성은 첫 조각까지 걸린 시간(초)입니다.
+        """
+        key = None
+        if self.cache is not None:
+            key = LLMResponseCache.make_key(model.model_name, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        with span("llm.stream", model=model.model_name) as attributes:
+            started = time.perf_counter()
+            for chunk in model.generate_content(prompt, stream=True):
+                text = chunk.text
+                if text:
+                    if not chunks:
+                        attributes["first_chunk"] = round(time.perf_counter() - started, 3)
+                    chunks.append(text)
+                    yield text
+            attributes["chunks"] = len(chunks)
+        
+        if key is not None and chunks:
+            self.cache.set(key, "".join(chunks))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """LLM 캐시 적중/실패 횟수 - 캐시 미사용 시 빈 dict"""
+        return self.cache.stats() if self.cache is not None else {}
     
     def quick_summarize(self, text: str) -> str:
         """빠른 요약 - Flash 모델 사용"""
         try:
             prompt = f"""다음 특허 초록을 전문가 수준으로 간단히 요약해주세요.
 
-초록: {text[:1000]}
+초록: {truncate_to_tokens(text, SUMMARY_ABSTRACT_TOKENS)}
 
 요약 기준:
 - 핵심 기술 내용
@@ -35,142 +271,297 @@ class AdvancedPatentAnalyzer:
 - 응용 분야
 - 3-4문장으로 정리"""
 
-            response = self.model_flash.generate_content(prompt)
-            return response.text
+            return self._generate(self.model_flash, prompt)
         except Exception as e:
             return f"요약 오류: {e}"
     
+    def batch_summarize(self, patents: List[Dict], max_concurrency: int = BATCH_CONCURRENCY,
+                        progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, str]:
+        """일괄 요약 - 여러 초록을 프롬프트 하나에 묶어 JSON으로 받음 (출원번호 -> 요약)
+        
+        배치는 max_concurrency개까지 동시에 요청하고, 응답에서 빠진 특허는 요약 오류로 표시합니다.
+        """
+        items = []
+        for patent in patents:
+            app_num = patent.get('app_num', '')
+            abstract = patent.get('abstract', '')
+            if app_num and abstract and abstract != '정보없음':
+                items.append((app_num, patent.get('title', ''), abstract))
+        
+        batches = self._build_summary_batches(items)
+        if not batches:
+            return {}
+        
+        print(f"🤖 일괄 요약 시작: {len(items)}건 → {len(batches)}회 요청")
+        summaries = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as executor:
+            for done, batch_result in enumerate(executor.map(propagate(self._summarize_batch), batches), 1):
+                summaries.update(batch_result)
+                if progress_callback:
+                    progress_callback(done, len(batches))
+        return summaries
+    
+    def _build_summary_batches(self, items: List[tuple]) -> List[List[tuple]]:
+        """(출원번호, 제목, 초록) 목록을 프롬프트 토큰/건수 제한에 맞게 분할"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for app_num, title, abstract in items:
+            item = (app_num, truncate_to_tokens(title, 100), truncate_to_tokens(abstract, BATCH_ABSTRACT_TOKENS))
+            item_tokens = sum(estimate_tokens(value) for value in item)
+            if current and (len(current) >= BATCH_MAX_ITEMS or current_tokens + item_tokens > BATCH_PROMPT_TOKENS):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(item)
+            current_tokens += item_tokens
+        if current:
+            batches.append(current)
+        return batches
+    
+    def _summarize_batch(self, batch: List[tuple]) -> Dict[str, str]:
+        """배치 하나 요약 - Flash 모델 1회 호출"""
+        payload = [{"app_num": app_num, "title": title, "abstract": abstract} for app_num, title, abstract in batch]
+        prompt = f"""다음 특허 초록들을 각각 전문가 수준으로 간단히 요약해주세요.
+
+요약 기준:
+- 핵심 기술 내용, 주요 특징 및 장점, 응용 분야
+- 특허별 2-3문장으로 정리
+
+출력 형식: 입력과 같은 app_num을 가진 JSON 배열만 출력
+[{{"app_num": "...", "summary": "..."}}]
+
+특허 목록:
+{json.dumps(payload, ensure_ascii=False)}"""
+        
+        try:
+            text = self._generate(self.model_flash, prompt, {"response_mime_type": "application/json"},
+                                  validate=self._parse_batch_summaries)
+            summaries = self._parse_batch_summaries(text)
+        except Exception as e:
+            print(f"❌ 일괄 요약 오류: {e}")
+            return {app_num: f"요약 오류: {e}" for app_num, _, _ in batch}
+        
+        return {app_num: summaries.get(app_num) or "요약 오류: 응답에 누락됨" for app_num, _, _ in batch}
+    
+    @staticmethod
+    def _parse_batch_summaries(text: str) -> Dict[str, str]:
+        """일괄 요약 응답 파싱 - JSON 배열이 아니면 ValueError (잘린/깨진 응답은 캐시하지 않음)"""
+        parsed = json.loads(text)
+        if not isinstance(parsed, list):
+            raise ValueError(f"JSON 배열이 아닌 응답: {type(parsed).__name__}")
+        return {
+            str(entry.get('app_num', '')): str(entry.get('summary', '')).strip()
+            for entry in parsed if isinstance(entry, dict)
+        }
+    
     def comprehensive_analysis(self, patents: List[Dict], analysis_type: str, user_query: str = "") -> str:
         """종합 특허 분석 - 대량 데이터 처리 최적화"""
         try:
-            print(f"🧠 AI 분석 시작: {len(patents)}건 특허 분석 중...")
-            
-            # 데이터 전처리 및 통계 생성
-            analysis_data = self._prepare_comprehensive_data(patents)
-            
-            # 분석 타입별 프롬프트 생성
-            prompt = self._generate_expert_prompt(analysis_data, analysis_type, user_query)
-            
-            response = self.model_pro.generate_content(prompt)
-            return response.text
+            build = self.build_analysis_prompt(patents, analysis_type, user_query)
+            return self._generate(self.model_pro, build.prompt)
             
         except Exception as e:
             return f"분석 오류: {e}"
     
-    def generate_pdf_report(self, analysis_data: Dict, analysis_result: str) -> io.BytesIO:
-        """전문적인 PDF 보고서 생성"""
-        buffer = io.BytesIO()
+    def comprehensive_analysis_stream(self, patents: List[Dict], analysis_type: str, user_query: str = "",
+                                      prompt_build: Optional[PromptBuild] = None) -> Iterator[str]:
+        """종합 특허 분석 스트리밍 버전 - 생성되는 대로 텍스트 조각을 반환 (이어붙이면 전체 보고서)
         
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        
-        styles = getSampleStyleSheet()
-        
-        # 한글 폰트 설정 시도
+        prompt_build: build_analysis_prompt로 미리 만든 프롬프트 (크기 보고가 필요한 호출자용, 없으면 여기서 생성)
+        """
         try:
-            pdfmetrics.registerFont(TTFont('MalgunGothic', 'C:/Windows/Fonts/malgun.ttf'))
-            title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontName='MalgunGothic')
-            header_style = ParagraphStyle('CustomHeader', parent=styles['Heading2'], fontName='MalgunGothic')
-            normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontName='MalgunGothic')
-        except:
-            title_style = styles['Title']
-            header_style = styles['Heading2']
-            normal_style = styles['Normal']
-        
-        # 문서 내용 구성
-        story = []
-        
-        # 제목
-        story.append(Paragraph("🤖 AI 특허 분석 보고서", title_style))
-        story.append(Spacer(1, 12))
-        
-        # 기본 정보
-        story.append(Paragraph("📋 분석 개요", header_style))
-        story.append(Paragraph(f"검색어: {analysis_data.get('search_query', 'N/A')}", normal_style))
-        story.append(Paragraph(f"분석 일시: {datetime.now().strftime('%Y년 %m월 %d일 %H시 %M분')}", normal_style))
-        story.append(Paragraph(f"총 특허 수: {analysis_data.get('total_count', 0):,}건", normal_style))
-        story.append(Spacer(1, 12))
-        
-        # 주요 통계
-        story.append(Paragraph("📊 주요 통계", header_style))
-        
-        # 출원인 TOP 5
-        top_applicants = analysis_data.get('top_applicants', {})
-        if top_applicants:
-            story.append(Paragraph("주요 출원인:", normal_style))
-            for i, (name, count) in enumerate(list(top_applicants.items())[:5], 1):
-                story.append(Paragraph(f"{i}. {name}: {count}건", normal_style))
-            story.append(Spacer(1, 12))
+            build = prompt_build or self.build_analysis_prompt(patents, analysis_type, user_query)
+            yield from self._generate_stream(self.model_pro, build.prompt)
+            
+        except Exception as e:
+            yield f"분석 오류: {e}"
+    
+    def map_reduce_analysis(self, patents: List[Dict], analysis_type: str, user_query: str = "",
+                            max_concurrency: int = BATCH_CONCURRENCY,
+                            progress_callback: Optional[Callable[[str, float], None]] = None) -> AnalysisResult:
+        """전체 특허 맵리듀스 분석 - 표본 3건이 아니라 모든 초록을 반영
         
-        # 연도별 동향
-        yearly_data = analysis_data.get('yearly_trends', {})
-        if yearly_data:
-            story.append(Paragraph("연도별 출원 현황:", normal_style))
-            for year, count in yearly_data.items():
-                story.append(Paragraph(f"• {year}년: {count}건", normal_style))
-            story.append(Spacer(1, 12))
+        1) 토큰 예산 단위로 청크 분할 → 2) 청크별 핵심 내용 추출(동시 실행) →
+        3) 노트를 REDUCE_FANOUT개씩 계층적으로 병합 → 4) 통계 + 최종 노트로 전문가 보고서 생성.
+        실패한 맵/리듀스 호출은 MAP_REDUCE_ATTEMPTS회까지 시도한 뒤 제외하고, 빠진 특허 수를
+        진행 콜백과 보고서 첫머리에 알립니다. 단계별 소요 시간과 반영 범위는 결과의 stages에 담깁니다.
+        """
+        timings = {}
+        started = time.time()
         
-        # AI 분석 결과
-        story.append(PageBreak())
-        story.append(Paragraph("🧠 AI 분석 결과", header_style))
+        def report(stage: str, progress: float):
+            if progress_callback:
+                progress_callback(stage, progress)
         
-        # 분석 결과를 문단별로 나누어 추가
-        analysis_paragraphs = analysis_result.split('\n\n')
-        for para in analysis_paragraphs:
-            if para.strip():
-                cleaned_para = para.replace('**', '').replace('##', '').replace('#', '').strip()
-                if cleaned_para:
-                    story.append(Paragraph(cleaned_para, normal_style))
-                    story.append(Spacer(1, 6))
+        try:
+            print(f"🧠 맵리듀스 분석 시작: {len(patents)}건")
+            stage_start = time.time()
+            chunks = self._chunk_by_tokens(patents, MAP_CHUNK_TOKENS)
+            timings['chunk'] = time.time() - stage_start
+            
+            # 맵: 청크별 핵심 내용 추출 - 노트마다 반영한 특허 수를 함께 유지
+            report(f"청크 {len(chunks)}개 분석 중", 0.1)
+            stage_start = time.time()
+            results = self._run_concurrently(self._map_chunk, [text for text, _ in chunks], max_concurrency)
+            notes = [(note, size) for note, (_, size) in zip(results, chunks) if note]
+            failed_calls = len(chunks) - len(notes)
+            timings['map'] = time.time() - stage_start
+            if not notes:
+                raise RuntimeError("모든 청크 분석에 실패했습니다")
+            if failed_calls:
+                report(f"⚠️ 청크 {failed_calls}/{len(chunks)}개 분석 실패 - 해당 특허 제외", 0.6)
+            
+            # 리듀스: 노트가 REDUCE_FANOUT개 이하가 될 때까지 계층적으로 병합
+            report(f"분석 노트 {len(notes)}개 병합 중", 0.6)
+            stage_start = time.time()
+            levels = 0
+            while len(notes) > REDUCE_FANOUT:
+                groups = [notes[i:i + REDUCE_FANOUT] for i in range(0, len(notes), REDUCE_FANOUT)]
+                results = self._run_concurrently(self._reduce_notes, [[note for note, _ in group] for group in groups],
+                                                 max_concurrency)
+                merged = [(note, sum(size for _, size in group)) for note, group in zip(results, groups) if note]
+                if not merged:
+                    raise RuntimeError("모든 노트 병합에 실패했습니다")
+                failed_calls += len(groups) - len(merged)
+                notes = merged
+                levels += 1
+            timings['reduce'] = time.time() - stage_start
+            
+            covered = sum(size for _, size in notes)
+            missing = len(patents) - covered
+            if missing:
+                print(f"⚠️ 맵리듀스 실패 {failed_calls}회 - {missing}/{len(patents)}건 미반영")
+                report(f"⚠️ {missing:,}/{len(patents):,}건 분석 실패로 제외", 0.8)
+            
+            # 최종 보고서: 기존 전문가 프롬프트 + 전체 특허 분석 노트
+            report("최종 보고서 작성 중", 0.8)
+            stage_start = time.time()
+            analysis_data = self._prepare_comprehensive_data(patents)
+            build = self._generate_expert_prompt(analysis_data, analysis_type, user_query,
+                                                 notes=[note for note, _ in notes], notes_missing=missing)
+            result = self._generate(self.model_pro, build.prompt)
+            if missing:
+                result = (f"> ⚠️ **분석 범위 안내**: 전체 {len(patents):,}건 중 {missing:,}건은 분석 단계 오류로 "
+                          f"노트에서 빠져 {covered:,}건만 반영되었습니다.\n\n{result}")
+            timings['final'] = time.time() - stage_start
+            
+            timings['total'] = time.time() - started
+            stages = {**timings, 'chunks': len(chunks), 'reduce_levels': levels,
+                      'failed_calls': failed_calls, 'covered': covered, 'missing': missing}
+            print(f"✅ 맵리듀스 분석 완료: {timings['total']:.1f}초 (청크 {len(chunks)}개, 병합 {levels}단계)")
+            report("완료", 1.0)
+            return AnalysisResult(result, stages, build)
+            
+        except Exception as e:
+            return AnalysisResult(f"분석 오류: {e}")
+    
+    def _chunk_by_tokens(self, patents: List[Dict], token_budget: int) -> List[Tuple[str, int]]:
+        """특허 목록을 토큰 예산 이하의 텍스트 청크로 분할 - (청크 텍스트, 포함된 특허 수)"""
+        chunks = []
+        lines = []
+        used = 0
+        for patent in patents:
+            line = (f"- [{patent.get('app_num', '')}] {patent.get('title', '')} | {patent.get('applicant', '')} | "
+                    f"{patent.get('app_date', '')} | {patent.get('reg_status', '')} | {patent.get('ipc_code', '')}\n"
+                    f"  {truncate_to_tokens(str(patent.get('abstract', '')), MAP_ABSTRACT_TOKENS)}")
+            tokens = estimate_tokens(line)
+            if lines and used + tokens > token_budget:
+                chunks.append(("\n".join(lines), len(lines)))
+                lines = []
+                used = 0
+            lines.append(line)
+            used += tokens
+        if lines:
+            chunks.append(("\n".join(lines), len(lines)))
+        return chunks
+    
+    def _map_chunk(self, chunk: str) -> str:
+        """맵 단계 - 청크 하나에서 분석 노트 추출 (Flash 모델)"""
+        prompt = f"""다음 특허 목록(번호 | 제목 | 출원인 | 출원일 | 상태 | IPC, 초록)을 읽고 분석 노트를 작성하세요.
+
+작성 기준:
+- 핵심 기술 주제와 해당 특허 번호
+- 출원인별 기술 초점
+- 눈에 띄는 혁신 또는 차별화 포인트
+- 간결한 글머리표, 15줄 이내
+
+특허 목록:
+{chunk}"""
+        return self._generate(self.model_flash, prompt)
+    
+    def _reduce_notes(self, notes: List[str]) -> str:
+        """리듀스 단계 - 여러 분석 노트를 하나로 병합 (Flash 모델)"""
+        joined = "\n\n---\n\n".join(notes)
+        prompt = f"""다음은 같은 특허 검색 결과를 나누어 작성한 분석 노트들입니다.
+중복을 합치고 기술 주제별로 재구성하여 하나의 분석 노트로 병합하세요.
+특허 번호와 출원인 등 근거는 유지하고, 간결한 글머리표 20줄 이내로 작성하세요.
+
+{joined}"""
+        return self._generate(self.model_flash, prompt)
+    
+    def _run_concurrently(self, func: Callable, items: List, max_concurrency: int) -> List[Optional[str]]:
+        """입력 순서대로 결과 반환 - MAP_REDUCE_ATTEMPTS회 모두 실패한 항목은 None"""
+        def safe_call(item):
+            for attempt in range(1, MAP_REDUCE_ATTEMPTS + 1):
+                try:
+                    result = func(item)
+                    if result:
+                        return result
+                    error = "빈 응답"
+                except Exception as e:
+                    error = e
+                print(f"❌ 맵리듀스 단계 오류 ({attempt}/{MAP_REDUCE_ATTEMPTS}): {error}")
+            return None
         
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as executor:
+            return list(executor.map(propagate(safe_call), items))
+    
+    def build_analysis_prompt(self, patents: List[Dict], analysis_type: str, user_query: str) -> PromptBuild:
+        """분석 프롬프트 준비 - 데이터 전처리 및 통계 + 분석 타입별 프롬프트 (크기 보고 포함)"""
+        print(f"🧠 AI 분석 시작: {len(patents)}건 특허 분석 중...")
+        analysis_data = self._prepare_comprehensive_data(patents)
+        return self._generate_expert_prompt(analysis_data, analysis_type, user_query)
+    
+    def generate_pdf_report(self, analysis_data: Dict, analysis_result: str,
+                            patents: Optional[PatentTable] = None) -> io.BytesIO:
+        """전문적인 PDF 보고서 생성 - 메모리 버퍼로 반환 (파일로 받으려면 pdf_report.build_pdf_report 사용)"""
+        report = build_pdf_report(analysis_data, analysis_result, patents)
+        try:
+            return io.BytesIO(report.read_bytes())
+        finally:
+            report.cleanup()
     
     def _prepare_comprehensive_data(self, patents: List[Dict]) -> Dict:
-        """대량 특허 데이터 종합 분석용 전처리"""
-        applicants = {}
-        years = {}
-        statuses = {}
-        ipc_codes = {}
+        """대량 특허 데이터 종합 분석용 전처리 - 공용 통계 엔진 결과 재사용"""
+        stats = get_patent_stats(patents)
         
-        for patent in patents:
-            # 출원인 통계
-            applicant = patent.get('applicant', '정보없음')[:50]
-            applicants[applicant] = applicants.get(applicant, 0) + 1
-            
-            # 연도별 통계
-            app_date = patent.get('app_date', '')
-            if app_date and len(app_date) >= 4:
-                year = app_date[:4]
-                years[year] = years.get(year, 0) + 1
-            
-            # 등록상태 통계
-            status = patent.get('reg_status', '출원')
-            statuses[status] = statuses.get(status, 0) + 1
-            
-            # IPC 코드 분석
-            ipc = patent.get('ipc_code', '')
-            if ipc:
-                ipc_main = ipc.split()[0][:4] if ipc.split() else ipc[:4]
-                ipc_codes[ipc_main] = ipc_codes.get(ipc_main, 0) + 1
+        # 출원인명은 프롬프트 길이를 위해 50자로 제한
+        top_applicants = {}
+        for name, count in stats.top_applicants(15).items():
+            top_applicants[name[:50]] = top_applicants.get(name[:50], 0) + count
         
         return {
-            'total_count': len(patents),
-            'top_applicants': dict(sorted(applicants.items(), key=lambda x: x[1], reverse=True)[:15]),
-            'yearly_trends': dict(sorted(years.items())),
-            'status_distribution': statuses,
-            'ipc_distribution': dict(sorted(ipc_codes.items(), key=lambda x: x[1], reverse=True)[:10]),
-            'patents_sample': patents[:3]
+            'total_count': stats.total_count,
+            'top_applicants': top_applicants,
+            'yearly_trends': stats.yearly_counts,
+            'status_distribution': stats.status_counts,
+            'ipc_distribution': stats.top_ipc(10),
+            'patents': patents  # 토큰 예산 안에서 근거로 포함
         }
     
-    def _generate_expert_prompt(self, data: Dict, analysis_type: str, user_query: str) -> str:
-        """전문가 수준의 분석 프롬프트 생성"""
+    def _generate_expert_prompt(self, data: Dict, analysis_type: str, user_query: str,
+                                notes: Optional[List[str]] = None, notes_missing: int = 0) -> PromptBuild:
+        """전문가 수준의 분석 프롬프트 생성 - 통계/지시문을 먼저 넣고 남은 토큰 예산을 특허 근거로 채움
+        
+        notes_missing: 분석 노트에 반영되지 못한 특허 수 - 노트 제목에 실제 반영 범위를 밝힘
+        """
         
         base_context = f"""# 특허 빅데이터 분석 보고서
 
 ## 📊 분석 데이터 규모
 - **총 분석 특허**: {data['total_count']:,}건
-- **분석 완료 시간**: {datetime.now().strftime('%Y-%m-%d %H:%M')}
+- **분석 기준일**: {datetime.now().strftime('%Y-%m-%d')}
 - **주요 기술 분야**: {len(data.get('ipc_distribution', {}))}개 IPC 코드
 
 ## 🏢 시장 참여자 현황
@@ -184,9 +575,7 @@ class AdvancedPatentAnalyzer:
 """
 
         expert_prompts = {
-            "competitive_analysis": f"""{base_context}
-
-## 🏆 심화 경쟁 분석 요청
+            "competitive_analysis": """## 🏆 심화 경쟁 분석 요청
 
 위 대규모 특허 데이터를 바탕으로 다음 관점에서 **전략컨설팅 수준**의 경쟁 분석을 수행하세요:
 
@@ -207,9 +596,7 @@ class AdvancedPatentAnalyzer:
 
 **🎯 최종 결과물**: C-Level 경영진 대상 전략 의사결정용 핵심 인사이트""",
 
-            "trend_analysis": f"""{base_context}
-
-## 📈 기술 트렌드 예측 분석
+            "trend_analysis": """## 📈 기술 트렌드 예측 분석
 
 ### 1. 기술 라이프사이클 분석
 - 현재 기술 성숙도 및 S-Curve 상의 위치
@@ -226,9 +613,7 @@ class AdvancedPatentAnalyzer:
 - 새로운 기회 영역 및 성장 동력
 - 기술 수렴 및 융합 트렌드""",
 
-            "future_direction": f"""{base_context}
-
-## 🔮 미래 방향성 및 전략 제안
+            "future_direction": """## 🔮 미래 방향성 및 전략 제안
 
 ### 1. 기술 기회 발굴 및 우선순위화
 - 특허 공백지대 및 블루오션 영역
@@ -246,14 +631,42 @@ class AdvancedPatentAnalyzer:
 - 위험 관리 및 컨틴전시 플랜"""
         }
 
-        prompt = expert_prompts.get(analysis_type, expert_prompts["competitive_analysis"])
+        builder = PromptBuilder(self.prompt_budget_tokens)
+        builder.add_section("context", base_context.rstrip())
+        if notes:
+            if notes_missing:
+                coverage = (f"{data['total_count'] - notes_missing:,}/{data['total_count']:,}건 초록 요약 - "
+                            f"{notes_missing:,}건은 분석 오류로 누락, 보고서에 이 한계를 명시할 것")
+            else:
+                coverage = "모든 초록 요약"
+            builder.add_section("notes", f"## 📚 전체 특허 분석 노트 ({coverage})\n" + "\n\n".join(notes),
+                                truncatable=True)
+        builder.add_evidence(
+            "evidence",
+            (self._format_evidence(patent) for patent in data.get('patents', [])),
+            header="## 📑 개별 특허 근거 (출원번호 | 제목 | 출원인 | 출원일 | 초록)"
+        )
+        builder.add_section("request", expert_prompts.get(analysis_type, expert_prompts["competitive_analysis"]))
         
+        # 사용자 질문은 자르지 않음 - 예산을 넘으면 노트가 먼저 잘림
         if user_query:
-            prompt += f"\n\n## 🔍 추가 분석 요청\n{user_query}\n\n**이 질문을 중심으로 위 분석을 더욱 구체화하고 실용적인 답변을 제시하세요.**"
+            builder.add_section("user_query", f"## 🔍 추가 분석 요청\n{user_query}\n\n**이 질문을 중심으로 위 분석을 더욱 구체화하고 실용적인 답변을 제시하세요.**")
         
-        prompt += "\n\n**📋 보고서 작성 기준**: 각 섹션별 명확한 제목, 핵심 포인트는 굵은 글씨, 실행 가능한 구체적 제안, 의사결정 지원용 명확한 결론"
+        builder.add_section("criteria", "**📋 보고서 작성 기준**: 각 섹션별 명확한 제목, 핵심 포인트는 굵은 글씨, 실행 가능한 구체적 제안, 의사결정 지원용 명확한 결론")
         
-        return prompt
+        build = builder.build()
+        if self.exact_token_count:
+            build = replace(build, total_tokens=count_tokens(self.model_pro, build.prompt), exact=True)
+        print(f"📏 분석 프롬프트: {build.total_tokens:,}/{build.budget_tokens:,}토큰, "
+              f"근거 특허 {build.evidence_included}/{build.evidence_total}건"
+              + (f", 잘라낸 섹션 {', '.join(build.truncated_sections)}" if build.truncated_sections else ""))
+        return build
+    
+    def _format_evidence(self, patent: Dict) -> str:
+        """근거 특허 1줄 - 초록은 토큰 예산에 맞게 자름"""
+        abstract = truncate_to_tokens(str(patent.get('abstract', '')), EVIDENCE_ABSTRACT_TOKENS)
+        return (f"- [{patent.get('app_num', '')}] {patent.get('title', '')} | {patent.get('applicant', '')} | "
+                f"{patent.get('app_date', '')} | {abstract}")
     
     def _format_market_analysis(self, data: Dict) -> str:
         """시장 참여자 현황 포매팅"""
@@ -303,13 +716,13 @@ class AdvancedPatentAnalyzer:
 
 # 호환성 함수들
 def summarize_text_with_gemini(api_key: str, text: str) -> str:
-    analyzer = AdvancedPatentAnalyzer(api_key)
+    analyzer = get_analyzer(api_key)
     return analyzer.quick_summarize(text)
 
 def analyze_patent_data_with_gemini(api_key: str, patent_data: List[Dict], user_query: str) -> str:
-    analyzer = AdvancedPatentAnalyzer(api_key)
+    analyzer = get_analyzer(api_key)
     return analyzer.comprehensive_analysis(patent_data, "competitive_analysis", user_query)
 
 def analyze_detailed_data_with_gemini(api_key: str, patent_data: List[Dict], user_query: str) -> str:
-    analyzer = AdvancedPatentAnalyzer(api_key)
+    analyzer = get_analyzer(api_key)
     return analyzer.comprehensive_analysis(patent_data, "future_direction", user_query)
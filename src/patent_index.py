@@ -0,0 +1,172 @@
+"""
+로컬 특허 전문 인덱스 - 지금까지 수집한 모든 특허를 SQLite FTS5(trigram)로 색인하여 즉시 재검색
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from src.patent_table import FIELD_NAMES, PatentRecord
+from src.sqlite_store import default_cache_dir
+
+# KIPRIS 검색 필드 -> 인덱스 컬럼
+FIELD_COLUMNS = {
+    "astrtCont": "abstract",
+    "inventionTitle": "title",
+    "applicantName": "applicant",
+    "applicationNumber": "app_num",
+}
+
+# 이 시간 안에 확인한 검색어는 KIPRIS에 변경 여부도 묻지 않고 로컬 결과만 사용
+COVERAGE_FRESH_SECONDS = 3600
+
+# trigram 토크나이저는 3글자 이상만 색인 검색 가능 - 더 짧은 검색어는 테이블 스캔
+MIN_FTS_QUERY_CHARS = 3
+
+@dataclass(frozen=True)
+class Coverage:
+    """(필드, 검색어)의 마지막 수집 기록"""
+    total_count: int  # 수집 당시 KIPRIS 총 건수
+    updated_at: float
+    
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() - self.updated_at < COVERAGE_FRESH_SECONDS
+
+class PatentIndex:
+    """수집한 특허 영구 인덱스 - 출원번호 기준 upsert + 필드별 부분일치 검색
+    
+    SQLite에 FTS5 trigram 토크나이저가 있으면 한국어도 형태소 분석 없이 부분일치 색인 검색이 되고,
+    없으면 같은 의미의 instr() 스캔으로 동작합니다.
+    """
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        cache_dir = cache_dir or default_cache_dir("PATENT_INDEX_DIR")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "patent_index.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        columns = ", ".join(f"{name} TEXT NOT NULL DEFAULT ''" for name in FIELD_NAMES if name != "app_num")
+        with self._lock, self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS patents (app_num TEXT PRIMARY KEY, {columns}, indexed_at REAL NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS coverage ("
+                "field TEXT NOT NULL, query TEXT NOT NULL, total_count INTEGER NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (field, query))"
+            )
+            self.fts_enabled = self._create_fts()
+    
+    def _create_fts(self) -> bool:
+        """외부 콘텐츠 FTS5 테이블 + 동기화 트리거 - 지원하지 않는 SQLite면 False"""
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS patents_fts USING fts5("
+                "title, abstract, applicant, content='patents', content_rowid='rowid', tokenize='trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 trigram 미지원 - 스캔 검색 사용: {e}")
+            return False
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS patents_ai AFTER INSERT ON patents BEGIN
+                INSERT INTO patents_fts (rowid, title, abstract, applicant) VALUES (new.rowid, new.title, new.abstract, new.applicant);
+            END;
+            CREATE TRIGGER IF NOT EXISTS patents_ad AFTER DELETE ON patents BEGIN
+                INSERT INTO patents_fts (patents_fts, rowid, title, abstract, applicant) VALUES ('delete', old.rowid, old.title, old.abstract, old.applicant);
+            END;
+            CREATE TRIGGER IF NOT EXISTS patents_au AFTER UPDATE ON patents BEGIN
+                INSERT INTO patents_fts (patents_fts, rowid, title, abstract, applicant) VALUES ('delete', old.rowid, old.title, old.abstract, old.applicant);
+                INSERT INTO patents_fts (rowid, title, abstract, applicant) VALUES (new.rowid, new.title, new.abstract, new.applicant);
+            END;
+        """)
+        return True
+    
+    def add(self, patents: Iterable[PatentRecord]):
+        """특허 upsert - 출원번호 없는 항목은 제외"""
+        now = time.time()
+        rows = [(*patent.to_row(), now) for patent in patents if patent.app_num]
+        if not rows:
+            return
+        placeholders = ", ".join("?" * (len(FIELD_NAMES) + 1))
+        updates = ", ".join(f"{name} = excluded.{name}" for name in FIELD_NAMES if name != "app_num")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO patents ({', '.join(FIELD_NAMES)}, indexed_at) VALUES ({placeholders}) "
+                f"ON CONFLICT(app_num) DO UPDATE SET {updates}, indexed_at = excluded.indexed_at",
+                rows
+            )
+    
+    def search(self, keyword: str, field: str) -> List[PatentRecord]:
+        """KIPRIS 필드와 같은 의미의 부분일치 검색 (대소문자 무시)"""
+        column = FIELD_COLUMNS.get(field, "abstract")
+        keyword = keyword.strip()
+        if not keyword:
+            return []
+        
+        select = f"SELECT {', '.join('p.' + name for name in FIELD_NAMES)} FROM patents p"
+        if self.fts_enabled and column != "app_num" and len(keyword) >= MIN_FTS_QUERY_CHARS:
+            phrase = '"' + keyword.replace('"', '""') + '"'
+            sql = f"{select} JOIN patents_fts f ON f.rowid = p.rowid WHERE patents_fts MATCH ? ORDER BY p.app_date DESC"
+            params = (f"{column} : {phrase}",)
+        else:
+            sql = f"{select} WHERE instr(lower(p.{column}), ?) > 0 ORDER BY p.app_date DESC"
+            params = (keyword.lower(),)
+        
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [PatentRecord.from_row(list(row)) for row in rows]
+    
+    def get(self, app_num: str) -> Optional[PatentRecord]:
+        """출원번호 정확히 일치하는 특허 1건 (부분/앞부분 일치는 찾지 않음)"""
+        app_num = app_num.strip()
+        if not app_num:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(FIELD_NAMES)} FROM patents WHERE app_num = ?", (app_num,)
+            ).fetchone()
+        return PatentRecord.from_row(list(row)) if row else None
+    
+    def get_coverage(self, field: str, query: str) -> Optional[Coverage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT total_count, updated_at FROM coverage WHERE field = ? AND query = ?", (field, query)
+            ).fetchone()
+        return Coverage(*row) if row else None
+    
+    def set_coverage(self, field: str, query: str, total_count: int):
+        """(필드, 검색어) 수집 완료 기록 - 다음 로컬 우선 검색은 늘어난 건수만 요청"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage (field, query, total_count, updated_at) VALUES (?, ?, ?, ?)",
+                (field, query, int(total_count), time.time())
+            )
+    
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM patents").fetchone()[0]
+    
+    def clear(self):
+        """전체 인덱스 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM patents")
+            self._conn.execute("DELETE FROM coverage")
+
+_default_index: Optional[PatentIndex] = None
+_index_lock = threading.Lock()
+
+def get_default_index() -> Optional[PatentIndex]:
+    """프로세스 공용 특허 인덱스 - PATENT_INDEX_DISABLED=1 이면 사용 안 함"""
+    global _default_index
+    if os.getenv("PATENT_INDEX_DISABLED") == "1":
+        return None
+    with _index_lock:
+        if _default_index is None:
+            try:
+                _default_index = PatentIndex()
+            except Exception as e:
+                print(f"⚠️ 특허 인덱스 초기화 실패 (인덱스 없이 진행): {e}")
+                return None
+        return _default_index
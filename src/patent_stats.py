@@ -0,0 +1,88 @@
+"""
+특허 통계 엔진 - 출원인/연도/등록상태/IPC 집계를 한 번에 계산하고 결과 집합별로 재사용
+"""
+
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Iterable, Union
+
+import pandas as pd
+
+from src.patent_table import PatentTable, PatentLike
+
+RECENT_YEAR = '2020'  # 최신 특허 기준 연도
+
+@dataclass(frozen=True)
+class PatentStats:
+    """결과 집합 하나의 집계 결과 - 모든 건수 dict는 표시 순서대로 정렬되어 있음"""
+    total_count: int
+    applicant_counts: Dict[str, int]  # 건수 내림차순 (동점은 먼저 등장한 순)
+    yearly_counts: Dict[str, int]  # 연도 오름차순
+    status_counts: Dict[str, int]  # 건수 내림차순
+    ipc_counts: Dict[str, int]  # IPC 앞 4자리 기준, 건수 내림차순
+    unique_applicants: int
+    registered_count: int
+    recent_count: int  # RECENT_YEAR 이후 출원
+    
+    @property
+    def registered_ratio(self) -> float:
+        return (self.registered_count / self.total_count * 100) if self.total_count > 0 else 0.0
+    
+    @property
+    def recent_ratio(self) -> float:
+        return (self.recent_count / self.total_count * 100) if self.total_count > 0 else 0.0
+    
+    def top_applicants(self, n: int) -> Dict[str, int]:
+        return dict(list(self.applicant_counts.items())[:n])
+    
+    def top_ipc(self, n: int) -> Dict[str, int]:
+        return dict(list(self.ipc_counts.items())[:n])
+
+# 결과 집합(PatentTable 객체) -> 통계, 결과 집합이 사라지면 함께 제거
+_stats_cache: "weakref.WeakKeyDictionary[PatentTable, PatentStats]" = weakref.WeakKeyDictionary()
+_stats_lock = threading.Lock()
+
+def get_patent_stats(patents: Union[PatentTable, Iterable[PatentLike]]) -> PatentStats:
+    """결과 집합 통계 - 같은 PatentTable 객체는 한 번만 계산 (Streamlit 재실행마다 재사용)"""
+    table = patents if isinstance(patents, PatentTable) else PatentTable.from_records(patents)
+    
+    with _stats_lock:
+        cached = _stats_cache.get(table)
+    if cached is not None:
+        return cached
+    
+    stats = compute_patent_stats(table.frame)
+    with _stats_lock:
+        _stats_cache[table] = stats
+    return stats
+
+def compute_patent_stats(frame: pd.DataFrame) -> PatentStats:
+    """PatentTable.frame 컬럼 단위 벡터 집계"""
+    applicants = frame['applicant'].astype(object)
+    statuses = frame['reg_status'].astype(object)
+    
+    years = frame['app_date'].astype(object).str[:4]
+    years = years[years.str.len().eq(4) & years.str.isdigit()]
+    
+    ipc_codes = frame['ipc_code'].astype(object)
+    ipc_codes = ipc_codes[ipc_codes.str.strip().ne('')]
+    ipc_main = ipc_codes.str.split().str[0].str[:4]
+    
+    return PatentStats(
+        total_count=len(frame),
+        applicant_counts=_ranked_counts(applicants),
+        yearly_counts={str(year): int(count) for year, count in years.value_counts().sort_index().items()},
+        status_counts=_ranked_counts(statuses),
+        ipc_counts=_ranked_counts(ipc_main),
+        unique_applicants=int(applicants.nunique()),
+        registered_count=int(statuses.str.contains('등록', regex=False).sum()),
+        recent_count=int(years.ge(RECENT_YEAR).sum())
+    )
+
+def _ranked_counts(values: pd.Series) -> Dict[str, int]:
+    """값별 건수 - 건수 내림차순, 동점은 먼저 등장한 순서 (기존 dict 집계 + 안정 정렬과 동일)"""
+    if values.empty:
+        return {}
+    counts = values.groupby(values, sort=False).size()
+    return {str(value): int(count) for value, count in counts.sort_values(ascending=False, kind='stable').items()}
@@ -0,0 +1,178 @@
+"""
+특허 레코드 저장소 - 슬롯 기반 PatentRecord + pandas 기반 컬럼형 PatentTable
+"""
+
+import hashlib
+import sys
+from dataclasses import dataclass, fields
+from typing import List, Dict, Iterable, Iterator, Optional, Union, Any
+
+import pandas as pd
+
+def kipris_detail_url(app_num: str) -> str:
+    """KIPRIS 상세페이지 URL 생성 - 다중 패턴 지원"""
+    if not app_num:
+        return ""
+    
+    clean_num = app_num.replace('-', '')
+    
+    # 가장 안정적인 KIPRIS Plus URL 패턴
+    return f"https://plus.kipris.or.kr/kpat/search/SearchMain.do?method=searchUTL&param1={clean_num}"
+
+@dataclass(slots=True)
+class PatentRecord:
+    """특허 1건 - dict 대비 키 저장 비용이 없고, 기존 코드 호환을 위해 .get()/[] 접근 지원"""
+    title: str = "정보없음"
+    app_num: str = ""
+    abstract: str = "정보없음"
+    applicant: str = "정보없음"
+    inventor: str = "발명자 정보 미제공"
+    app_date: str = ""
+    reg_status: str = "출원"
+    reg_num: str = ""
+    ipc_code: str = ""
+    
+    @property
+    def kipris_url(self) -> str:
+        """저장하지 않고 출원번호로 계산 (기존 kipris_url/link 중복 제거)"""
+        return kipris_detail_url(self.app_num)
+    
+    @property
+    def link(self) -> str:
+        """호환성을 위해 유지 - kipris_url과 동일"""
+        return self.kipris_url
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get 호환 접근"""
+        if key in RECORD_KEYS:
+            return getattr(self, key)
+        return default
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in RECORD_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in RECORD_KEYS
+    
+    def to_dict(self) -> Dict[str, str]:
+        """기존 dict 형식 (kipris_url/link 포함)"""
+        return {
+            "title": self.title,
+            "app_num": self.app_num,
+            "abstract": self.abstract,
+            "applicant": self.applicant,
+            "inventor": self.inventor,
+            "app_date": self.app_date,
+            "reg_status": self.reg_status,
+            "reg_num": self.reg_num,
+            "kipris_url": self.kipris_url,
+            "link": self.link,
+            "ipc_code": self.ipc_code
+        }
+    
+    def to_row(self) -> List[str]:
+        """FIELD_NAMES 순서의 값 목록 (캐시 직렬화용)"""
+        return [getattr(self, name) for name in FIELD_NAMES]
+    
+    @classmethod
+    def from_row(cls, row: List[str]) -> "PatentRecord":
+        return cls.create(*row)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PatentRecord":
+        """기존 dict 형식에서 변환 - 없는 키는 기본값 사용"""
+        values = {name: str(data[name]) for name in FIELD_NAMES if data.get(name) is not None}
+        return cls.create(**values)
+    
+    @classmethod
+    def create(cls, *args, **kwargs) -> "PatentRecord":
+        """반복이 많은 문자열(출원인, 등록상태)을 intern 하여 생성"""
+        record = cls(*args, **kwargs)
+        record.applicant = sys.intern(record.applicant)
+        record.reg_status = sys.intern(record.reg_status)
+        return record
+
+FIELD_NAMES = tuple(f.name for f in fields(PatentRecord))
+RECORD_KEYS = frozenset(FIELD_NAMES) | {"kipris_url", "link"}
+
+# 값의 종류가 적어 category로 저장하는 컬럼
+CATEGORY_COLUMNS = ("applicant", "reg_status")
+
+PatentLike = Union[PatentRecord, Dict]
+
+class PatentTable:
+    """컬럼형 특허 결과 컨테이너 - 출원인/등록상태는 category로 저장해 중복 문자열 공유
+    
+    반복하면 PatentRecord를 돌려주므로 기존 리스트 기반 코드와 호환되고,
+    집계는 frame(DataFrame)으로 벡터 연산할 수 있습니다.
+    """
+    
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        if frame is None:
+            frame = self._build_frame([])
+        self._frame = frame
+    
+    @classmethod
+    def from_records(cls, records: Iterable[PatentLike]) -> "PatentTable":
+        """PatentRecord 또는 기존 dict 목록에서 생성 - 그 외 타입은 제외"""
+        normalized = []
+        for record in records:
+            if isinstance(record, PatentRecord):
+                normalized.append(record)
+            elif isinstance(record, dict):
+                normalized.append(PatentRecord.from_dict(record))
+        return cls(cls._build_frame(normalized))
+    
+    @staticmethod
+    def _build_frame(records: List[PatentRecord]) -> pd.DataFrame:
+        frame = pd.DataFrame({name: [getattr(r, name) for r in records] for name in FIELD_NAMES},
+                             columns=list(FIELD_NAMES), dtype=object)
+        for column in CATEGORY_COLUMNS:
+            frame[column] = frame[column].astype("category")
+        return frame
+    
+    @property
+    def frame(self) -> pd.DataFrame:
+        """집계용 DataFrame (읽기 전용으로 사용)"""
+        return self._frame
+    
+    @property
+    def app_nums(self) -> List[str]:
+        return self._frame["app_num"].tolist()
+    
+    def __len__(self) -> int:
+        return len(self._frame)
+    
+    def __bool__(self) -> bool:
+        return len(self._frame) > 0
+    
+    def __iter__(self) -> Iterator[PatentRecord]:
+        for row in self._frame.itertuples(index=False, name=None):
+            yield PatentRecord(*row)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[PatentRecord, "PatentTable"]:
+        if isinstance(index, slice):
+            return PatentTable(self._frame.iloc[index].reset_index(drop=True))
+        return PatentRecord(*self._frame.iloc[index].tolist())
+    
+    def fingerprint(self, query: str = "") -> str:
+        """결과 집합 지문 - 검색어 + 모든 컬럼 값의 행 순서 해시 (화면 캐시 키로 사용)
+        
+        새로고침으로 순서는 그대로인데 등록상태 등만 바뀌어도 지문이 달라지도록 출원번호뿐 아니라 전체 컬럼을 해시합니다.
+        """
+        digest = hashlib.sha1(query.encode("utf-8"))
+        digest.update(pd.util.hash_pandas_object(self._frame, index=False).to_numpy().tobytes())
+        return digest.hexdigest()
+    
+    def records(self) -> List[PatentRecord]:
+        return list(self)
+    
+    def to_dicts(self) -> List[Dict[str, str]]:
+        """기존 dict 목록 형식으로 변환"""
+        return [record.to_dict() for record in self]
+    
+    def memory_bytes(self) -> int:
+        """문자열 본문까지 포함한 메모리 사용량"""
+        return int(self._frame.memory_usage(deep=True).sum())
@@ -0,0 +1,256 @@
+"""
+PDF 보고서 엔진 - 번들 한글 폰트 + 연도/출원인 차트 + 전체 특허 부록 표
+
+story를 한꺼번에 만들지 않고 생성기로 흘려보내 문서에 배치되는 만큼만 메모리에 두며,
+결과는 임시 파일로 바로 기록합니다. reportlab/matplotlib은 보고서를 만들 때만 import 합니다.
+"""
+
+import io
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional
+from xml.sax.saxutils import escape
+
+from src.instrumentation import span
+from src.patent_table import PatentTable
+
+# 번들 한글 폰트 - PDF_FONT_PATH로 다른 TTF 지정 가능
+FONT_NAME = "NanumGothic"
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "NanumGothic-Regular.ttf")
+FALLBACK_FONT = "Helvetica"
+
+# 부록 표 하나에 넣는 행 수 - 표 단위로 배치/분할되므로 한 번에 메모리에 올라가는 행 수의 상한
+APPENDIX_ROWS_PER_TABLE = 100
+
+# 배치를 기다리며 미리 만들어 두는 flowable 수
+STORY_LOOKAHEAD = 32
+
+# 차트에 표시하는 상위 출원인 수
+CHART_TOP_APPLICANTS = 10
+
+_registered_font: Optional[str] = None
+_font_lock = threading.Lock()
+
+def register_korean_font() -> str:
+    """번들 한글 폰트를 프로세스당 한 번만 등록 - 사용할 폰트 이름 (실패 시 기본 Latin 폰트)"""
+    global _registered_font
+    with _font_lock:
+        if _registered_font is None:
+            from reportlab.lib.fonts import addMapping
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+            
+            path = os.getenv("PDF_FONT_PATH") or FONT_PATH
+            try:
+                pdfmetrics.registerFont(TTFont(FONT_NAME, path))
+                # 굵게/기울임 요청도 같은 폰트로 (Regular만 번들)
+                for bold in (0, 1):
+                    for italic in (0, 1):
+                        addMapping(FONT_NAME, bold, italic, FONT_NAME)
+                _registered_font = FONT_NAME
+                print(f"✅ PDF 한글 폰트 등록: {path}")
+            except Exception as e:
+                print(f"⚠️ PDF 한글 폰트 등록 실패 (한글이 깨질 수 있음): {e}")
+                _registered_font = FALLBACK_FONT
+        return _registered_font
+
+@dataclass(frozen=True)
+class PdfReport:
+    """생성된 보고서 파일 정보"""
+    path: str
+    size: int  # 바이트
+    pages: int
+    build_time: float  # 초
+    patent_count: int  # 부록에 실린 특허 수
+    
+    def read_bytes(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+    
+    def cleanup(self):
+        """임시 파일 삭제"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+    
+    def summary(self) -> str:
+        return (f"{self.pages}쪽, {self.size / 1024:,.0f}KB, 특허 {self.patent_count:,}건, "
+                f"{self.build_time:.1f}초")
+
+class _LazyStory(list):
+    """reportlab build()에 넘기는 지연 생성 story - 앞쪽 몇 개만 유지하고 소비되는 대로 채움
+    
+    build()는 len()/[0]/del [0]/앞쪽 삽입으로만 story를 다루므로 조회 시점에 생성기에서 보충합니다.
+    """
+    
+    def __init__(self, flowables: Iterable, lookahead: int = STORY_LOOKAHEAD):
+        super().__init__()
+        self._source: Optional[Iterator] = iter(flowables)
+        self._lookahead = lookahead
+    
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            flowable = next(self._source, None)
+            if flowable is None:
+                self._source = None
+            else:
+                list.append(self, flowable)
+    
+    def __len__(self) -> int:
+        self._fill()
+        return list.__len__(self)
+    
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+def _chart_png(labels, values, title: str, horizontal: bool = False) -> bytes:
+    """막대 차트 PNG - pyplot 전역 상태 없이 Figure를 직접 사용 (작업 스레드에서도 안전)"""
+    from matplotlib.figure import Figure
+    from matplotlib.font_manager import FontProperties
+    
+    path = os.getenv("PDF_FONT_PATH") or FONT_PATH
+    font = FontProperties(fname=path) if os.path.exists(path) else FontProperties()
+    
+    fig = Figure(figsize=(7.5, 3.6 if not horizontal else 0.35 * len(labels) + 1.2))
+    ax = fig.add_subplot()
+    if horizontal:
+        ax.barh(range(len(labels)), values, color='#10b981', alpha=0.85)
+        ax.set_yticks(range(len(labels)), labels, fontproperties=font, fontsize=8)
+        ax.invert_yaxis()
+    else:
+        ax.bar(range(len(labels)), values, color='#3b82f6', alpha=0.85)
+        ax.set_xticks(range(len(labels)), labels, rotation=45, fontsize=8)
+    ax.set_title(title, fontproperties=font, fontsize=12)
+    ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+    
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=120)
+    return buffer.getvalue()
+
+def _chart_image(png: bytes, width: float):
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image
+    
+    image_width, image_height = ImageReader(io.BytesIO(png)).getSize()
+    return Image(io.BytesIO(png), width=width, height=width * image_height / image_width)
+
+def _appendix_tables(patents: PatentTable, font: str, width: float) -> Iterator:
+    """전체 특허 부록 표 - APPENDIX_ROWS_PER_TABLE행씩 나눠 필요할 때 생성"""
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.platypus import Paragraph, Table, TableStyle
+    
+    cell_style = ParagraphStyle('AppendixCell', fontName=font, fontSize=7, leading=9)
+    header = ["No", "출원번호", "출원일", "출원인", "발명의 명칭", "상태"]
+    col_widths = [w * width for w in (0.06, 0.16, 0.11, 0.2, 0.37, 0.1)]
+    table_style = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), font),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e5e7eb')),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#9ca3af')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    
+    columns = ["app_num", "app_date", "applicant", "title", "reg_status"]
+    rows = patents.frame[columns].itertuples(index=False, name=None)
+    number = 0
+    while True:
+        chunk = list(islice(rows, APPENDIX_ROWS_PER_TABLE))
+        if not chunk:
+            return
+        data = [header]
+        for app_num, app_date, applicant, title, reg_status in chunk:
+            number += 1
+            data.append([str(number), app_num, app_date,
+                         Paragraph(escape(str(applicant)), cell_style),
+                         Paragraph(escape(str(title)), cell_style), reg_status])
+        yield Table(data, colWidths=col_widths, repeatRows=1, style=table_style)
+
+def build_pdf_report(analysis_data: Dict, analysis_result: str, patents: Optional[PatentTable] = None,
+                     path: Optional[str] = None) -> PdfReport:
+    """PDF 보고서를 파일로 생성 - path가 없으면 임시 파일 (PDF_TEMP_DIR 또는 시스템 임시 디렉터리)
+    
+    analysis_data: search_query, total_count, top_applicants, yearly_trends
+    patents: 주어지면 전체 목록을 부록 표로 수록
+    """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    
+    started = time.perf_counter()
+    font = register_korean_font()
+    temporary = path is None
+    if temporary:
+        fd, path = tempfile.mkstemp(prefix="patent_report_", suffix=".pdf", dir=os.getenv("PDF_TEMP_DIR") or None)
+        os.close(fd)
+    
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('ReportTitle', parent=styles['Title'], fontName=font)
+    header_style = ParagraphStyle('ReportHeader', parent=styles['Heading2'], fontName=font)
+    normal_style = ParagraphStyle('ReportNormal', parent=styles['Normal'], fontName=font, leading=15)
+    
+    doc = SimpleDocTemplate(path, pagesize=A4, rightMargin=56, leftMargin=56, topMargin=56, bottomMargin=40,
+                            title="AI 특허 분석 보고서")
+    patent_count = len(patents) if patents is not None else 0
+    
+    def story() -> Iterator:
+        yield Paragraph("AI 특허 분석 보고서", title_style)
+        yield Spacer(1, 12)
+        
+        # 분석 개요
+        yield Paragraph("분석 개요", header_style)
+        yield Paragraph(f"검색어: {escape(str(analysis_data.get('search_query', 'N/A')))}", normal_style)
+        yield Paragraph(f"분석 일시: {datetime.now().strftime('%Y년 %m월 %d일 %H시 %M분')}", normal_style)
+        yield Paragraph(f"총 특허 수: {analysis_data.get('total_count', 0):,}건", normal_style)
+        yield Spacer(1, 12)
+        
+        # 주요 통계 - 차트
+        yearly_data = analysis_data.get('yearly_trends', {})
+        top_applicants = dict(list(analysis_data.get('top_applicants', {}).items())[:CHART_TOP_APPLICANTS])
+        if yearly_data or top_applicants:
+            yield Paragraph("주요 통계", header_style)
+        if yearly_data:
+            years = sorted(yearly_data)
+            yield _chart_image(_chart_png(years, [yearly_data[y] for y in years], "연도별 특허 출원 현황"), doc.width)
+            yield Spacer(1, 12)
+        if top_applicants:
+            names = [name[:25] for name in top_applicants]
+            yield _chart_image(_chart_png(names, list(top_applicants.values()), "주요 출원인", horizontal=True),
+                               doc.width)
+        
+        # AI 분석 결과 - 문단별로
+        yield PageBreak()
+        yield Paragraph("AI 분석 결과", header_style)
+        for para in analysis_result.split('\n\n'):
+            cleaned_para = para.replace('**', '').replace('##', '').replace('#', '').strip()
+            if cleaned_para:
+                yield Paragraph(escape(cleaned_para).replace('\n', '<br/>'), normal_style)
+                yield Spacer(1, 6)
+        
+        # 부록 - 전체 특허 목록
+        if patent_count:
+            yield PageBreak()
+            yield Paragraph(f"부록: 전체 특허 목록 ({patent_count:,}건)", header_style)
+            yield from _appendix_tables(patents, font, doc.width)
+    
+    with span("pdf.build", patents=patent_count) as attributes:
+        try:
+            doc.build(_LazyStory(story()))
+        except BaseException:
+            if temporary:
+                os.remove(path)
+            raise
+        size = os.path.getsize(path)
+        attributes.update(bytes=size, pages=doc.page)
+    
+    report = PdfReport(path, size, doc.page, time.perf_counter() - started, patent_count)
+    print(f"📑 PDF 보고서 생성: {report.summary()} -> {path}")
+    return report
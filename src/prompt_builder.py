@@ -0,0 +1,156 @@
+"""
+토큰 예산 기반 프롬프트 조립 - 섹션별 토큰 비용 측정 + 예산 안에서 특허 근거 최대한 채우기
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 로컬 토큰 추정 - 한글/한자 등은 글자당 토큰 비용이 영문보다 훨씬 큼
+WIDE_CHARS_PER_TOKEN = 1.5
+LATIN_CHARS_PER_TOKEN = 4.0
+
+_WIDE_CHAR = re.compile(r"[\u1100-\uffff]")
+
+def estimate_tokens(text: str) -> int:
+    """API 호출 없는 토큰 수 추정 - 한글(넓은 문자)과 영문/숫자를 다른 비율로 계산"""
+    if not text:
+        return 0
+    wide = len(_WIDE_CHAR.findall(text))
+    return math.ceil(wide / WIDE_CHARS_PER_TOKEN + (len(text) - wide) / LATIN_CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """추정 토큰 수가 max_tokens 이하가 되도록 앞부분만 남김 (글자 수 기준 자르기 대체)"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    budget = max_tokens
+    for index, ch in enumerate(text):
+        budget -= 1 / WIDE_CHARS_PER_TOKEN if _WIDE_CHAR.match(ch) else 1 / LATIN_CHARS_PER_TOKEN
+        if budget < 0:
+            return text[:index]
+    return text
+
+def count_tokens(model, text: str) -> int:
+    """모델의 count_tokens로 정확한 토큰 수 - 실패하면 로컬 추정치"""
+    try:
+        return int(model.count_tokens(text).total_tokens)
+    except Exception as e:
+        print(f"⚠️ count_tokens 실패 (추정치 사용): {e}")
+        return estimate_tokens(text)
+
+@dataclass(frozen=True)
+class PromptBuild:
+    """조립된 프롬프트와 크기 보고"""
+    prompt: str
+    section_tokens: Dict[str, int]  # 섹션 이름 -> 추정 토큰 수 (조립 순서)
+    total_tokens: int
+    budget_tokens: int
+    evidence_included: int = 0  # 예산 안에 들어간 근거 항목 수
+    evidence_total: int = 0
+    exact: bool = False  # total_tokens가 count_tokens로 측정된 값인지
+    
+    truncated_sections: Tuple[str, ...] = ()  # 예산에 맞추려고 잘라낸 고정 섹션
+    
+    @property
+    def evidence_omitted(self) -> int:
+        return self.evidence_total - self.evidence_included
+    
+    @property
+    def over_budget(self) -> bool:
+        """잘라낼 수 없는 고정 섹션만으로 예산을 넘었는지"""
+        return self.total_tokens > self.budget_tokens
+
+@dataclass
+class _Section:
+    name: str
+    text: str = ""
+    items: Optional[List[str]] = None  # 근거 섹션이면 항목 목록
+    header: str = ""
+    truncatable: bool = False  # 고정 섹션이 예산을 넘으면 뒷부분을 잘라도 되는지
+
+class PromptBuilder:
+    """섹션 단위 프롬프트 조립기
+    
+    add_section()으로 넣은 고정 섹션의 비용을 먼저 계산하고, 남은 예산을 add_evidence()로 넣은
+    근거 항목에 순서대로 채웁니다. 출력 순서는 추가한 순서를 그대로 따릅니다.
+    고정 섹션만으로 예산을 넘으면 truncatable로 추가한 섹션을 나중에 추가한 것부터 잘라내고,
+    그래도 넘으면 결과의 over_budget으로 알립니다.
+    """
+    
+    def __init__(self, budget_tokens: int, separator: str = "\n\n"):
+        self.budget_tokens = budget_tokens
+        self.separator = separator
+        self._sections: List[_Section] = []
+    
+    def add_section(self, name: str, text: str, truncatable: bool = False) -> "PromptBuilder":
+        if text:
+            self._sections.append(_Section(name, text=text, truncatable=truncatable))
+        return self
+    
+    def add_evidence(self, name: str, items: Iterable[str], header: str = "") -> "PromptBuilder":
+        self._sections.append(_Section(name, items=list(items), header=header))
+        return self
+    
+    def build(self) -> PromptBuild:
+        separator_tokens = estimate_tokens(self.separator)
+        fixed_texts, truncated = self._fit_fixed_sections(separator_tokens)
+        fixed_tokens = sum(estimate_tokens(text) + separator_tokens for text in fixed_texts.values())
+        remaining = self.budget_tokens - fixed_tokens
+        
+        parts: List[Tuple[str, str]] = []
+        included = 0
+        total_items = 0
+        for index, section in enumerate(self._sections):
+            if section.items is None:
+                if fixed_texts[index]:
+                    parts.append((section.name, fixed_texts[index]))
+                continue
+            
+            total_items += len(section.items)
+            header_tokens = estimate_tokens(section.header) + separator_tokens
+            if remaining <= header_tokens:
+                continue
+            remaining -= header_tokens
+            
+            packed = []
+            for item in section.items:
+                cost = estimate_tokens(item) + 1  # 줄바꿈
+                if cost > remaining:
+                    break
+                packed.append(item)
+                remaining -= cost
+            if packed:
+                included += len(packed)
+                body = "\n".join(packed)
+                parts.append((section.name, f"{section.header}\n{body}" if section.header else body))
+            else:
+                remaining += header_tokens
+        
+        section_tokens = {name: estimate_tokens(text) for name, text in parts}
+        prompt = self.separator.join(text for _, text in parts)
+        build = PromptBuild(prompt, section_tokens, estimate_tokens(prompt), self.budget_tokens, included, total_items,
+                            truncated_sections=truncated)
+        if build.over_budget:
+            print(f"⚠️ 고정 섹션만으로 프롬프트 예산 초과: {build.total_tokens:,}/{self.budget_tokens:,}토큰")
+        return build
+    
+    def _fit_fixed_sections(self, separator_tokens: int) -> Tuple[Dict[int, str], Tuple[str, ...]]:
+        """고정 섹션 텍스트 (섹션 위치 -> 텍스트) - 예산 초과분을 잘라도 되는 섹션에서 뒤에서부터 잘라냄"""
+        texts = {index: s.text for index, s in enumerate(self._sections) if s.items is None}
+        overflow = sum(estimate_tokens(text) + separator_tokens for text in texts.values()) - self.budget_tokens
+        truncated = []
+        for index in reversed(list(texts)):
+            if overflow <= 0:
+                break
+            if not self._sections[index].truncatable:
+                continue
+            tokens = estimate_tokens(texts[index])
+            keep = max(0, tokens - overflow)
+            texts[index] = truncate_to_tokens(texts[index], keep)
+            overflow -= tokens - estimate_tokens(texts[index])
+            if not texts[index]:
+                overflow -= separator_tokens  # 통째로 빠진 섹션은 구분자도 없음
+            truncated.append(self._sections[index].name)
+        return texts, tuple(reversed(truncated))
@@ -0,0 +1,187 @@
+"""
+로컬 임베딩 의미 재정렬 - CPU 전용 sentence-transformers 모델 + 출원번호별 임베딩 캐시
+"""
+
+import hashlib
+import importlib.util
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.patent_table import PatentTable
+from src.sqlite_store import default_cache_dir
+
+# 한국어를 지원하는 소형 다국어 모델 (CPU에서 수백 건/초 수준)
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+RERANK_CANDIDATE_FACTOR = 2  # 재정렬 시 max_results의 몇 배를 후보로 수집할지
+EMBED_BATCH_SIZE = 64
+EMBED_TEXT_CHARS = 1000  # 임베딩에 사용하는 제목+초록 길이
+MEMORY_CACHE_ENTRIES = 50000
+
+def is_rerank_available() -> bool:
+    """sentence-transformers 설치 여부 (선택 의존성)"""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+class EmbeddingCache:
+    """출원번호별 임베딩 캐시 - 메모리 LRU + SQLite 영구 저장
+    
+    같은 출원번호라도 제목/초록이 바뀌면 텍스트 해시가 달라져 다시 계산합니다.
+    """
+    
+    def __init__(self, model_name: str, cache_dir: Optional[str] = None, memory_entries: int = MEMORY_CACHE_ENTRIES):
+        cache_dir = cache_dir or default_cache_dir("RERANK_CACHE_DIR")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "embeddings.sqlite3")
+        self.model_name = model_name
+        self.memory_entries = max(1, memory_entries)
+        self._memory: "OrderedDict[str, Tuple[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, app_num TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, app_num))"
+            )
+    
+    def get_many(self, keys: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
+        """(출원번호, 텍스트 해시) 목록 조회 - 찾은 것만 {출원번호: 벡터}로 반환"""
+        found = {}
+        missing = {}
+        with self._lock:
+            for app_num, text_hash in keys:
+                entry = self._memory.get(app_num)
+                if entry is not None and entry[0] == text_hash:
+                    self._memory.move_to_end(app_num)
+                    found[app_num] = entry[1]
+                else:
+                    missing[app_num] = text_hash
+            
+            app_nums = list(missing)
+            for start in range(0, len(app_nums), 500):
+                chunk = app_nums[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT app_num, text_hash, vector FROM embeddings WHERE model = ? AND app_num IN ({','.join('?' * len(chunk))})",
+                    (self.model_name, *chunk)
+                ).fetchall()
+                for app_num, text_hash, blob in rows:
+                    if missing[app_num] == text_hash:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[app_num] = vector
+                        self._remember(app_num, text_hash, vector)
+        return found
+    
+    def set_many(self, items: Dict[str, Tuple[str, np.ndarray]]):
+        """{출원번호: (텍스트 해시, 벡터)} 저장"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, app_num, text_hash, vector) VALUES (?, ?, ?, ?)",
+                [(self.model_name, app_num, text_hash, vector.astype(np.float32).tobytes())
+                 for app_num, (text_hash, vector) in items.items()]
+            )
+            for app_num, (text_hash, vector) in items.items():
+                self._remember(app_num, text_hash, vector)
+    
+    def _remember(self, app_num: str, text_hash: str, vector: np.ndarray):
+        self._memory[app_num] = (text_hash, vector)
+        self._memory.move_to_end(app_num)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+class SemanticReranker:
+    """검색어-특허 임베딩 코사인 유사도 재정렬기 (CPU 전용, 모델은 첫 사용 시 로드)"""
+    
+    def __init__(self, model_name: str = RERANK_MODEL_NAME, cache: Optional[EmbeddingCache] = None,
+                 batch_size: int = EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+    
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"🧬 임베딩 모델 로드: {self.model_name} (CPU)")
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+            return self._model
+    
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """정규화된 임베딩 행렬 (N x d, float32)"""
+        vectors = self._get_model().encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                           normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        vector = self._query_vectors.get(query)
+        if vector is None:
+            vector = self.embed_texts([query])[0]
+            self._query_vectors[query] = vector
+            if len(self._query_vectors) > 256:
+                self._query_vectors.popitem(last=False)
+        return vector
+    
+    def embed_patents(self, patents: PatentTable) -> np.ndarray:
+        """특허별 임베딩 행렬 - 캐시에 없는 특허만 배치로 계산"""
+        frame = patents.frame
+        texts = (frame["title"].astype(str) + "\n" + frame["abstract"].astype(str)).str[:EMBED_TEXT_CHARS].tolist()
+        app_nums = frame["app_num"].tolist()
+        hashes = [hashlib.sha1(text.encode("utf-8")).hexdigest()[:16] for text in texts]
+        
+        cached = self.cache.get_many(list(zip(app_nums, hashes))) if self.cache is not None else {}
+        missing = [i for i, app_num in enumerate(app_nums) if app_num not in cached]
+        if missing:
+            print(f"🧬 임베딩 계산: {len(missing)}건 (캐시 적중 {len(app_nums) - len(missing)}건)")
+            computed = self.embed_texts([texts[i] for i in missing])
+            new_items = {app_nums[i]: (hashes[i], computed[row]) for row, i in enumerate(missing)}
+            if self.cache is not None:
+                self.cache.set_many(new_items)
+            cached = {**cached, **{app_num: vector for app_num, (_, vector) in new_items.items()}}
+        
+        if not app_nums:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack([cached[app_num] for app_num in app_nums])
+    
+    def rerank(self, query: str, patents: PatentTable, top_k: Optional[int] = None) -> PatentTable:
+        """코사인 유사도 내림차순 정렬 - 동점은 기존(키워드 관련성) 순서 유지"""
+        if not patents:
+            return patents
+        similarities = self.embed_patents(patents) @ self.embed_query(query)
+        order = np.argsort(-similarities, kind="stable")[:top_k]
+        return PatentTable(patents.frame.iloc[order].reset_index(drop=True))
+
+_default_reranker: Optional[SemanticReranker] = None
+_reranker_lock = threading.Lock()
+
+def get_default_reranker() -> Optional[SemanticReranker]:
+    """프로세스 공용 재정렬기 - sentence-transformers 미설치 시 None"""
+    global _default_reranker
+    if not is_rerank_available():
+        return None
+    with _reranker_lock:
+        if _default_reranker is None:
+            try:
+                cache = EmbeddingCache(RERANK_MODEL_NAME)
+            except Exception as e:
+                print(f"⚠️ 임베딩 캐시 초기화 실패 (캐시 없이 진행): {e}")
+                cache = None
+            _default_reranker = SemanticReranker(cache=cache)
+        return _default_reranker
+
+def rerank_patents(query: str, patents: PatentTable, top_k: Optional[int] = None) -> PatentTable:
+    """의미 기반 재정렬 - 사용할 수 없거나 실패하면 기존 순서에서 상위 top_k건"""
+    reranker = get_default_reranker()
+    if reranker is None:
+        print("⚠️ sentence-transformers 미설치 - 의미 재정렬 생략")
+        return patents[:top_k]
+    try:
+        return reranker.rerank(query, patents, top_k)
+    except Exception as e:
+        print(f"❌ 의미 재정렬 오류 (기존 순서 사용): {e}")
+        return patents[:top_k]
@@ -0,0 +1,240 @@
+"""
+저장된 검색 + 증분 새로고침 - 출원일 워터마크 이후 페이지와 심사 중 특허의 상태 변경만 다시 조회
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.instrumentation import propagate
+from src.kipris_handler import AdvancedKiprisOptimizer
+from src.patent_index import get_default_index
+from src.patent_table import PatentRecord, PatentTable
+from src.sqlite_store import default_cache_dir
+
+# 새로고침 시 필드별로 최신순 조회할 최대 페이지 수
+MAX_REFRESH_PAGES = 50
+
+# 더 이상 바뀌지 않는 것으로 보는 등록상태 - 그 외(공개/출원/심사 중)는 상태 변경 확인 대상
+FINAL_STATUS_KEYWORDS = ('등록', '거절', '취하', '포기', '소멸', '무효')
+
+# 새로고침 1회당 상태 변경 확인 요청 상한 (최근 출원일 순으로 확인)
+MAX_STATUS_CHECKS = 20
+
+@dataclass
+class SavedSearch:
+    """저장된 검색 - 마지막 결과 집합과 출원일 워터마크"""
+    name: str
+    keyword: str
+    watermark: str  # 결과 집합의 최신 출원일 (YYYYMMDD)
+    patents: PatentTable
+    created_at: float
+    refreshed_at: float
+
+@dataclass(frozen=True)
+class RefreshDiff:
+    """새로고침 변경 내역"""
+    added: List[PatentRecord] = field(default_factory=list)
+    status_changes: List[Tuple[PatentRecord, str]] = field(default_factory=list)  # (새 레코드, 이전 상태)
+    api_calls: int = 0
+    pages_fetched: int = 0
+    status_checked: int = 0
+    elapsed: float = 0.0
+    
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.status_changes)
+    
+    def summary(self) -> str:
+        return (f"신규 {len(self.added)}건, 상태 변경 {len(self.status_changes)}건 "
+                f"(API 호출 {self.api_calls}회, {self.elapsed:.1f}초)")
+
+def is_pending_status(reg_status: str) -> bool:
+    return not any(keyword in reg_status for keyword in FINAL_STATUS_KEYWORDS)
+
+class SavedSearchStore:
+    """저장된 검색 영구 저장소 - SQLite (결과 집합은 PatentRecord 행 목록 JSON)"""
+    
+    def __init__(self, cache_dir: Optional[str] = None):
+        cache_dir = cache_dir or default_cache_dir("SAVED_SEARCH_DIR")
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "saved_searches.sqlite3")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS saved_searches ("
+                "name TEXT PRIMARY KEY, keyword TEXT NOT NULL, watermark TEXT NOT NULL, rows TEXT NOT NULL, "
+                "created_at REAL NOT NULL, refreshed_at REAL NOT NULL)"
+            )
+    
+    def save(self, name: str, keyword: str, patents: PatentTable) -> SavedSearch:
+        """현재 결과 집합 저장 (같은 이름이면 덮어씀) - 워터마크는 최신 출원일"""
+        now = time.time()
+        existing = self.get(name)
+        saved = SavedSearch(name, keyword, latest_app_date(patents), patents,
+                            existing.created_at if existing else now, now)
+        self._write(saved)
+        return saved
+    
+    def get(self, name: str) -> Optional[SavedSearch]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, keyword, watermark, rows, created_at, refreshed_at FROM saved_searches WHERE name = ?", (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        patents = PatentTable.from_records(PatentRecord.from_row(values) for values in json.loads(row[3]))
+        return SavedSearch(row[0], row[1], row[2], patents, row[4], row[5])
+    
+    def list_names(self) -> List[str]:
+        """최근 새로고침 순 이름 목록"""
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM saved_searches ORDER BY refreshed_at DESC").fetchall()
+        return [row[0] for row in rows]
+    
+    def delete(self, name: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM saved_searches WHERE name = ?", (name,))
+    
+    def _write(self, saved: SavedSearch):
+        rows = json.dumps([patent.to_row() for patent in saved.patents], ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO saved_searches (name, keyword, watermark, rows, created_at, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (saved.name, saved.keyword, saved.watermark, rows, saved.created_at, saved.refreshed_at)
+            )
+    
+    def refresh(self, api_key: str, name: str, max_workers: int = 4,
+                max_status_checks: int = MAX_STATUS_CHECKS) -> Tuple[SavedSearch, RefreshDiff]:
+        """증분 새로고침 - 워터마크 이후 출원과 심사 중 특허의 상태 변경만 조회해 출원번호 기준 병합
+        
+        응답 캐시는 사용하지 않습니다 (캐시된 페이지로는 변경을 알 수 없음).
+        """
+        saved = self.get(name)
+        if saved is None:
+            raise KeyError(name)
+        
+        started = time.time()
+        optimizer = AdvancedKiprisOptimizer(api_key, max_workers=max_workers, cache=None, index=get_default_index())
+        try:
+            known = {patent.app_num: patent for patent in saved.patents}
+            added, seen, pages_fetched, complete = self._fetch_newer(optimizer, saved.keyword, saved.watermark, known)
+            
+            # 최신 페이지에서 이미 본 특허는 추가 요청 없이 상태 비교
+            status_changes = [(patent, known[app_num].reg_status) for app_num, patent in seen.items()
+                              if patent.reg_status != known[app_num].reg_status]
+            unchecked = {app_num: patent for app_num, patent in known.items() if app_num not in seen}
+            checked_changes, status_checked = self._check_status_changes(optimizer, unchecked, max_status_checks)
+            status_changes += checked_changes
+            api_calls = optimizer.network_count
+        finally:
+            optimizer.close()
+        
+        # 출원번호 기준 병합 후 기존 검색과 같은 관련성 순서로 정렬
+        merged = {**known, **{patent.app_num: patent for patent in added}}
+        for patent, _ in status_changes:
+            merged[patent.app_num] = patent
+        ordered = sorted(merged.values(), key=lambda p: optimizer._calculate_relevance(p, saved.keyword), reverse=True)
+        
+        patents = PatentTable.from_records(ordered)
+        # 실패한 페이지가 있으면 그 사이 특허를 다음 새로고침에서 다시 찾도록 워터마크를 유지
+        watermark = max(saved.watermark, latest_app_date(patents)) if complete else saved.watermark
+        refreshed = SavedSearch(saved.name, saved.keyword, watermark, patents, saved.created_at, time.time())
+        self._write(refreshed)
+        
+        diff = RefreshDiff(added, status_changes, api_calls, pages_fetched, status_checked, time.time() - started)
+        print(f"🔄 '{name}' 새로고침: {diff.summary()}")
+        return refreshed, diff
+    
+    def _fetch_newer(self, optimizer: AdvancedKiprisOptimizer, keyword: str, watermark: str,
+                     known: Dict[str, PatentRecord]) -> Tuple[List[PatentRecord], Dict[str, PatentRecord], int, bool]:
+        """필드별로 출원일 내림차순 페이지를 워터마크보다 오래된 특허가 나올 때까지 조회
+        
+        (신규 특허, 페이지에서 다시 본 기존 특허, 조회한 페이지 수, 요청 실패 없이 끝났는지)를 반환합니다.
+        페이지 요청이 실패하면 그 필드는 거기서 멈춥니다 (빈 페이지로 보고 끝까지 본 것처럼 처리하지 않음).
+        워터마크가 없으면(출원일 없는 결과 집합) 멈출 기준이 없으므로 _fetch_without_watermark로 처리합니다.
+        """
+        if not watermark:
+            return self._fetch_without_watermark(optimizer, keyword, known)
+        
+        added = {}
+        seen = {}
+        pages_fetched = 0
+        complete = True
+        for search_field in optimizer._smart_field_selection(keyword):
+            for page in range(1, MAX_REFRESH_PAGES + 1):
+                result = optimizer._search_field(keyword, search_field, page, 10, True)
+                pages_fetched += 1
+                if result is None:
+                    print(f"⚠️ {search_field}: {page}페이지 요청 실패 - 이 필드의 새로고침 중단")
+                    complete = False
+                    break
+                patents_page, total_count = result
+                for patent in patents_page:
+                    if patent.app_num in known:
+                        seen[patent.app_num] = patent
+                    elif patent.app_date >= watermark:
+                        added.setdefault(patent.app_num, patent)
+                if not patents_page or page * 10 >= total_count:
+                    break
+                # 같은 출원일에 새 특허가 있을 수 있으므로 워터마크보다 오래된 특허가 보일 때까지 진행
+                # (출원일이 없는 특허는 판단에서 제외)
+                dates = [patent.app_date for patent in patents_page if patent.app_date]
+                if dates and min(dates) < watermark:
+                    break
+        return sorted(added.values(), key=lambda p: p.app_date, reverse=True), seen, pages_fetched, complete
+    
+    def _fetch_without_watermark(self, optimizer: AdvancedKiprisOptimizer, keyword: str,
+                                 known: Dict[str, PatentRecord]) -> Tuple[List[PatentRecord], Dict[str, PatentRecord], int, bool]:
+        """워터마크 없는 새로고침 - 저장된 건수만큼 일반 검색(조기 종료 포함)을 다시 하고 모르는 특허만 신규로 봄"""
+        calls_before, failed_before = optimizer.call_count, optimizer.failed_count
+        patents = optimizer.smart_comprehensive_search(keyword, max(len(known), 1))
+        added = [patent for patent in patents if patent.app_num not in known]
+        seen = {patent.app_num: patent for patent in patents if patent.app_num in known}
+        return (added, seen, optimizer.call_count - calls_before, optimizer.failed_count == failed_before)
+    
+    def _check_status_changes(self, optimizer: AdvancedKiprisOptimizer, known: Dict[str, PatentRecord],
+                              max_checks: int) -> Tuple[List[Tuple[PatentRecord, str]], int]:
+        """심사 중 특허만 출원번호로 재조회 - 최근 출원일 순으로 max_checks건"""
+        pending = sorted((p for p in known.values() if is_pending_status(p.reg_status)),
+                         key=lambda p: p.app_date, reverse=True)[:max_checks]
+        if not pending:
+            return [], 0
+        
+        def lookup(patent: PatentRecord) -> Optional[PatentRecord]:
+            result = optimizer._search_field(patent.app_num, "applicationNumber", 1, 1)
+            return result[0][0] if result and result[0] else None
+        
+        changes = []
+        with ThreadPoolExecutor(max_workers=optimizer.max_workers) as executor:
+            for old, current in zip(pending, executor.map(propagate(lookup), pending)):
+                if current is not None and current.reg_status != old.reg_status:
+                    changes.append((current, old.reg_status))
+        return changes, len(pending)
+
+def latest_app_date(patents: PatentTable) -> str:
+    """결과 집합의 최신 출원일 (없으면 빈 문자열)"""
+    dates = [date for date in patents.frame["app_date"] if date]
+    return max(dates) if dates else ""
+
+_default_store: Optional[SavedSearchStore] = None
+_store_lock = threading.Lock()
+
+def get_saved_search_store() -> Optional[SavedSearchStore]:
+    """프로세스 공용 저장된 검색 저장소 - 초기화에 실패하면(쓰기 불가 디렉터리 등) None"""
+    global _default_store
+    with _store_lock:
+        if _default_store is None:
+            try:
+                _default_store = SavedSearchStore()
+            except Exception as e:
+                print(f"⚠️ 저장된 검색 저장소 초기화 실패 (저장된 검색 없이 진행): {e}")
+                return None
+        return _default_store
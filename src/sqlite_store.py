@@ -0,0 +1,105 @@
+"""
+SQLite 기반 영구 키-값 저장소 - TTL 만료 + 크기 제한 LRU 제거 (KIPRIS 응답 캐시와 LLM 응답 캐시가 공유)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+# KIPRIS 고급검색 엔드포인트 - KIPRIS_BASE_URL로 로컬 대체 서버(benchmarks/fake_kipris_server.py) 지정 가능
+DEFAULT_BASE_URL = "http://plus.kipris.or.kr/kipo-api/kipi/patUtiModInfoSearchSevice/getAdvancedSearch"
+
+def kipris_base_url() -> str:
+    """현재 KIPRIS 엔드포인트 - KIPRIS_BASE_URL 환경변수 또는 실제 KIPRIS"""
+    return os.getenv("KIPRIS_BASE_URL") or DEFAULT_BASE_URL
+
+def default_cache_dir(env_var: str) -> str:
+    """캐시 디렉터리 - env_var 환경변수가 있으면 그 경로, 없으면 ~/.cache/patent-insight-engine
+    
+    KIPRIS_BASE_URL이 실제 KIPRIS가 아니면 엔드포인트별 하위 디렉터리를 돌려주므로
+    대체 서버의 합성 특허가 실제 검색의 캐시/인덱스/저장된 검색에 섞이지 않습니다.
+    """
+    cache_dir = os.getenv(env_var) or os.path.join(os.path.expanduser("~"), ".cache", "patent-insight-engine")
+    base_url = kipris_base_url()
+    if base_url == DEFAULT_BASE_URL:
+        return cache_dir
+    return os.path.join(cache_dir, "endpoints", hashlib.sha256(base_url.encode("utf-8")).hexdigest()[:16])
+
+class SqliteTTLStore(Generic[V]):
+    """(key, payload, created_at, accessed_at) 테이블 하나에 값을 직렬화해 저장
+    
+    get()은 TTL이 지난 항목을 지우고 None을 돌려주며, set()은 max_entries를 넘는 만큼
+    오래 사용되지 않은 항목부터 제거합니다. 값 형식은 serialize/deserialize로 정합니다.
+    """
+    
+    def __init__(self, path: str, table: str, serialize: Callable[[V], str], deserialize: Callable[[str], V],
+                 ttl_seconds: float, max_entries: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.hit_count = 0
+        self.miss_count = 0
+        self._serialize = serialize
+        self._deserialize = deserialize
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+    
+    def get(self, key: str) -> Optional[V]:
+        """조회 - 만료되었거나 없으면 None (적중/실패 횟수 집계)"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT payload, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.miss_count += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hit_count += 1
+        return self._deserialize(row[0])
+    
+    def set(self, key: str, value: V):
+        """저장 후 최대 개수 초과분을 오래 사용되지 않은 순으로 제거"""
+        now = time.time()
+        payload = self._serialize(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, payload, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            overflow = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,)
+                )
+    
+    def stats(self) -> Dict[str, Any]:
+        """적중/실패 횟수와 적중률"""
+        with self._lock:
+            total = self.hit_count + self.miss_count
+            return {
+                "hits": self.hit_count,
+                "misses": self.miss_count,
+                "hit_rate": (self.hit_count / total * 100) if total > 0 else 0.0
+            }
+    
+    def clear(self):
+        """전체 삭제"""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
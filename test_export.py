@@ -0,0 +1,61 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.export import export_many, export_patents
+from src.patent_table import PatentRecord, PatentTable, kipris_detail_url
+
+RECORDS = [
+    PatentRecord(title=f"배터리 셀 <{i}> & \"모듈\", 제어", app_num=f"10-2023-000{i}",
+                 abstract="첫 줄\n둘째 줄", applicant="삼성SDI", app_date=f"2023010{i}",
+                 reg_status="등록" if i % 2 == 0 else "공개")
+    for i in range(1, 6)
+]
+
+def expected_frame() -> pd.DataFrame:
+    frame = PatentTable.from_records(RECORDS).frame.astype(str)
+    return frame.assign(kipris_url=frame["app_num"].map(kipris_detail_url)).reset_index(drop=True)
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "parquet"])
+def test_export_round_trips(tmp_path, fmt):
+    path = str(tmp_path / f"patents.{fmt}")
+    result = export_patents(PatentTable.from_records(RECORDS), path, batch_rows=2)
+    
+    if fmt == "csv":
+        loaded = pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            loaded = pd.DataFrame([json.loads(line) for line in f])
+    else:
+        loaded = pd.read_parquet(path)
+    
+    assert result.rows == len(RECORDS)
+    pd.testing.assert_frame_equal(loaded, expected_frame())
+
+def test_xlsx_opens_with_openpyxl(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")  # 테스트 전용 - requirements.txt에는 없음
+    path = str(tmp_path / "patents.xlsx")
+    export_patents(PatentTable.from_records(RECORDS), path, batch_rows=2)
+    
+    sheet = openpyxl.load_workbook(path, read_only=True).active
+    rows = [tuple("" if value is None else value for value in row) for row in sheet.iter_rows(values_only=True)]
+    expected = expected_frame()
+    
+    assert list(rows[0]) == list(expected.columns)
+    assert rows[1:] == list(expected.itertuples(index=False, name=None))
+
+def test_xlsx_drops_illegal_xml_characters(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "control.xlsx")
+    export_patents(pd.DataFrame({"memo": ["a\x00b\x1fc", "탭\t유지"]}), path)
+    
+    sheet = openpyxl.load_workbook(path, read_only=True).active
+    assert [row[0] for row in sheet.iter_rows(min_row=2, values_only=True)] == ["abc", "탭\t유지"]
+
+def test_export_many_keeps_path_order(tmp_path):
+    paths = [str(tmp_path / name) for name in ("a.xlsx", "b.csv", "c.jsonl")]
+    results = export_many(PatentTable.from_records(RECORDS), paths)
+    
+    assert [result.format for result in results] == ["xlsx", "csv", "jsonl"]
+    assert all(result.rows == len(RECORDS) and result.size > 0 for result in results)
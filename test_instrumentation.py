@@ -0,0 +1,17 @@
+import pytest
+
+from src.instrumentation import SpanCollector, SpanSink, span
+
+def test_sink_without_emit_fails_at_construction():
+    class ForgetfulSink(SpanSink):
+        pass
+    
+    with pytest.raises(TypeError):
+        ForgetfulSink()
+
+def test_collector_receives_spans_from_its_context():
+    with SpanCollector() as collector:
+        with span("kipris.parse", bytes=10):
+            pass
+    
+    assert [(record.name, record.attributes) for record in collector.spans] == [("kipris.parse", {"bytes": 10})]
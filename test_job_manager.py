@@ -0,0 +1,69 @@
+import threading
+import time
+
+from src.job_manager import JobManager
+
+def wait_finished(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+def test_same_key_joins_the_running_job():
+    manager = JobManager(max_workers=2)
+    release = threading.Event()
+    runs = []
+    
+    def search(job, keyword):
+        runs.append(keyword)
+        job.update(0.5, "수집 중")
+        release.wait(5)
+        return f"{keyword} 결과"
+    
+    try:
+        first = manager.submit(("search", "배터리"), search, "배터리")
+        second = manager.submit(("search", "배터리"), search, "배터리")
+        other = manager.submit(("search", "반도체"), search, "반도체")
+        
+        assert second is first and first.subscribers == 2
+        assert other is not first
+        release.set()
+        wait_finished(first)
+        wait_finished(other)
+    finally:
+        release.set()
+        manager.shutdown()
+    
+    assert sorted(runs) == ["반도체", "배터리"]
+    assert (first.status, first.result, first.progress) == ("done", "배터리 결과", 1.0)
+    assert manager.active_jobs() == []
+
+def test_finished_job_is_not_joined_and_errors_are_reported():
+    manager = JobManager(max_workers=1)
+    
+    def fail(job):
+        raise RuntimeError("KIPRIS down")
+    
+    try:
+        failed = manager.submit("key", fail)
+        wait_finished(failed)
+        retried = manager.submit("key", lambda job: "ok")
+        wait_finished(retried)
+    finally:
+        manager.shutdown()
+    
+    assert (failed.status, failed.error) == ("error", "KIPRIS down")
+    assert retried is not failed and retried.result == "ok"
+    assert manager.get(failed.id) is failed  # 보관 시간 동안은 결과를 다시 가져갈 수 있음
+
+def test_finished_jobs_are_pruned_after_retention():
+    manager = JobManager(max_workers=1, retention_seconds=0)
+    try:
+        job = manager.submit("key", lambda job: "ok")
+        wait_finished(job)
+        time.sleep(0.01)
+        manager.submit("other", lambda job: "ok")
+    finally:
+        manager.shutdown()
+    
+    assert manager.get(job.id) is None
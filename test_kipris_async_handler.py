@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_kipris_server import FakeKiprisServer
+from src.kipris_async_handler import AsyncKiprisOptimizer
+from src.kipris_handler import AdvancedKiprisOptimizer, SingleFlight, TokenBucket
+from src.patent_index import PatentIndex
+
+KEYWORD = "배터리"
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeKiprisServer(total_count=60) as fake:
+        monkeypatch.setenv("KIPRIS_BASE_URL", fake.url)
+        yield fake
+
+def make_optimizer(cls, index=None):
+    return cls("test-key", max_workers=4, backoff_base=0.01, rate_limiter=TokenBucket(1000),
+               index=index, single_flight=SingleFlight())
+
+def sync_search(**kwargs):
+    optimizer = make_optimizer(AdvancedKiprisOptimizer, kwargs.pop("index", None))
+    try:
+        return optimizer.smart_comprehensive_search(KEYWORD, 30, **kwargs)
+    finally:
+        optimizer.close()
+
+def async_search(events=None, **kwargs):
+    async def run():
+        async with make_optimizer(AsyncKiprisOptimizer, kwargs.pop("index", None)) as optimizer:
+            return await optimizer.smart_comprehensive_search_async(KEYWORD, 30, progress_callback=events.append
+                                                                    if events is not None else None, **kwargs)
+    return asyncio.run(run())
+
+def test_async_search_matches_sync_search(server):
+    events = []
+    patents = async_search(events)
+    
+    assert len(patents) == 30
+    assert patents.app_nums == sync_search().app_nums
+    assert [event["type"] for event in events][-1] == "done"
+    assert any(event["type"] == "page" for event in events)
+
+def test_async_search_records_coverage_and_serves_offline(server, tmp_path):
+    index = PatentIndex(str(tmp_path))
+    async_search(index=index)
+    assert index.get_coverage("astrtCont", KEYWORD).total_count == server.total_count
+    
+    requests_before = server.stats["requests"]
+    offline = async_search(index=index, index_mode="offline")
+    
+    assert server.stats["requests"] == requests_before
+    assert len(offline) == 30
+    assert offline.app_nums == sync_search(index=index, index_mode="offline").app_nums
@@ -0,0 +1,269 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_kipris_server import FakeKiprisServer
+from src import kipris_handler, patent_index
+from src.kipris_handler import (
+    DEFAULT_BASE_URL, AdvancedKiprisOptimizer, KiprisResponseCache, SingleFlight, TokenBucket
+)
+from src.patent_index import PatentIndex
+from src.patent_table import PatentRecord
+from src.sqlite_store import default_cache_dir
+
+KEYWORD = "배터리"
+
+class FakePagesOptimizer(AdvancedKiprisOptimizer):
+    """네트워크 없이 출원일 내림차순 페이지를 돌려주는 수집기 - 페이지 요청 수 기록"""
+    
+    TOTAL_COUNT = 100
+    
+    def __init__(self):
+        super().__init__("test-key", max_workers=1)
+        self.requested_pages = 0
+    
+    def _search_field(self, keyword, field, page_no=1, num_of_rows=10, sort_by_date=False):
+        with self._lock:
+            self.requested_pages += 1
+        year = 2023 - (page_no - 1)  # 1~4페이지는 2020년 이후, 5페이지부터 2019년 이전
+        patents = [
+            PatentRecord(title=f"{KEYWORD} 제어 {page_no}-{i}", app_num=f"10-{year}-{page_no:03d}{i}",
+                         abstract=f"{KEYWORD} 셀", app_date=f"{year}0101", reg_status="등록" if i % 2 == 0 else "공개")
+            for i in range(num_of_rows)
+        ]
+        return patents, self.TOTAL_COUNT
+
+def harvest(early_stop, sort_by_date, max_results=25):
+    optimizer = FakePagesOptimizer()
+    try:
+        patents = optimizer.smart_comprehensive_search(KEYWORD, max_results, early_stop=early_stop,
+                                                       sort_by_date=sort_by_date)
+    finally:
+        optimizer.close()
+    return patents.app_nums, optimizer.requested_pages
+
+def test_settled_top_k_equals_exhaustive_top_k_with_date_sort():
+    settled, settled_pages = harvest(early_stop=True, sort_by_date=True)
+    exhaustive, exhaustive_pages = harvest(early_stop=False, sort_by_date=True)
+    
+    assert settled == exhaustive
+    assert len(settled) == 25
+    assert settled_pages < exhaustive_pages
+
+def test_relevance_sort_only_settles_when_top_k_reaches_max_score():
+    settled, _ = harvest(early_stop=True, sort_by_date=False)
+    exhaustive, exhaustive_pages = harvest(early_stop=False, sort_by_date=False)
+    assert settled == exhaustive
+    
+    # 상위 20건이 모두 최고점(제목+초록+등록+최근)이면 관련성 정렬에서도 확정됨
+    settled, settled_pages = harvest(early_stop=True, sort_by_date=False, max_results=20)
+    exhaustive, exhaustive_pages = harvest(early_stop=False, sort_by_date=False, max_results=20)
+    assert settled == exhaustive
+    assert settled_pages < exhaustive_pages
+
+def test_top_k_settled_bound():
+    scores = {"a": 6.5, "b": 6.0, "c": 5.0}
+    assert AdvancedKiprisOptimizer._top_k_settled(scores, 2, 6.0)
+    assert not AdvancedKiprisOptimizer._top_k_settled(scores, 2, 6.5)
+    assert not AdvancedKiprisOptimizer._top_k_settled(scores, 4, 0.0)  # 아직 k건이 안 됨
+    
+    recent = PatentRecord(app_date="20200101")
+    old = PatentRecord(app_date="20191231")
+    assert AdvancedKiprisOptimizer._remaining_score_bound(recent) == 6.5
+    assert AdvancedKiprisOptimizer._remaining_score_bound(old) == 6.0
+
+def run_concurrently(single_flight, key, func, followers=4):
+    """리더 1개가 func 안에서 막혀 있는 동안 같은 키로 followers개 호출 - (결과 또는 예외) 목록"""
+    started = threading.Event()
+    release = threading.Event()
+    
+    def leader_func():
+        started.set()
+        release.wait(5)
+        return func()
+    
+    outcomes = []
+    outcomes_lock = threading.Lock()
+    
+    def call(target):
+        try:
+            outcome = single_flight.do(key, target)
+        except Exception as e:
+            outcome = e
+        with outcomes_lock:
+            outcomes.append(outcome)
+    
+    threads = [threading.Thread(target=call, args=(leader_func,))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=call, args=(func,)) for _ in range(followers)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.2)  # 대기 호출들이 진행 중인 실행에 합류할 때까지
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+def test_single_flight_coalesces_concurrent_calls():
+    single_flight = SingleFlight()
+    executions = []
+    
+    def fetch():
+        executions.append(1)
+        return "page"
+    
+    outcomes = run_concurrently(single_flight, ("배터리", 1), fetch)
+    
+    assert len(executions) == 1
+    assert sorted(shared for _, shared in outcomes) == [False, True, True, True, True]
+    assert all(result == "page" for result, _ in outcomes)
+    # 끝난 호출은 남기지 않음 (캐시가 아님)
+    assert single_flight.do(("배터리", 1), fetch) == ("page", False)
+    assert len(executions) == 2
+
+def test_single_flight_propagates_exception_to_waiters():
+    single_flight = SingleFlight()
+    executions = []
+    
+    def fail():
+        executions.append(1)
+        raise RuntimeError("KIPRIS down")
+    
+    outcomes = run_concurrently(single_flight, "key", fail)
+    
+    assert len(executions) == 1
+    assert len(outcomes) == 5
+    assert all(isinstance(outcome, RuntimeError) and str(outcome) == "KIPRIS down" for outcome in outcomes)
+    assert single_flight.do("key", lambda: "ok") == ("ok", False)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_waits_once_capacity_is_spent(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(kipris_handler.time, "monotonic", clock)
+    bucket = TokenBucket(rate=2, capacity=3)
+    
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    # 예약은 순서대로 쌓임 - 초당 2개 보충이므로 0.5초, 1.0초 대기
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    
+    clock.now += 1.0
+    assert bucket.reserve() == pytest.approx(0.5)
+    
+    # 오래 쉬어도 capacity 이상은 쌓이지 않음
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.reserve() == pytest.approx(0.5)
+
+def test_token_bucket_pause_delays_every_caller(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(kipris_handler.time, "monotonic", clock)
+    bucket = TokenBucket(rate=10)
+    
+    bucket.pause(2.0)
+    assert bucket.reserve() == pytest.approx(2.1)
+    clock.now += 2.1
+    assert bucket.reserve() == pytest.approx(0.1)
+
+def test_other_endpoints_never_share_cache_or_index_dirs(monkeypatch, tmp_path):
+    monkeypatch.setenv("KIPRIS_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("KIPRIS_BASE_URL", raising=False)
+    assert default_cache_dir("KIPRIS_CACHE_DIR") == str(tmp_path)
+    
+    monkeypatch.setenv("KIPRIS_BASE_URL", "http://127.0.0.1:8765/getAdvancedSearch")
+    fake_dir = default_cache_dir("KIPRIS_CACHE_DIR")
+    assert fake_dir.startswith(str(tmp_path)) and fake_dir != str(tmp_path)
+    assert AdvancedKiprisOptimizer("test-key", cache=None).base_url == "http://127.0.0.1:8765/getAdvancedSearch"
+    
+    real = KiprisResponseCache.make_key(DEFAULT_BASE_URL, "astrtCont", KEYWORD, 1, 10)
+    fake = KiprisResponseCache.make_key("http://127.0.0.1:8765/getAdvancedSearch", "astrtCont", KEYWORD, 1, 10)
+    assert real != fake
+
+def test_patent_details_need_an_exact_application_number(monkeypatch, tmp_path):
+    index = PatentIndex(str(tmp_path))
+    index.add([PatentRecord(title="배터리 셀", app_num="10-2023-0001234", app_date="20230101"),
+               PatentRecord(title="배터리 팩", app_num="10-2023-0001235", app_date="20231231")])
+    monkeypatch.setattr(kipris_handler, "get_default_index", lambda: index)
+    
+    assert kipris_handler.get_patent_details("test-key", "10-2023-0001234", "offline").title == "배터리 셀"
+    assert kipris_handler.get_patent_details("test-key", "10-2023-000123", "offline") is None
+    
+    # local_first에서 부분 번호는 로컬 최신 특허가 아니라 KIPRIS 조회로 넘어감
+    requested = []
+    
+    def fake_search_field(self, keyword, field, page_no=1, num_of_rows=10, sort_by_date=False):
+        requested.append((keyword, field))
+        return [], 0
+    
+    monkeypatch.setattr(AdvancedKiprisOptimizer, "_search_field", fake_search_field)
+    assert kipris_handler.get_patent_details("test-key", "10-2023-000123", "local_first") is None
+    assert requested == [("10-2023-000123", "applicationNumber")]
+
+def test_cached_pages_are_counted_apart_from_network_calls(monkeypatch, tmp_path):
+    cache = KiprisResponseCache(str(tmp_path))
+    with FakeKiprisServer(total_count=30) as server:
+        monkeypatch.setenv("KIPRIS_BASE_URL", server.url)
+        runs = []
+        for _ in range(2):
+            optimizer = AdvancedKiprisOptimizer("test-key", max_workers=2, cache=cache,
+                                                rate_limiter=TokenBucket(1000), single_flight=SingleFlight())
+            try:
+                patents = optimizer.smart_comprehensive_search(KEYWORD, 20, early_stop=False)
+            finally:
+                optimizer.close()
+            runs.append((patents.app_nums, optimizer))
+        requests = server.stats["requests"]
+    
+    (first_patents, first), (second_patents, second) = runs
+    assert first.network_count == first.call_count == requests > 0
+    assert first.cache_hit_count == 0
+    assert second.network_count == 0
+    assert second.cache_hit_count == second.call_count == first.call_count
+    assert second_patents == first_patents
+
+def test_local_first_requests_only_the_delta_and_offline_requests_nothing(monkeypatch, tmp_path):
+    index = PatentIndex(str(tmp_path))
+    fields = ("astrtCont", "inventionTitle")
+    
+    def search(index_mode):
+        optimizer = AdvancedKiprisOptimizer("test-key", max_workers=2, index=index,
+                                            rate_limiter=TokenBucket(1000), single_flight=SingleFlight())
+        try:
+            return optimizer.smart_comprehensive_search(KEYWORD, 100, early_stop=False, index_mode=index_mode)
+        finally:
+            optimizer.close()
+    
+    with FakeKiprisServer(total_count=30) as server:
+        monkeypatch.setenv("KIPRIS_BASE_URL", server.url)
+        search("online")
+        assert [index.get_coverage(field, KEYWORD).total_count for field in fields] == [30, 30]
+        
+        # 방금 수집한 검색어는 KIPRIS에 묻지 않고 로컬 결과만 사용
+        server.reset_stats()
+        fresh = search("local_first")
+        assert server.stats["requests"] == 0
+        assert len(fresh) == 30
+        
+        # 마지막 수집 이후 20건 증가 - 필드마다 최신순 2페이지만 요청 (첫 페이지 재사용)
+        monkeypatch.setattr(patent_index, "COVERAGE_FRESH_SECONDS", 0)
+        server.total_count = 50
+        server.reset_stats()
+        search("local_first")
+        assert server.stats["requests"] == 2 * len(fields)
+        assert [index.get_coverage(field, KEYWORD).total_count for field in fields] == [50, 50]
+        
+        server.reset_stats()
+        offline = search("offline")
+        assert server.stats["requests"] == 0
+        assert offline.app_nums == fresh.app_nums
+    
+    with pytest.raises(RuntimeError):
+        AdvancedKiprisOptimizer("test-key").smart_comprehensive_search(KEYWORD, 10, index_mode="offline")
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm_handler import AdvancedPatentAnalyzer, LLMResponseCache, get_generative_model
+
+def api_key_of(client) -> str:
+    transport = client._client._transport if hasattr(client, "_client") else client._transport
+    return transport._credentials.token
+
+def test_each_api_key_gets_its_own_clients():
+    model_a = get_generative_model("key-a", "gemini-2.5-flash")
+    model_b = get_generative_model("key-b", "gemini-2.5-flash")
+    
+    assert model_a is get_generative_model("key-a", "gemini-2.5-flash")
+    assert model_a._client is not model_b._client
+    assert (api_key_of(model_a._client), api_key_of(model_b._client)) == ("key-a", "key-b")
+    # 같은 키의 다른 모델은 클라이언트를 공유
+    assert get_generative_model("key-a", "gemini-2.5-pro")._client is model_a._client
+    
+    async def async_clients():
+        return model_a._async_client, model_b._async_client
+    
+    async_a, async_b = asyncio.run(async_clients())
+    assert async_a is not async_b
+    assert (api_key_of(async_a), api_key_of(async_b)) == ("key-a", "key-b")
+
+def test_models_can_be_created_without_an_event_loop():
+    # Streamlit 스크립트 스레드처럼 이벤트 루프가 없는 스레드
+    errors = []
+    
+    def create():
+        try:
+            get_generative_model("key-thread", "gemini-2.5-flash")
+        except Exception as e:
+            errors.append(e)
+    
+    thread = threading.Thread(target=create)
+    thread.start()
+    thread.join()
+    assert errors == []
+
+class FakeModel:
+    """응답 목록을 순서대로 돌려주는 Gemini 모델 대역"""
+    
+    model_name = "fake-flash"
+    
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+    
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        return SimpleNamespace(text=self.responses.pop(0))
+
+PATENTS = [
+    {"app_num": "10-1", "title": "배터리 셀", "abstract": "전고체 전해질"},
+    {"app_num": "10-2", "title": "배터리 팩", "abstract": "냉각 구조"},
+    {"app_num": "10-3", "title": "초록 없음", "abstract": "정보없음"},
+]
+
+def test_parse_batch_summaries():
+    text = json.dumps([{"app_num": "10-1", "summary": " 요약 "}, "noise", {"app_num": 102, "summary": "숫자 번호"}])
+    assert AdvancedPatentAnalyzer._parse_batch_summaries(text) == {"10-1": "요약", "102": "숫자 번호"}
+    
+    with pytest.raises(ValueError):
+        AdvancedPatentAnalyzer._parse_batch_summaries('{"app_num": "10-1"}')
+    with pytest.raises(ValueError):
+        AdvancedPatentAnalyzer._parse_batch_summaries('[{"app_num": "10-1", "summ')  # 잘린 응답
+
+def test_batch_summarize_marks_missing_items():
+    analyzer = AdvancedPatentAnalyzer("test-key", use_cache=False)
+    analyzer.model_flash = FakeModel(json.dumps([{"app_num": "10-1", "summary": "전고체 셀"}]))
+    
+    summaries = analyzer.batch_summarize(PATENTS)
+    
+    assert summaries == {"10-1": "전고체 셀", "10-2": "요약 오류: 응답에 누락됨"}
+
+def test_invalid_batch_json_is_not_cached(tmp_path):
+    valid = json.dumps([{"app_num": "10-1", "summary": "전고체 셀"}, {"app_num": "10-2", "summary": "냉각 팩"}])
+    model = FakeModel('[{"app_num": "10-1", "summ', valid)
+    analyzer = AdvancedPatentAnalyzer("test-key", cache=LLMResponseCache(str(tmp_path)))
+    analyzer.model_flash = model
+    
+    failed = analyzer.batch_summarize(PATENTS)
+    assert all(summary.startswith("요약 오류") for summary in failed.values())
+    
+    assert analyzer.batch_summarize(PATENTS) == {"10-1": "전고체 셀", "10-2": "냉각 팩"}
+    assert analyzer.batch_summarize(PATENTS) == {"10-1": "전고체 셀", "10-2": "냉각 팩"}
+    assert model.calls == 2  # 깨진 응답은 저장되지 않아 다시 요청, 정상 응답은 캐시에서 재사용
@@ -0,0 +1,47 @@
+from src.llm_handler import AdvancedPatentAnalyzer
+from src.prompt_builder import PromptBuilder, estimate_tokens
+
+def test_evidence_fills_remaining_budget_in_order():
+    items = [f"- [{i}] patent {i}" for i in range(50)]
+    build = PromptBuilder(60).add_section("request", "analyze these").add_evidence("evidence", items).build()
+    
+    assert 0 < build.evidence_included < len(items)
+    assert build.evidence_total == len(items)
+    assert build.total_tokens <= build.budget_tokens
+    assert "- [0] patent 0" in build.prompt
+    assert not build.over_budget
+
+def test_fixed_sections_over_budget_are_flagged():
+    build = PromptBuilder(30).add_section("context", "x" * 200).add_evidence("evidence", ["item"]).build()
+    
+    assert build.total_tokens == estimate_tokens("x" * 200)
+    assert build.over_budget
+    assert build.evidence_included == 0
+    assert build.truncated_sections == ()
+
+def test_truncatable_sections_are_cut_to_budget():
+    build = (PromptBuilder(30)
+             .add_section("request", "analyze these")
+             .add_section("notes", "가" * 200, truncatable=True)
+             .add_section("criteria", "be concise")
+             .build())
+    
+    assert not build.over_budget
+    assert build.total_tokens <= 30
+    assert build.truncated_sections == ("notes",)
+    assert build.prompt.startswith("analyze these") and build.prompt.endswith("be concise")
+
+def test_user_query_survives_notes_overflow():
+    patents = [{"title": f"배터리 셀 {i}", "app_num": f"10-2023-000{i}", "applicant": "삼성SDI", "app_date": "20230101",
+                "abstract": "전고체 전지", "reg_status": "등록", "ipc_code": "H01M"} for i in range(5)]
+    query = "전고체 전지 경쟁사 동향은?"
+    analyzer = AdvancedPatentAnalyzer("test-key", use_cache=False)
+    data = analyzer._prepare_comprehensive_data(patents)
+    analyzer.prompt_budget_tokens = analyzer._generate_expert_prompt(data, "competitive_analysis", query).total_tokens + 50
+    
+    build = analyzer._generate_expert_prompt(data, "competitive_analysis", query, notes=["노트 " * 2000])
+    
+    assert build.truncated_sections == ("notes",)
+    assert not build.over_budget
+    assert query in build.prompt
+    assert "## 📚 전체 특허 분석 노트" in build.prompt
@@ -0,0 +1,85 @@
+import pytest
+
+from src import saved_search
+from src.kipris_handler import AdvancedKiprisOptimizer
+from src.patent_table import PatentRecord, PatentTable
+from src.saved_search import SavedSearchStore, get_saved_search_store
+
+KEYWORD = "배터리"
+
+class FakeKipris:
+    """출원일 내림차순 페이지와 출원번호 조회만 흉내내는 KIPRIS - failing_pages는 None(요청 실패) 응답"""
+    
+    def __init__(self, patents):
+        self.patents = {patent.app_num: patent for patent in patents}
+        self.failing_pages = set()
+    
+    def search_field(self, optimizer, keyword, field, page_no=1, num_of_rows=10, sort_by_date=False):
+        if field == "applicationNumber":
+            patent = self.patents.get(keyword)
+            return ([patent], 1) if patent else ([], 0)
+        if (field, page_no) in self.failing_pages:
+            return None
+        ordered = sorted(self.patents.values(), key=lambda p: p.app_date, reverse=True)
+        start = (page_no - 1) * num_of_rows
+        return ordered[start:start + num_of_rows], len(ordered)
+
+def patent(number, app_date, reg_status="공개"):
+    return PatentRecord(title=f"{KEYWORD} 셀 {number}", app_num=f"10-{number}", abstract=f"{KEYWORD} 전극",
+                        app_date=app_date, reg_status=reg_status)
+
+@pytest.fixture
+def kipris(monkeypatch):
+    fake = FakeKipris([patent(1, "20230101", "등록"), patent(2, "20230201"), patent(3, "20230301")])
+    monkeypatch.setattr(AdvancedKiprisOptimizer, "_search_field",
+                        lambda self, *args, **kwargs: fake.search_field(self, *args, **kwargs))
+    monkeypatch.setattr(saved_search, "get_default_index", lambda: None)
+    return fake
+
+def test_refresh_adds_newer_patents_and_status_changes(kipris, tmp_path):
+    store = SavedSearchStore(str(tmp_path))
+    saved = store.save("내 검색", KEYWORD, PatentTable.from_records(kipris.patents.values()))
+    assert saved.watermark == "20230301"
+    
+    kipris.patents.update({"10-4": patent(4, "20240101"), "10-5": patent(5, "20240201")})
+    kipris.patents["10-2"] = patent(2, "20230201", "등록")
+    refreshed, diff = store.refresh("test-key", "내 검색")
+    
+    assert sorted(p.app_num for p in diff.added) == ["10-4", "10-5"]
+    assert [(p.app_num, old) for p, old in diff.status_changes] == [("10-2", "공개")]
+    assert refreshed.watermark == "20240201"
+    stored = store.get("내 검색")
+    assert sorted(stored.patents.app_nums) == ["10-1", "10-2", "10-3", "10-4", "10-5"]
+    assert stored.watermark == "20240201"
+
+def test_failed_page_keeps_the_watermark(kipris, tmp_path):
+    store = SavedSearchStore(str(tmp_path))
+    store.save("내 검색", KEYWORD, PatentTable.from_records(kipris.patents.values()))
+    
+    kipris.patents["10-4"] = patent(4, "20240101")
+    kipris.failing_pages.add(("inventionTitle", 1))
+    refreshed, diff = store.refresh("test-key", "내 검색")
+    
+    # 다른 필드에서 찾은 신규 특허는 반영하되, 실패한 필드의 누락분을 다시 찾도록 워터마크는 유지
+    assert [p.app_num for p in diff.added] == ["10-4"]
+    assert refreshed.watermark == "20230301"
+
+def test_refresh_without_watermark_re_searches(kipris, tmp_path):
+    store = SavedSearchStore(str(tmp_path))
+    undated = [PatentRecord(title=f"{KEYWORD} 셀", app_num=f"10-{n}", abstract=KEYWORD) for n in (8, 9)]
+    assert store.save("날짜 없음", KEYWORD, PatentTable.from_records(undated)).watermark == ""
+    
+    refreshed, diff = store.refresh("test-key", "날짜 없음")
+    
+    # 저장된 건수만큼 다시 검색해 모르는 특허만 신규로 보고, 그 결과로 워터마크를 정함
+    assert len(diff.added) == 2 and "10-1" in {p.app_num for p in diff.added}
+    assert refreshed.watermark == max(p.app_date for p in diff.added)
+    assert {"10-8", "10-9"} <= set(refreshed.patents.app_nums)
+
+def test_store_init_failure_returns_none(monkeypatch, tmp_path):
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setenv("SAVED_SEARCH_DIR", str(not_a_dir))
+    monkeypatch.setattr(saved_search, "_default_store", None)
+    
+    assert get_saved_search_store() is None
@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from src import sqlite_store
+from src.sqlite_store import SqliteTTLStore
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def make_store(monkeypatch, tmp_path, ttl_seconds=60, max_entries=3):
+    clock = FakeClock()
+    monkeypatch.setattr(sqlite_store, "time", SimpleNamespace(time=clock))
+    store = SqliteTTLStore(str(tmp_path / "store.sqlite3"), "items", str, str, ttl_seconds, max_entries)
+    return store, clock
+
+def test_entries_expire_after_ttl(monkeypatch, tmp_path):
+    store, clock = make_store(monkeypatch, tmp_path)
+    store.set("a", "1")
+    
+    clock.now += 59
+    assert store.get("a") == "1"
+    clock.now += 2  # 저장 후 61초 - 조회해도 만료 시각은 늘어나지 않음
+    assert store.get("a") is None
+    assert store.stats() == {"hits": 1, "misses": 1, "hit_rate": 50.0}
+
+def test_least_recently_used_entries_are_evicted(monkeypatch, tmp_path):
+    store, clock = make_store(monkeypatch, tmp_path)
+    for key in ("a", "b", "c"):
+        store.set(key, key)
+        clock.now += 1
+    
+    assert store.get("a") == "a"  # a를 최근 사용으로 갱신
+    clock.now += 1
+    store.set("d", "d")
+    
+    assert store.get("b") is None
+    assert [store.get(key) for key in ("a", "c", "d")] == ["a", "c", "d"]
+
+def test_entries_survive_reopening(monkeypatch, tmp_path):
+    store, _ = make_store(monkeypatch, tmp_path)
+    store.set("a", "1")
+    
+    reopened = SqliteTTLStore(store.path, "items", str, str, 60, 3)
+    assert reopened.get("a") == "1"